@@ -0,0 +1,37 @@
+@tool
+extends EditorScenePostImport
+## Import script for models from tools/generate_models.py
+##
+## Applies the LOD visibility ranges written next to each model
+## (name_lod.json) to the imported level nodes, so LOD0 shows up close
+## and each coarser level takes over at its measured switch distance.
+## Set it as the Import Script of the model GLBs in the Import dock.
+
+const LOD_SUFFIX := "_lod"
+
+
+func _post_import(scene: Node) -> Object:
+	# Sibling level files (name_lod1.glb) share their model's report
+	var regex := RegEx.create_from_string(LOD_SUFFIX + "\\d+$")
+	var base := regex.sub(get_source_file().get_basename(), "")
+	var path := base + LOD_SUFFIX + ".json"
+	if not FileAccess.file_exists(path):
+		return scene
+
+	var report = JSON.parse_string(FileAccess.get_file_as_string(path))
+	if typeof(report) != TYPE_DICTIONARY or not report.has("levels"):
+		push_warning("Model LOD import: could not read %s" % path)
+		return scene
+
+	for level in report["levels"]:
+		var node := scene.find_child(level["node"], true, false)
+		if node == null:
+			continue
+		# Instanced parts (--instancing) are children of their level's node
+		var geometry: Array[Node] = node.find_children("*", "GeometryInstance3D")
+		if node is GeometryInstance3D:
+			geometry.append(node)
+		for instance in geometry:
+			instance.visibility_range_begin = level["visibility_range_begin"]
+			instance.visibility_range_end = level["visibility_range_end"]
+	return scene
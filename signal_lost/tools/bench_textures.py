@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the SIGNAL LOST texture generator
+
+Times every TextureGenerator primitive and every generate_* material set
+across a range of sizes, and records wall time, peak traced memory and
+throughput to JSON. Given a baseline from an earlier run, flags anything
+that got slower (or hungrier) than the threshold allows and exits
+non-zero, so texture-tool changes can be gated on it.
+
+Runs offline with only numpy and Pillow. Timings are the best of
+--repeat runs; peak memory is measured in a separate tracemalloc run so
+tracing never slows the timed ones.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import generate_textures as gt
+import texture_blur
+
+
+DEFAULT_SIZES = [256, 512, 1024, 2048, 4096]
+# The flipbook case renders this many frames, each 1/sqrt(frames) of the case size
+# across, so it covers size^2 pixels like every other case
+FLIPBOOK_FRAMES = 16
+
+# Changes smaller than these are timer and allocator noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.002
+MIN_MB_DELTA = 1.0
+
+
+def primitive_cases():
+    """(name, setup) pairs; setup(size) returns the call to time"""
+    def noise(size):
+        gen = gt.TextureGenerator(size, 1)
+        return lambda: gen.noise(scale=50, octaves=6)
+
+    def scratches(size):
+        gen = gt.TextureGenerator(size, 1)
+        return lambda: gen.scratches(count=150)
+
+    def spots(size):
+        gen = gt.TextureGenerator(size, 1)
+        return lambda: gen.spots(count=40, size_range=(20, 100))
+
+    def cracks(size):
+        gen = gt.TextureGenerator(size, 1)
+        return lambda: gen.cracks(count=15, branching=3)
+
+    def height_to_normal(size):
+        gen = gt.TextureGenerator(size, 1)
+        height = np.random.RandomState(1).rand(size, size)
+        return lambda: gen.height_to_normal(height, strength=2.0)
+
+    def colorize(size):
+        gen = gt.TextureGenerator(size, 1)
+        values = np.random.RandomState(1).rand(size, size)
+        return lambda: gen.colorize(values, (100, 105, 115), (140, 145, 155))
+
+    def blur(method, sigma):
+        def setup(size):
+            values = np.random.RandomState(1).rand(size, size).astype(np.float32)
+            return lambda: texture_blur.gaussian_blur(values, sigma, method=method)
+        return setup
+
+    return [('noise', noise), ('scratches', scratches), ('spots', spots), ('cracks', cracks),
+            ('height_to_normal', height_to_normal), ('colorize', colorize),
+            ('blur_auto_s15', blur('auto', 15)), ('blur_iir_s64', blur('iir', 64)),
+            ('blur_fft_s64', blur('fft', 64))]
+
+
+def generator_cases(scratch_dir):
+    """One case per material set, written into scratch_dir; timed until
+    its last map is encoded. The static flipbook is a case of its own."""
+    cases = []
+    for _, subdir, func, offset, _ in gt.MATERIALS:
+        options = {'frames': 0} if func is gt.generate_screen_static else {}
+
+        def setup(size, func=func, subdir=subdir, offset=offset, options=options):
+            output_dir = os.path.join(scratch_dir, subdir)
+
+            def call():
+                func(output_dir, size, 42 + offset, **options)
+                gt.ENCODER.wait()
+            return call
+        cases.append((func.__name__, setup))
+
+    def flipbook(size):
+        output_dir = os.path.join(scratch_dir, 'static_flipbook')
+
+        def call():
+            gt.generate_static_flipbook(output_dir, max(size // int(FLIPBOOK_FRAMES ** 0.5), 1), 42, FLIPBOOK_FRAMES)
+            gt.ENCODER.wait()
+        return call
+    cases.append(('generate_static_flipbook', flipbook))
+    return cases
+
+
+def measure(call, repeat):
+    """(best wall seconds, peak traced bytes) for call()"""
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run(cases, sizes, repeat, only=None):
+    results = {}
+    for name, setup in cases:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        for size in sizes:
+            seconds, peak = measure(setup(size), repeat)
+            key = f"{name}@{size}"
+            results[key] = {
+                'seconds': round(seconds, 5),
+                'peak_mb': round(peak / 2**20, 2),
+                'mpix_per_s': round(size * size / 1e6 / seconds, 2),
+            }
+            print(f"  {key:<32} {seconds * 1000:10.1f} ms {peak / 2**20:9.1f} MB "
+                  f"{results[key]['mpix_per_s']:9.1f} MP/s")
+            sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """Print changes against a baseline; returns the keys that regressed"""
+    regressions = []
+    print(f"\n  {'case':<32} {'time':>9} {'memory':>9}")
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        time_ratio = new['seconds'] / max(old['seconds'], 1e-9)
+        memory_ratio = new['peak_mb'] / max(old['peak_mb'], 1e-3)
+        slower = time_ratio > 1 + threshold and new['seconds'] - old['seconds'] > MIN_SECONDS_DELTA
+        hungrier = (memory_ratio > 1 + memory_threshold
+                    and new['peak_mb'] - old['peak_mb'] > MIN_MB_DELTA)
+        flag = '  REGRESSION' if slower or hungrier else ''
+        print(f"  {key:<32} {time_ratio - 1:+9.1%} {memory_ratio - 1:+9.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the SIGNAL LOST texture generator',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 bench_textures.py --output baseline.json
+  python3 bench_textures.py --baseline baseline.json --threshold 0.1
+  python3 bench_textures.py --sizes 256 1024 --only noise cracks
+        """
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'Texture sizes to run (default: {DEFAULT_SIZES})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per case; the best is kept (default: 3)')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='Only run cases whose name contains one of these')
+    parser.add_argument('--skip-generators', action='store_true',
+                        help='Only benchmark the TextureGenerator primitives')
+    parser.add_argument('--output', '-o', metavar='PATH',
+                        help='Write results as JSON (usable later as a --baseline)')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='Compare against an earlier --output and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown as a fraction (default: 0.25)')
+    parser.add_argument('--memory-threshold', type=float, default=0.10,
+                        help='Allowed peak memory growth as a fraction (default: 0.10)')
+
+    args = parser.parse_args()
+
+    print(f"\n{'='*50}")
+    print(f"  SIGNAL LOST - Texture Benchmarks")
+    print(f"  Sizes: {' '.join(map(str, args.sizes))} | Repeat: {args.repeat}")
+    print(f"{'='*50}\n")
+
+    with tempfile.TemporaryDirectory(prefix='texbench-') as scratch_dir:
+        cases = primitive_cases()
+        if not args.skip_generators:
+            cases += generator_cases(scratch_dir)
+        results = run(cases, args.sizes, args.repeat, args.only)
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n  {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n  No regressions beyond {args.threshold:.0%} time / {args.memory_threshold:.0%} memory")
+
+
+if __name__ == "__main__":
+    main()
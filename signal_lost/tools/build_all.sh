@@ -4,7 +4,7 @@
 # Builds all assets and exports the game
 #
 # Usage:
-#   ./build_all.sh [textures|models|audio|build|all]
+#   ./build_all.sh [textures|models|optimize|audio|build|all]
 #
 # Improvements:
 # - Better error handling with specific messages
@@ -14,6 +14,8 @@
 #
 
 set -e
+# A failing generator fails the step even when its output is filtered
+set -o pipefail
 
 PROJECT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
 cd "$PROJECT_DIR"
@@ -57,8 +59,7 @@ check_deps() {
     fi
 
     if ! command -v blender &>/dev/null; then
-        print_error "blender is required but not installed"
-        missing=1
+        echo -e "${YELLOW}[WARN]${NC} blender not found - models can only use the native backend"
     else
         print_success "blender found: $(blender --version 2>&1 | head -1)"
     fi
@@ -72,9 +73,9 @@ check_deps() {
     # Check Python packages
     if ! python3 -c "import PIL, numpy" 2>/dev/null; then
         print_step "INSTALL" "Installing required Python packages..."
-        pip3 install pillow numpy scipy --break-system-packages -q 2>/dev/null || \
-        pip3 install pillow numpy scipy -q 2>/dev/null || \
-        pip install pillow numpy scipy -q
+        pip3 install pillow numpy --break-system-packages -q 2>/dev/null || \
+        pip3 install pillow numpy -q 2>/dev/null || \
+        pip install pillow numpy -q
     fi
     print_success "Python packages OK"
 
@@ -91,7 +92,7 @@ gen_textures() {
     print_step "1/4" "Generating textures..."
     local start=$(date +%s)
 
-    python3 tools/generate_textures.py -o assets/textures -s 1024
+    python3 tools/generate_textures.py -o assets/textures -s 1024 --jobs 0
 
     local end=$(date +%s)
     print_success "Textures generated in $((end-start))s"
@@ -102,12 +103,23 @@ gen_models() {
     print_step "2/4" "Generating 3D models..."
     local start=$(date +%s)
 
-    blender --background --python tools/generate_models.py 2>&1 | grep -E "^\s+\[|Exported|complete"
+    python3 tools/generate_models.py 2>&1 | grep -E "^\s+\[|Up to date|Exported|complete|FAILED|over budget|limit \+|Error"
 
     local end=$(date +%s)
     print_success "Models generated in $((end-start))s"
 }
 
+# Weld, cache-reorder and quantize the model GLBs (not part of 'all')
+optimize_models() {
+    print_step "2b" "Optimizing 3D models..."
+    local start=$(date +%s)
+
+    python3 tools/optimize_glb.py assets/models
+
+    local end=$(date +%s)
+    print_success "Models optimized in $((end-start))s"
+}
+
 # Generate audio
 gen_audio() {
     print_step "3/4" "Generating audio..."
@@ -158,6 +170,7 @@ usage() {
     echo "Commands:"
     echo "  textures  Generate PBR textures only"
     echo "  models    Generate 3D models only"
+    echo "  optimize  Weld, cache-reorder and quantize the generated models"
     echo "  audio     Generate audio assets only"
     echo "  build     Export game builds only"
     echo "  all       Run complete pipeline (default)"
@@ -183,6 +196,9 @@ main() {
         models)
             gen_models
             ;;
+        optimize)
+            optimize_models
+            ;;
         audio)
             gen_audio
             ;;
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Seam check over every built-in SIGNAL LOST material
+
+Generates each material set (the --type generators and the recipes in
+tools/recipes) with --tileable at a few sizes and seeds, singly and as a
+texture array, and reports the worst seam ratio generate_textures.py
+measured for each. Exits non-zero if any set fails its seam check, so
+changes to the tileable mode or the check itself can be gated on it.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import tempfile
+
+import generate_textures as gt
+from texture_recipe import RECIPE_DIR
+
+
+DEFAULT_SIZES = [128, 256]
+DEFAULT_SEEDS = [1, 42, 1234]
+DEFAULT_VARIANTS = [1, 3]
+
+SEAMS_LINE = re.compile(r'Seams: worst (\S+) at ([\d.]+)x')
+
+
+def materials():
+    """(name, generate(output_dir, size, seed, **options)) for every built-in material"""
+    found = [(name, func) for name, _, func, _, _ in gt.MATERIALS]
+    for path in sorted(glob.glob(os.path.join(RECIPE_DIR, '*.json'))):
+        def generate(output_dir, size, seed, path=path, **options):
+            gt.generate_recipe(output_dir, size, seed, recipe=path, **options)
+        found.append((f"recipe:{os.path.splitext(os.path.basename(path))[0]}", generate))
+    return found
+
+
+def check(generate, output_dir, size, seed, variants):
+    """(worst map, its seam ratio, error or None) of one tileable set"""
+    options = {'tileable': True}
+    if variants > 1:
+        options.update(variants=variants, texture_array=True)
+    log = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(log):
+        try:
+            generate(output_dir, size, seed, **options)
+            gt.ENCODER.wait()
+        except RuntimeError as e:
+            error = str(e)
+    match = SEAMS_LINE.search(log.getvalue())
+    if match is None:
+        return None, 0.0, error or "no seam check ran"
+    return match.group(1), float(match.group(2)), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every built-in material tiles with --tileable')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'Texture sizes to check (default: {DEFAULT_SIZES})')
+    parser.add_argument('--seeds', type=int, nargs='+', default=DEFAULT_SEEDS,
+                        help=f'Seeds to check (default: {DEFAULT_SEEDS})')
+    parser.add_argument('--variants', type=int, nargs='+', default=DEFAULT_VARIANTS,
+                        help=f'Texture array layers to check, 1 = a single set (default: {DEFAULT_VARIANTS})')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='Only check materials whose name contains one of these')
+    args = parser.parse_args()
+
+    print(f"\n{'='*50}")
+    print(f"  SIGNAL LOST - Tileable Seam Check")
+    print(f"  Sizes: {' '.join(map(str, args.sizes))} | Seeds: {' '.join(map(str, args.seeds))} | "
+          f"Variants: {' '.join(map(str, args.variants))}")
+    print(f"{'='*50}\n")
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix='seamcheck-') as scratch_dir:
+        for name, generate in materials():
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            for size in args.sizes:
+                for seed in args.seeds:
+                    for variants in args.variants:
+                        key = f"{name}@{size} seed {seed}" + (f" x{variants}" if variants > 1 else "")
+                        output_dir = os.path.join(scratch_dir, re.sub(r'\W', '_', key))
+                        worst, ratio, error = check(generate, output_dir, size, seed, variants)
+                        flag = f"  FAILED: {error}" if error else ""
+                        print(f"  {key:<40} {worst or '-':>12} {ratio:6.2f}x{flag}")
+                        sys.stdout.flush()
+                        if error:
+                            failures.append(key)
+
+    if failures:
+        print(f"\n  {len(failures)} set(s) do not tile: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\n  Every set tiles (seam ratios up to {gt.SEAM_TOLERANCE}x allowed)")
+
+
+if __name__ == "__main__":
+    main()
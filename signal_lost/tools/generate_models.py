@@ -1,553 +1,939 @@
 #!/usr/bin/env python3
 """
-Blender Headless Model Generator for SIGNAL LOST
-Run: blender --background --python tools/generate_models.py
+3D Model Generator for SIGNAL LOST
+Run: python3 tools/generate_models.py [--output DIR] [--models a,b] [--jobs N]
+ or: python3 tools/generate_models.py --backend blender --jobs N (N Blender workers)
+ or: blender --background --python tools/generate_models.py -- [--backend blender]
 
 Improvements:
 - Added radio equipment model
 - Added filing cabinet model
 - Better UV unwrapping with margin control
 - Added command line argument support
+- Native NumPy mesh building and GLB export, no Blender needed
+  (mesh_builder.py, gltf_io.py, --backend native|blender)
+- Models sharded over parallel worker processes with per-model timings (--jobs, --models)
+- Quadric-decimated LOD chains with measured switch distances (mesh_lod.py, --lods)
+- Identical parts and scene props exported as shared, instanced meshes (--instancing, --scene)
+- Up-to-date models skipped via a content-hash manifest (--force, --no-cache)
+- Per-model geometry stats checked against budgets and the last run (model_stats.py, --budget)
 """
 
-import bpy
-import bmesh
+import argparse
+import functools
+import hashlib
+import inspect
+import json
 import math
 import os
+import subprocess
 import sys
-
-# Clear default scene
-bpy.ops.wm.read_factory_settings(use_empty=True)
-
-
-def apply_transforms(obj):
-    """Apply all transforms to object"""
-    bpy.context.view_layer.objects.active = obj
-    obj.select_set(True)
-    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
-    obj.select_set(False)
-
-
-def uv_unwrap(obj, island_margin=0.02):
-    """Smart UV unwrap object with configurable margin"""
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.uv.smart_project(island_margin=island_margin)
-    bpy.ops.object.mode_set(mode='OBJECT')
-
-
-def export_glb(obj, filepath):
-    """Export object as GLB"""
-    bpy.ops.object.select_all(action='DESELECT')
-    obj.select_set(True)
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.export_scene.gltf(
-        filepath=filepath,
-        use_selection=True,
-        export_format='GLB',
-        export_apply=True
-    )
-    print(f"    Exported: {filepath}")
-
-
-def clear_scene():
-    """Delete all objects in scene"""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
-
-
-def create_control_panel():
+import tempfile
+import time
+
+# blender --python does not put the script's directory on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import mesh_builder
+import mesh_lod
+import model_stats
+from gltf_io import Gltf
+
+
+BACKENDS = ('native', 'blender')
+LOD_FILES = ('embedded', 'siblings')
+INSTANCING = ('none', 'nodes', 'gpu')
+# Triangle fractions of the full mesh kept by LOD1, LOD2, ...
+DEFAULT_LODS = '0.5,0.25,0.1'
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYOUT_DIR = os.path.join(TOOLS_DIR, 'layouts')
+MANIFEST = '.models_manifest.json'
+MANIFEST_VERSION = 1
+STATS = 'model_stats.json'
+DEFAULT_BUDGET = os.path.join(TOOLS_DIR, 'model_budgets.json')
+
+
+class NativeBackend:
+    """Meshes built with mesh_builder and written by gltf_io. Parts are
+    baked into world space, so each model is one node at the origin;
+    with instancing, identical parts instead share one mesh placed by
+    child nodes (nodes) or by EXT_mesh_gpu_instancing (gpu)."""
+
+    name = 'native'
+
+    def __init__(self, instancing='none'):
+        self.instancing = instancing
+
+    def cube(self, scale=(1, 1, 1), location=(0, 0, 0), rotation=(0, 0, 0), bevel=0.0, segments=1):
+        """Cube of size 1 under the given transform; bevel rounds its edges
+        after scaling, like a bevel modifier applied to the scaled cube"""
+        return mesh_builder.box(scale, bevel, segments).transformed(rotation=rotation, location=location)
+
+    def cylinder(self, radius, depth, location=(0, 0, 0), rotation=(0, 0, 0)):
+        return mesh_builder.cylinder(radius, depth).transformed(rotation=rotation, location=location)
+
+    def uv_sphere(self, radius, segments, ring_count, scale=(1, 1, 1), location=(0, 0, 0)):
+        return mesh_builder.uv_sphere(radius, segments, ring_count).transformed(scale, location=location)
+
+    def solidify(self, part, thickness):
+        return part.solidify(thickness)
+
+    def _unwrap(self, mesh, projection, island_margin, bounds=None):
+        if projection == 'cylinder':
+            return mesh_builder.cylinder_uv(mesh, island_margin, bounds)
+        return mesh_builder.box_uv(mesh, island_margin, bounds)
+
+    def finish(self, name, parts, island_margin=0.02, projection='box'):
+        """Join parts into the named model and project its UVs"""
+        mesh = self._unwrap(mesh_builder.join(parts), projection, island_margin)
+        return name, mesh, (projection, island_margin), parts
+
+    def lod_chain(self, model, ratios):
+        """The model and copies decimated to ratios of its triangles, as
+        (level, positions, triangles); UVs are projected as the model's"""
+        name, mesh, unwrap, _ = model
+        triangles = mesh.corners[mesh.triangles()]
+        targets = [max(int(len(triangles) * ratio), 1) for ratio in ratios]
+        chain = [(mesh, mesh.positions, triangles)]
+        for positions, faces in mesh_lod.decimate(mesh.positions, triangles, targets):
+            level = self._unwrap(mesh_builder.triangle_mesh(positions, faces), *unwrap, mesh.bounds())
+            chain.append((level, positions, faces))
+        return chain
+
+    def instances(self, model):
+        """Split the model into the parts used once, joined, and groups of
+        identical parts (same source geometry, not mirrored): returns
+        (mesh or None, [(shared mesh, [(scale, rotation, location), ...])])"""
+        _, mesh, _, parts = model
+        starts = np.cumsum([0] + [len(part.corners) for part in parts])
+        groups = {}
+        for i, part in enumerate(parts):
+            source = part.source
+            mirrored = source is not None and np.prod(np.sign(source[1])) < 0
+            key = i if source is None or mirrored else source[0].geometry_key()
+            groups.setdefault(key, []).append(i)
+
+        # Every copy takes the UVs projected onto the first one
+        def with_uvs(geometry, i):
+            return mesh_builder.Mesh(geometry.positions, corners=geometry.corners, offsets=geometry.offsets,
+                                     uvs=mesh.uvs[starts[i]:starts[i + 1]])
+
+        single = sorted(members[0] for members in groups.values() if len(members) == 1)
+        shared = [(with_uvs(parts[members[0]].source[0], members[0]), [parts[i].source[1:] for i in members])
+                  for members in groups.values() if len(members) > 1]
+        base = mesh_builder.join([with_uvs(parts[i], i) for i in single]) if single else None
+        return base, shared
+
+    def _add_mesh(self, gltf, name, mesh):
+        positions, normals, uvs, indices = mesh.to_arrays()
+        return gltf.add_mesh(name, {'POSITION': positions, 'NORMAL': normals, 'TEXCOORD_0': uvs}, indices)
+
+    def _add_instanced(self, gltf, name, model, extras):
+        """Node name holding the model's single parts, with its shared
+        parts placed under it"""
+        base, shared = self.instances(model)
+        children = []
+        for g, (mesh, placements) in enumerate(shared, 1):
+            part = f"{name}_Part{g}"
+            index = self._add_mesh(gltf, part, mesh)
+            transforms = [mesh_builder.gltf_transform(*placement) for placement in placements]
+            if self.instancing == 'gpu':
+                gltf.use_extension('EXT_mesh_gpu_instancing')
+                attributes = {key: gltf.add_accessor(np.array(values, dtype=np.float32))
+                              for key, values in zip(('TRANSLATION', 'ROTATION', 'SCALE'), zip(*transforms))}
+                children.append(gltf.add_node(part, index, root=False,
+                                              extensions={'EXT_mesh_gpu_instancing': {'attributes': attributes}}))
+            else:
+                for k, (translation, rotation, scale) in enumerate(transforms, 1):
+                    children.append(gltf.add_node(f"{part}_{k}", index, translation, rotation, scale, root=False))
+        mesh = self._add_mesh(gltf, name, base) if base is not None else None
+        gltf.add_node(name, mesh, children=children or None, extras=extras)
+        return sum(len(placements) for _, placements in shared), len(shared)
+
+    def _documents(self, model, filepath, levels, siblings, instanced):
+        name, mesh = model[:2]
+        documents, stats = {}, (0, 0)
+        for level, info in levels or [(mesh, None)]:
+            lod = info['lod'] if info else 0
+            path = f"{os.path.splitext(filepath)[0]}_lod{lod}.glb" if siblings and lod else filepath
+            node = f"{name}_LOD{lod}" if lod else name
+            if info:
+                info.update(node=node, file=os.path.basename(path))
+            gltf = documents.setdefault(path, Gltf())
+            if instanced and lod == 0 and self.instances(model)[1]:
+                stats = self._add_instanced(gltf, node, model, info)
+            else:
+                gltf.add_node(node, self._add_mesh(gltf, node, level), extras=info)
+        return documents, stats
+
+    def export(self, model, filepath, levels=None, siblings=False):
+        """Write the model, or its (level, info) LOD levels as nodes of one
+        GLB or as sibling files, with info as each node's extras. With
+        instancing, LOD0 shares the geometry of identical parts and the
+        bytes saved are reported."""
+        instanced = self.instancing != 'none'
+        documents, stats = self._documents(model, filepath, levels, siblings, instanced)
+        for path, gltf in documents.items():
+            data = gltf.glb()
+            with open(path, 'wb') as f:
+                f.write(data)
+            note = ''
+            if instanced and path == filepath:
+                plain = self._documents(model, filepath, levels, siblings, False)[0][path].glb()
+                saved = len(plain) - len(data)
+                note = (f" ({stats[0]} parts instanced from {stats[1]} meshes, {saved:,} bytes saved, "
+                        f"{-saved / len(plain):.0%})" if stats[1] else " (no identical parts)")
+            print(f"    Exported: {path}{note}")
+
+    def clear(self):
+        pass
+
+
+class BlenderBackend:
+    """Meshes built with bpy operators, smart UV projected and exported by
+    Blender's glTF exporter; needs to run inside Blender"""
+
+    name = 'blender'
+
+    def __init__(self):
+        import bpy
+        self.bpy = bpy
+        # Clear default scene
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+    def apply_transforms(self, obj):
+        """Apply rotation and scale to object"""
+        self.bpy.context.view_layer.objects.active = obj
+        obj.select_set(True)
+        self.bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
+        obj.select_set(False)
+
+    def _add(self, scale=None, location=(0, 0, 0), rotation=(0, 0, 0)):
+        obj = self.bpy.context.active_object
+        if scale is not None:
+            obj.scale = scale
+        obj.location = location
+        obj.rotation_euler = rotation
+        self.apply_transforms(obj)
+        return obj
+
+    def cube(self, scale=(1, 1, 1), location=(0, 0, 0), rotation=(0, 0, 0), bevel=0.0, segments=1):
+        self.bpy.ops.mesh.primitive_cube_add(size=1)
+        obj = self._add(scale, location, rotation)
+        if bevel > 0:
+            # Bevel edges for realism
+            self.bpy.context.view_layer.objects.active = obj
+            modifier = obj.modifiers.new("Bevel", type='BEVEL')
+            modifier.width = bevel
+            modifier.segments = segments
+            self.bpy.ops.object.modifier_apply(modifier=modifier.name)
+        return obj
+
+    def cylinder(self, radius, depth, location=(0, 0, 0), rotation=(0, 0, 0)):
+        self.bpy.ops.mesh.primitive_cylinder_add(radius=radius, depth=depth)
+        return self._add(None, location, rotation)
+
+    def uv_sphere(self, radius, segments, ring_count, scale=(1, 1, 1), location=(0, 0, 0)):
+        self.bpy.ops.mesh.primitive_uv_sphere_add(radius=radius, segments=segments, ring_count=ring_count)
+        return self._add(scale, location)
+
+    def solidify(self, part, thickness):
+        self.bpy.context.view_layer.objects.active = part
+        modifier = part.modifiers.new("Solidify", type='SOLIDIFY')
+        modifier.thickness = thickness
+        self.bpy.ops.object.modifier_apply(modifier=modifier.name)
+        return part
+
+    def finish(self, name, parts, island_margin=0.02, projection='box'):
+        """Join parts into the first one, name it and smart UV unwrap it
+        (projection only applies to the native backend)"""
+        bpy = self.bpy
+        bpy.ops.object.select_all(action='DESELECT')
+        for obj in parts:
+            obj.select_set(True)
+        bpy.context.view_layer.objects.active = parts[0]
+        bpy.ops.object.join()
+        obj = bpy.context.active_object
+        obj.name = name
+
+        bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.mesh.select_all(action='SELECT')
+        bpy.ops.uv.smart_project(island_margin=island_margin)
+        bpy.ops.object.mode_set(mode='OBJECT')
+        return obj
+
+    def _geometry(self, obj):
+        """World-space vertex positions and triangles of obj"""
+        mesh = obj.data
+        mesh.calc_loop_triangles()
+        positions = np.array([(obj.matrix_world @ v.co)[:] for v in mesh.vertices]).reshape(-1, 3)
+        triangles = np.array([t.vertices[:] for t in mesh.loop_triangles], dtype=np.intp).reshape(-1, 3)
+        return positions, triangles
+
+    def lod_chain(self, obj, ratios):
+        """obj and copies reduced by Blender's (quadric) collapse decimation,
+        as (level, positions, triangles)"""
+        bpy = self.bpy
+        chain = [(obj,) + self._geometry(obj)]
+        for ratio in ratios:
+            level = obj.copy()
+            level.data = obj.data.copy()
+            bpy.context.collection.objects.link(level)
+            bpy.context.view_layer.objects.active = level
+            modifier = level.modifiers.new("Decimate", type='DECIMATE')
+            modifier.ratio = ratio
+            bpy.ops.object.modifier_apply(modifier=modifier.name)
+            chain.append((level,) + self._geometry(level))
+        return chain
+
+    def export(self, obj, filepath, levels=None, siblings=False):
+        """Export object as GLB, or its (level, info) LOD levels as objects
+        of one GLB or as sibling files, with info as custom properties"""
+        bpy = self.bpy
+        groups = {}
+        for level, info in levels or [(obj, None)]:
+            lod = info['lod'] if info else 0
+            path = f"{os.path.splitext(filepath)[0]}_lod{lod}.glb" if siblings and lod else filepath
+            if lod:
+                level.name = f"{obj.name}_LOD{lod}"
+            if info:
+                info.update(node=level.name, file=os.path.basename(path))
+                for key, value in info.items():
+                    level[key] = value
+            groups.setdefault(path, []).append(level)
+
+        for path, objs in groups.items():
+            bpy.ops.object.select_all(action='DESELECT')
+            for level in objs:
+                level.select_set(True)
+            bpy.context.view_layer.objects.active = objs[0]
+            bpy.ops.export_scene.gltf(
+                filepath=os.path.abspath(path),
+                use_selection=True,
+                export_format='GLB',
+                export_apply=True,
+                export_extras=bool(levels)
+            )
+            print(f"    Exported: {path}")
+
+    def clear(self):
+        """Delete all objects in scene"""
+        self.bpy.ops.object.select_all(action='SELECT')
+        self.bpy.ops.object.delete()
+
+
+def create_control_panel(b):
     """Scientific instrument control panel with buttons and switches"""
-    # Main body
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    panel = bpy.context.active_object
-    panel.name = "ControlPanel"
-    panel.scale = (1.2, 0.3, 0.8)
-    apply_transforms(panel)
-
-    # Bevel edges for realism
-    bpy.ops.object.modifier_add(type='BEVEL')
-    panel.modifiers["Bevel"].width = 0.02
-    panel.modifiers["Bevel"].segments = 2
-    bpy.ops.object.modifier_apply(modifier="Bevel")
+    # Main body, bevel edges for realism
+    panel = b.cube(scale=(1.2, 0.3, 0.8), bevel=0.02, segments=2)
 
     # Screen recess
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    screen = bpy.context.active_object
-    screen.name = "Screen"
-    screen.scale = (0.5, 0.05, 0.3)
-    screen.location = (0, -0.13, 0.15)
-    apply_transforms(screen)
+    screen = b.cube(scale=(0.5, 0.05, 0.3), location=(0, -0.13, 0.15))
 
     # Buttons (2 rows x 5)
     buttons = []
     for row in range(2):
         for col in range(5):
-            bpy.ops.mesh.primitive_cylinder_add(radius=0.03, depth=0.02)
-            btn = bpy.context.active_object
-            btn.location = (-0.4 + col * 0.15, -0.14, -0.15 + row * 0.12)
-            btn.rotation_euler = (math.pi/2, 0, 0)
-            buttons.append(btn)
+            buttons.append(b.cylinder(0.03, 0.02, location=(-0.4 + col * 0.15, -0.14, -0.15 + row * 0.12),
+                                      rotation=(math.pi/2, 0, 0)))
 
     # Toggle switches
     for i in range(3):
-        bpy.ops.mesh.primitive_cube_add(size=1)
-        switch = bpy.context.active_object
-        switch.scale = (0.02, 0.02, 0.05)
-        switch.location = (0.35 + i * 0.08, -0.14, 0)
-        apply_transforms(switch)
-        buttons.append(switch)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in buttons + [screen]:
-        obj.select_set(True)
-    panel.select_set(True)
-    bpy.context.view_layer.objects.active = panel
-    bpy.ops.object.join()
+        buttons.append(b.cube(scale=(0.02, 0.02, 0.05), location=(0.35 + i * 0.08, -0.14, 0)))
 
-    uv_unwrap(panel)
-    return panel
+    return b.finish("ControlPanel", [panel] + buttons + [screen])
 
 
-def create_computer_terminal():
+def create_computer_terminal(b):
     """Retro CRT computer terminal - 1970s/80s aesthetic"""
     # Monitor body
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    monitor = bpy.context.active_object
-    monitor.name = "Terminal"
-    monitor.scale = (0.6, 0.5, 0.5)
-    apply_transforms(monitor)
+    monitor = b.cube(scale=(0.6, 0.5, 0.5))
 
     # Screen bezel
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    bezel = bpy.context.active_object
-    bezel.scale = (0.5, 0.05, 0.4)
-    bezel.location = (0, -0.23, 0.03)
-    apply_transforms(bezel)
+    bezel = b.cube(scale=(0.5, 0.05, 0.4), location=(0, -0.23, 0.03))
 
     # CRT screen (slightly recessed)
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    screen = bpy.context.active_object
-    screen.scale = (0.45, 0.02, 0.35)
-    screen.location = (0, -0.26, 0.03)
-    apply_transforms(screen)
+    screen = b.cube(scale=(0.45, 0.02, 0.35), location=(0, -0.26, 0.03))
 
     # Keyboard
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    keyboard = bpy.context.active_object
-    keyboard.scale = (0.5, 0.25, 0.04)
-    keyboard.location = (0, -0.55, -0.2)
-    keyboard.rotation_euler = (0.2, 0, 0)
-    apply_transforms(keyboard)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in [bezel, screen, keyboard]:
-        obj.select_set(True)
-    monitor.select_set(True)
-    bpy.context.view_layer.objects.active = monitor
-    bpy.ops.object.join()
+    keyboard = b.cube(scale=(0.5, 0.25, 0.04), location=(0, -0.55, -0.2), rotation=(0.2, 0, 0))
 
-    uv_unwrap(monitor)
-    return monitor
+    return b.finish("Terminal", [monitor, bezel, screen, keyboard])
 
 
-def create_anemometer():
+def create_anemometer(b):
     """Wind speed measurement device with rotating cups"""
     # Central pole
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.05, depth=1.5)
-    pole = bpy.context.active_object
-    pole.name = "Anemometer"
-    pole.location.z = 0.75
-    apply_transforms(pole)
+    pole = b.cylinder(0.05, 1.5, location=(0, 0, 0.75))
 
     # Hub
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.08, depth=0.1)
-    hub = bpy.context.active_object
-    hub.location = (0, 0, 1.5)
-    apply_transforms(hub)
+    hub = b.cylinder(0.08, 0.1, location=(0, 0, 1.5))
 
     # 3 arms with cups
-    parts = [hub]
+    parts = [pole, hub]
     for i in range(3):
         angle = i * (2 * math.pi / 3)
 
         # Arm
-        bpy.ops.mesh.primitive_cylinder_add(radius=0.02, depth=0.4)
-        arm = bpy.context.active_object
-        arm.rotation_euler = (0, math.pi/2, angle)
-        arm.location = (0.2 * math.cos(angle), 0.2 * math.sin(angle), 1.5)
-        apply_transforms(arm)
-        parts.append(arm)
+        parts.append(b.cylinder(0.02, 0.4, location=(0.2 * math.cos(angle), 0.2 * math.sin(angle), 1.5),
+                                rotation=(0, math.pi/2, angle)))
 
         # Cup (hemisphere-like)
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=0.08, segments=12, ring_count=6)
-        cup = bpy.context.active_object
-        cup.location = (0.4 * math.cos(angle), 0.4 * math.sin(angle), 1.5)
-        cup.scale.x = 0.5
-        apply_transforms(cup)
-        parts.append(cup)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    pole.select_set(True)
-    bpy.context.view_layer.objects.active = pole
-    bpy.ops.object.join()
+        parts.append(b.uv_sphere(0.08, 12, 6, scale=(0.5, 1, 1),
+                                 location=(0.4 * math.cos(angle), 0.4 * math.sin(angle), 1.5)))
 
-    uv_unwrap(pole)
-    return pole
+    return b.finish("Anemometer", parts, projection='cylinder')
 
 
-def create_thermometer_shelter():
+def create_thermometer_shelter(b):
     """Stevenson screen / instrument shelter for weather measurements"""
-    # Main box
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    box = bpy.context.active_object
-    box.name = "ThermometerShelter"
-    box.scale = (0.6, 0.6, 0.8)
-    box.location.z = 1.2
-    apply_transforms(box)
-
-    # Make hollow using solidify
-    bpy.ops.object.modifier_add(type='SOLIDIFY')
-    box.modifiers["Solidify"].thickness = 0.03
-    bpy.ops.object.modifier_apply(modifier="Solidify")
+    # Main box, made hollow using solidify
+    box = b.solidify(b.cube(scale=(0.6, 0.6, 0.8), location=(0, 0, 1.2)), 0.03)
 
     # 4 legs
-    parts = []
+    parts = [box]
     for x in [-0.25, 0.25]:
         for y in [-0.25, 0.25]:
-            bpy.ops.mesh.primitive_cube_add(size=1)
-            leg = bpy.context.active_object
-            leg.scale = (0.05, 0.05, 0.8)
-            leg.location = (x, y, 0.4)
-            apply_transforms(leg)
-            parts.append(leg)
+            parts.append(b.cube(scale=(0.05, 0.05, 0.8), location=(x, y, 0.4)))
 
     # Roof
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    roof = bpy.context.active_object
-    roof.scale = (0.7, 0.7, 0.05)
-    roof.location = (0, 0, 1.65)
-    apply_transforms(roof)
-    parts.append(roof)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    box.select_set(True)
-    bpy.context.view_layer.objects.active = box
-    bpy.ops.object.join()
+    parts.append(b.cube(scale=(0.7, 0.7, 0.05), location=(0, 0, 1.65)))
 
-    uv_unwrap(box)
-    return box
+    return b.finish("ThermometerShelter", parts)
 
 
-def create_door():
+def create_door(b):
     """Industrial door with frame and handle"""
     # Frame
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    frame = bpy.context.active_object
-    frame.name = "Door"
-    frame.scale = (1.0, 0.15, 2.2)
-    frame.location.z = 1.1
-    apply_transforms(frame)
+    frame = b.cube(scale=(1.0, 0.15, 2.2), location=(0, 0, 1.1))
 
     # Door panel
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    panel = bpy.context.active_object
-    panel.scale = (0.9, 0.05, 2.0)
-    panel.location = (0, -0.06, 1.0)
-    apply_transforms(panel)
+    panel = b.cube(scale=(0.9, 0.05, 2.0), location=(0, -0.06, 1.0))
 
     # Handle
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.03, depth=0.15)
-    handle = bpy.context.active_object
-    handle.location = (0.35, -0.12, 1.0)
-    handle.rotation_euler = (math.pi/2, 0, 0)
-    apply_transforms(handle)
+    handle = b.cylinder(0.03, 0.15, location=(0.35, -0.12, 1.0), rotation=(math.pi/2, 0, 0))
 
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    panel.select_set(True)
-    handle.select_set(True)
-    frame.select_set(True)
-    bpy.context.view_layer.objects.active = frame
-    bpy.ops.object.join()
+    return b.finish("Door", [frame, panel, handle])
 
-    uv_unwrap(frame)
-    return frame
 
-
-def create_desk():
+def create_desk(b):
     """Simple metal desk"""
     # Top surface
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    top = bpy.context.active_object
-    top.name = "Desk"
-    top.scale = (1.5, 0.8, 0.05)
-    top.location.z = 0.75
-    apply_transforms(top)
+    top = b.cube(scale=(1.5, 0.8, 0.05), location=(0, 0, 0.75))
 
     # Legs
     legs = []
     positions = [(-0.65, -0.3), (-0.65, 0.3), (0.65, -0.3), (0.65, 0.3)]
     for x, y in positions:
-        bpy.ops.mesh.primitive_cube_add(size=1)
-        leg = bpy.context.active_object
-        leg.scale = (0.05, 0.05, 0.72)
-        leg.location = (x, y, 0.36)
-        apply_transforms(leg)
-        legs.append(leg)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for leg in legs:
-        leg.select_set(True)
-    top.select_set(True)
-    bpy.context.view_layer.objects.active = top
-    bpy.ops.object.join()
-
-    uv_unwrap(top)
-    return top
-
-
-def create_chair():
+        legs.append(b.cube(scale=(0.05, 0.05, 0.72), location=(x, y, 0.36)))
+
+    return b.finish("Desk", [top] + legs)
+
+
+def create_chair(b):
     """Office/swivel chair"""
     # Seat
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    seat = bpy.context.active_object
-    seat.name = "Chair"
-    seat.scale = (0.5, 0.5, 0.08)
-    seat.location.z = 0.5
-    apply_transforms(seat)
+    seat = b.cube(scale=(0.5, 0.5, 0.08), location=(0, 0, 0.5))
 
     # Back
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    back = bpy.context.active_object
-    back.scale = (0.5, 0.05, 0.5)
-    back.location = (0, 0.22, 0.8)
-    apply_transforms(back)
+    back = b.cube(scale=(0.5, 0.05, 0.5), location=(0, 0.22, 0.8))
 
     # Pole
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.04, depth=0.45)
-    pole = bpy.context.active_object
-    pole.location = (0, 0, 0.25)
-    apply_transforms(pole)
+    pole = b.cylinder(0.04, 0.45, location=(0, 0, 0.25))
 
     # 5-star base
-    parts = [back, pole]
+    parts = [seat, back, pole]
     for i in range(5):
         angle = i * (2 * math.pi / 5)
-        bpy.ops.mesh.primitive_cylinder_add(radius=0.03, depth=0.35)
-        arm = bpy.context.active_object
-        arm.rotation_euler = (0, math.pi/2, angle)
-        arm.location = (0.15 * math.cos(angle), 0.15 * math.sin(angle), 0.03)
-        apply_transforms(arm)
-        parts.append(arm)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    seat.select_set(True)
-    bpy.context.view_layer.objects.active = seat
-    bpy.ops.object.join()
+        parts.append(b.cylinder(0.03, 0.35, location=(0.15 * math.cos(angle), 0.15 * math.sin(angle), 0.03),
+                                rotation=(0, math.pi/2, angle)))
 
-    uv_unwrap(seat)
-    return seat
+    return b.finish("Chair", parts)
 
 
-def create_weather_station_building():
+def create_weather_station_building(b):
     """Main building structure - Arctic research station"""
     # Main body
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    building = bpy.context.active_object
-    building.name = "WeatherStation"
-    building.scale = (8, 6, 3)
-    building.location.z = 1.5
-    apply_transforms(building)
+    building = b.cube(scale=(8, 6, 3), location=(0, 0, 1.5))
 
     # Roof
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    roof = bpy.context.active_object
-    roof.scale = (8.5, 6.5, 0.3)
-    roof.location = (0, 0, 3.15)
-    apply_transforms(roof)
+    roof = b.cube(scale=(8.5, 6.5, 0.3), location=(0, 0, 3.15))
 
     # Windows (3 on front side)
-    parts = [roof]
+    parts = [building, roof]
     for i in range(3):
-        bpy.ops.mesh.primitive_cube_add(size=1)
-        window = bpy.context.active_object
-        window.scale = (1.2, 0.1, 1.0)
-        window.location = (-3 + i * 3, -3.05, 1.8)
-        apply_transforms(window)
-        parts.append(window)
+        parts.append(b.cube(scale=(1.2, 0.1, 1.0), location=(-3 + i * 3, -3.05, 1.8)))
 
     # Door frame
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    door = bpy.context.active_object
-    door.scale = (1.2, 0.2, 2.2)
-    door.location = (0, -3.0, 1.1)
-    apply_transforms(door)
-    parts.append(door)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    building.select_set(True)
-    bpy.context.view_layer.objects.active = building
-    bpy.ops.object.join()
+    parts.append(b.cube(scale=(1.2, 0.2, 2.2), location=(0, -3.0, 1.1)))
 
-    uv_unwrap(building, island_margin=0.01)
-    return building
+    return b.finish("WeatherStation", parts, island_margin=0.01)
 
 
-def create_radio_equipment():
+def create_radio_equipment(b):
     """IMPROVEMENT: Radio transmitter/receiver unit"""
     # Main chassis
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    radio = bpy.context.active_object
-    radio.name = "RadioEquipment"
-    radio.scale = (0.8, 0.4, 0.5)
-    apply_transforms(radio)
+    radio = b.cube(scale=(0.8, 0.4, 0.5))
 
     # Frequency display
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    display = bpy.context.active_object
-    display.scale = (0.3, 0.02, 0.1)
-    display.location = (0.15, -0.19, 0.15)
-    apply_transforms(display)
+    display = b.cube(scale=(0.3, 0.02, 0.1), location=(0.15, -0.19, 0.15))
 
     # Tuning knobs
-    parts = [display]
+    parts = [radio, display]
     for i in range(2):
-        bpy.ops.mesh.primitive_cylinder_add(radius=0.05, depth=0.04)
-        knob = bpy.context.active_object
-        knob.location = (-0.25 + i * 0.2, -0.2, -0.1)
-        knob.rotation_euler = (math.pi/2, 0, 0)
-        apply_transforms(knob)
-        parts.append(knob)
+        parts.append(b.cylinder(0.05, 0.04, location=(-0.25 + i * 0.2, -0.2, -0.1), rotation=(math.pi/2, 0, 0)))
 
     # Antenna mount
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.02, depth=0.3)
-    antenna = bpy.context.active_object
-    antenna.location = (0.35, 0, 0.4)
-    apply_transforms(antenna)
-    parts.append(antenna)
+    parts.append(b.cylinder(0.02, 0.3, location=(0.35, 0, 0.4)))
 
     # Speaker grille (simplified as cube)
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    grille = bpy.context.active_object
-    grille.scale = (0.2, 0.02, 0.2)
-    grille.location = (-0.2, -0.19, 0.1)
-    apply_transforms(grille)
-    parts.append(grille)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    radio.select_set(True)
-    bpy.context.view_layer.objects.active = radio
-    bpy.ops.object.join()
+    parts.append(b.cube(scale=(0.2, 0.02, 0.2), location=(-0.2, -0.19, 0.1)))
 
-    uv_unwrap(radio)
-    return radio
+    return b.finish("RadioEquipment", parts)
 
 
-def create_filing_cabinet():
+def create_filing_cabinet(b):
     """IMPROVEMENT: Metal filing cabinet for documents"""
     # Main body
-    bpy.ops.mesh.primitive_cube_add(size=1)
-    cabinet = bpy.context.active_object
-    cabinet.name = "FilingCabinet"
-    cabinet.scale = (0.5, 0.6, 1.3)
-    cabinet.location.z = 0.65
-    apply_transforms(cabinet)
+    cabinet = b.cube(scale=(0.5, 0.6, 1.3), location=(0, 0, 0.65))
 
     # Drawers (3 drawers)
-    parts = []
+    parts = [cabinet]
     for i in range(3):
         # Drawer front
-        bpy.ops.mesh.primitive_cube_add(size=1)
-        drawer = bpy.context.active_object
-        drawer.scale = (0.48, 0.02, 0.38)
-        drawer.location = (0, -0.29, 0.25 + i * 0.42)
-        apply_transforms(drawer)
-        parts.append(drawer)
+        parts.append(b.cube(scale=(0.48, 0.02, 0.38), location=(0, -0.29, 0.25 + i * 0.42)))
 
         # Drawer handle
-        bpy.ops.mesh.primitive_cube_add(size=1)
-        handle = bpy.context.active_object
-        handle.scale = (0.12, 0.02, 0.02)
-        handle.location = (0, -0.32, 0.25 + i * 0.42)
-        apply_transforms(handle)
-        parts.append(handle)
-
-    # Join all parts
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in parts:
-        obj.select_set(True)
-    cabinet.select_set(True)
-    bpy.context.view_layer.objects.active = cabinet
-    bpy.ops.object.join()
+        parts.append(b.cube(scale=(0.12, 0.02, 0.02), location=(0, -0.32, 0.25 + i * 0.42)))
 
-    uv_unwrap(cabinet)
-    return cabinet
+    return b.finish("FilingCabinet", parts)
 
 
-def main():
-    # Parse command line arguments (after --)
+MODELS = [
+    ("control_panel", create_control_panel),
+    ("computer_terminal", create_computer_terminal),
+    ("anemometer", create_anemometer),
+    ("thermometer_shelter", create_thermometer_shelter),
+    ("door", create_door),
+    ("desk", create_desk),
+    ("chair", create_chair),
+    ("weather_station", create_weather_station_building),
+    ("radio_equipment", create_radio_equipment),
+    ("filing_cabinet", create_filing_cabinet),
+]
+
+
+def parse_args():
+    # Inside Blender our arguments come after --; run directly, they are all ours
+    in_blender = 'bpy' in sys.modules
     argv = sys.argv
     if "--" in argv:
         argv = argv[argv.index("--") + 1:]
-    else:
+    elif in_blender:
         argv = []
+    else:
+        argv = argv[1:]
+
+    parser = argparse.ArgumentParser(description='SIGNAL LOST 3D Model Generator')
+    parser.add_argument('--output', '-o', default='assets/models', help='Output directory')
+    parser.add_argument('--backend', choices=BACKENDS, default='blender' if in_blender else 'native',
+                        help='Build meshes natively with NumPy, or with bpy inside Blender '
+                             '(default: blender when run by Blender, else native)')
+    parser.add_argument('--models', help='Comma-separated models to build (default: all)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Worker processes to shard the models over, 0 = one per CPU (default: 1)')
+    parser.add_argument('--blender', default='blender', help='Blender executable for blender workers')
+    parser.add_argument('--report', help='Write per-model build times (seconds) to this JSON file')
+    parser.add_argument('--lods', default=DEFAULT_LODS,
+                        help=f'Comma-separated triangle fractions for LOD1, LOD2, ..., or none '
+                             f'(default: {DEFAULT_LODS})')
+    parser.add_argument('--lod-files', choices=LOD_FILES, default='embedded',
+                        help='LOD levels as nodes of the model GLB, or as name_lodN.glb siblings')
+    parser.add_argument('--lod-pixels', type=float, default=mesh_lod.PIXEL_ERROR,
+                        help=f'Screen error (pixels at {mesh_lod.SCREEN_HEIGHT}p) a level may show '
+                             f'when it takes over (default: {mesh_lod.PIXEL_ERROR})')
+    parser.add_argument('--instancing', choices=INSTANCING, default='none',
+                        help='Share identical parts of a model as one mesh placed by nodes, or by '
+                             'EXT_mesh_gpu_instancing (native backend; default: none)')
+    parser.add_argument('--scene', metavar='LAYOUT',
+                        help='Also write a scene GLB placing models as instances, from a layout in '
+                             'tools/layouts (e.g. station) or a JSON file')
+    parser.add_argument('--force', metavar='MODELS', nargs='?', const='all', default='',
+                        help='Rebuild these comma-separated models (or all, without a value) even if '
+                             f'{MANIFEST} says they are up to date')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Rebuild every model and leave {MANIFEST} untouched')
+    parser.add_argument('--stats', help=f'Geometry stats of every model, compared with and then replacing '
+                                        f'the last run\'s (default: OUTPUT/{STATS}; none to skip the checks)')
+    parser.add_argument('--budget', default=DEFAULT_BUDGET,
+                        help='Per-model vertex, triangle, material, UV island and byte limits '
+                             '(default: tools/model_budgets.json; none for no limits)')
+    parser.add_argument('--max-regression', type=float, default=model_stats.MAX_REGRESSION,
+                        help='Fail if a model\'s stats grew by more than this fraction since the last '
+                             f'run (default: {model_stats.MAX_REGRESSION})')
+    parser.add_argument('--accept-stats', action='store_true',
+                        help='Record the stats as the new baseline even where they regressed')
+    args = parser.parse_args(argv)
+
+    known = [name for name, _ in MODELS]
+    args.models = args.models.split(',') if args.models else known
+    unknown = [name for name in args.models if name not in known]
+    if unknown:
+        parser.error(f"unknown model(s) {', '.join(unknown)}; choose from {', '.join(known)}")
+    args.force = known if args.force == 'all' else [name for name in args.force.split(',') if name]
+    unknown = [name for name in args.force if name not in known]
+    if unknown:
+        parser.error(f"--force: unknown model(s) {', '.join(unknown)}; choose from {', '.join(known)}")
+    args.jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    try:
+        args.lods = [] if args.lods == 'none' else sorted((float(r) for r in args.lods.split(',')), reverse=True)
+    except ValueError:
+        parser.error(f"--lods expects fractions like {DEFAULT_LODS}, or none")
+    if any(not 0 < r < 1 for r in args.lods):
+        parser.error("--lods fractions must be between 0 and 1")
+    if in_blender and args.jobs > 1:
+        parser.error("--jobs launches its own Blender workers; run it with python3, not inside Blender")
+    if args.backend == 'blender' and (args.instancing != 'none' or args.scene):
+        parser.error("--instancing and --scene need the native backend")
+    args.stats = args.stats or os.path.join(args.output, STATS)
+    args.in_blender = in_blender
+    return args
+
+
+def build(args, names):
+    """Build the named models in this process; returns {name: seconds}"""
+    backend = BlenderBackend() if args.backend == 'blender' else NativeBackend(args.instancing)
+    models = [(name, func) for name, func in MODELS if name in names]
+    timings = {}
+    for i, (name, func) in enumerate(models):
+        print(f"  [{i+1}/{len(models)}] Generating {name}...")
+        start = time.perf_counter()
+        backend.clear()
+        model = func(backend)
+        path = f"{args.output}/{name}.glb"
+        if args.lods:
+            chain = backend.lod_chain(model, args.lods)
+            levels = mesh_lod.plan([geometry for _, *geometry in chain], args.lod_pixels)
+            levels = [(chain[i][0], info) for i, info in levels]
+            backend.export(model, path, levels, args.lod_files == 'siblings')
+            with open(lod_report_path(args.output, name), 'w') as f:
+                json.dump({'model': name, 'pixel_error': args.lod_pixels,
+                           'screen_height': mesh_lod.SCREEN_HEIGHT, 'fov': mesh_lod.FOV,
+                           'levels': [info for _, info in levels]}, f, indent=2)
+        else:
+            backend.export(model, path)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+@functools.lru_cache(maxsize=None)
+def exporter_version(backend):
+    """Hash of the backend class and the mesh, LOD and glTF modules it
+    builds and writes models with"""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(BlenderBackend if backend == 'blender' else NativeBackend).encode())
+    for module in ('mesh_builder.py', 'mesh_lod.py', 'gltf_io.py'):
+        with open(os.path.join(TOOLS_DIR, module), 'rb') as f:
+            digest.update(module.encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+def output_params(args):
+    """The options that shape a model's files"""
+    return {'backend': args.backend, 'lods': args.lods, 'lod_files': args.lod_files,
+            'lod_pixels': args.lod_pixels, 'instancing': args.instancing}
+
+
+def model_key(func, args):
+    """Hash of what a model's files are made from: its builder's source,
+    the options that shape its output and the exporter"""
+    payload = json.dumps({
+        'builder': inspect.getsource(func),
+        'params': output_params(args),
+        'exporter': exporter_version(args.backend),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_manifest(output_dir):
+    """{name: entry} of the models last built into output_dir"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('models', {})
+
+
+def save_manifest(output_dir, entries):
+    """Write the manifest atomically"""
+    fd, tmp = tempfile.mkstemp(dir=output_dir, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'models': entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(output_dir, MANIFEST))
+
+
+def up_to_date(entry, key, output_dir):
+    """Whether a manifest entry was built with this key and its files are all still there"""
+    return (entry is not None and entry['key'] == key
+            and all(os.path.exists(os.path.join(output_dir, name)) for name in entry['files']))
+
+
+def model_files(output_dir, name, started):
+    """Files of a model (GLB, LOD siblings and report) written since `started`"""
+    return sorted(
+        path for path in os.listdir(output_dir)
+        if (path == f"{name}.glb" or path == f"{name}_lod.json"
+            or (path.startswith(f"{name}_lod") and path.endswith('.glb')
+                and path[len(name) + 4:-4].isdigit()))
+        and os.path.getmtime(os.path.join(output_dir, path)) >= int(started))
+
+
+def lod_report_path(output_dir, name):
+    return f"{output_dir}/{name}_lod.json"
+
+
+def print_lod_report(args):
+    """Triangles, reduction, error and switch distance of each model's levels"""
+    print("\n  LOD chains: triangles (reduction, error, from distance)")
+    for name in args.models:
+        with open(lod_report_path(args.output, name)) as f:
+            levels = json.load(f)['levels']
+        cells = [f"{levels[0]['triangles']}"] + [
+            f"{level['triangles']} (-{level['reduction']:.0%}, {level['error'] * 1000:.1f} mm, "
+            f"{level['visibility_range_begin']:.1f} m)" for level in levels[1:]]
+        print(f"    {name:20s} " + " | ".join(cells))
+
+
+def check_stats(args):
+    """Measure each model's exported files, print the stats and check them
+    against its budget and the last run's (recorded with the same options);
+    returns the problems. Stats that pass, or --accept-stats, become the
+    baseline for their state (plain or optimized by optimize_glb.py);
+    the other state's baseline is kept."""
+    try:
+        with open(args.stats) as f:
+            recorded = json.load(f)['models']
+    except (OSError, ValueError, KeyError):
+        recorded = {}
+    try:
+        default, budgets = model_stats.load_budgets(args.budget) if args.budget != 'none' else ({}, {})
+    except (OSError, ValueError) as e:
+        sys.exit(f"Error: could not read budget file: {e}")
+    params = output_params(args)
+
+    print("\n  Geometry: vertices, triangles, UV islands, size (highest share of budget)")
+    problems = []
+    for name in args.models:
+        paths = [f"{args.output}/{name}.glb"]
+        if args.lods:
+            with open(lod_report_path(args.output, name)) as f:
+                levels = json.load(f)['levels']
+            paths += sorted({f"{args.output}/{level['file']}" for level in levels} - set(paths))
+        stats = model_stats.glb_stats(paths)
+        budget = dict(default, **budgets.get(name, {}))
+        entry = recorded.get(name, {})
+        if 'params' in entry:
+            # A single baseline, as recorded before optimized files had their own
+            entry = {model_stats.state(entry): entry}
+        baselines = {key: baseline for key, baseline in entry.items() if baseline['params'] == params}
+        found = model_stats.check(name, stats, budget, baselines, args.max_regression)
+        share = max((stats[metric] / limit for metric, limit in budget.items() if limit), default=0)
+        print(f"    {name:20s} {stats['vertices']:6,} {stats['triangles']:6,} {stats['uv_islands']:4} "
+              f"{stats['bytes'] / 1024:7.1f} KB ({share:.0%}){'  FAILED' if found else ''}")
+        if not found or args.accept_stats:
+            entry[model_stats.state(stats)] = dict(stats, params=params)
+        recorded[name] = entry
+        problems += found
+
+    with open(args.stats, 'w') as f:
+        json.dump({'budget': args.budget, 'max_regression': args.max_regression, 'models': recorded}, f, indent=2)
+    return problems
+
+
+def layout_path(name):
+    """Path of a built-in scene layout, or name itself if it is a file"""
+    if os.path.isfile(name):
+        return name
+    path = os.path.join(LAYOUT_DIR, name + '.json')
+    if not os.path.isfile(path):
+        sys.exit(f"Error: no layout '{name}' in {LAYOUT_DIR}")
+    return path
+
+
+def build_scene(args):
+    """Write the layout's props as one GLB: each model's mesh stored once
+    and placed per prop by nodes or EXT_mesh_gpu_instancing. Layout
+    locations are Z-up meters, rotations XYZ Euler degrees."""
+    with open(layout_path(args.scene)) as f:
+        layout = json.load(f)
+    functions = dict(MODELS)
+    props = layout['props']
+    unknown = sorted({prop['model'] for prop in props} - set(functions))
+    if unknown:
+        sys.exit(f"Error: layout {args.scene} uses unknown model(s) {', '.join(unknown)}")
+
+    backend = NativeBackend()
+    meshes, placements = {}, {}
+    for prop in props:
+        if prop['model'] not in meshes:
+            meshes[prop['model']] = functions[prop['model']](backend)
+        placements.setdefault(prop['model'], []).append(
+            (prop.get('scale', 1.0), [math.radians(a) for a in prop.get('rotation', (0, 0, 0))],
+             prop.get('location', (0, 0, 0))))
+
+    name = layout.get('name', os.path.splitext(os.path.basename(args.scene))[0])
+    instanced, baked = Gltf(), Gltf()
+    instanced_children, baked_children = [], []
+    for model, (node, mesh, _, _) in meshes.items():
+        transforms = [mesh_builder.gltf_transform(*placement) for placement in placements[model]]
+        index = backend._add_mesh(instanced, node, mesh)
+        if args.instancing == 'gpu':
+            instanced.use_extension('EXT_mesh_gpu_instancing')
+            attributes = {key: instanced.add_accessor(np.array(values, dtype=np.float32))
+                          for key, values in zip(('TRANSLATION', 'ROTATION', 'SCALE'), zip(*transforms))}
+            instanced_children.append(instanced.add_node(
+                node, index, root=False, extensions={'EXT_mesh_gpu_instancing': {'attributes': attributes}}))
+        else:
+            for k, (translation, rotation, scale) in enumerate(transforms, 1):
+                instanced_children.append(instanced.add_node(f"{node}_{k}", index, translation, rotation,
+                                                             scale, root=False))
+        # The same props with their geometry baked per copy, for the comparison
+        for k, placement in enumerate(placements[model], 1):
+            copy = mesh.transformed(*placement)
+            baked_children.append(baked.add_node(f"{node}_{k}", backend._add_mesh(baked, f"{node}_{k}", copy),
+                                                 root=False))
+    instanced.add_node(name, children=instanced_children)
+    baked.add_node(name, children=baked_children)
+
+    path = f"{args.output}/{os.path.splitext(os.path.basename(layout_path(args.scene)))[0]}.glb"
+    data, plain = instanced.glb(), baked.glb()
+    with open(path, 'wb') as f:
+        f.write(data)
+    saved = len(plain) - len(data)
+    mode = 'gpu' if args.instancing == 'gpu' else 'nodes'
+    print(f"    Exported: {path} ({len(props)} props instanced from {len(meshes)} meshes by {mode}, "
+          f"{saved:,} bytes saved, {-saved / len(plain):.0%})")
+
+
+def worker_command(args):
+    """Command line that runs this script as a worker, up to its own arguments"""
+    script = os.path.abspath(__file__)
+    if args.backend == 'blender':
+        # --python-exit-code makes an uncaught exception fail the process
+        return [args.blender, '--background', '--factory-startup', '--python-exit-code', '1',
+                '--python', script, '--']
+    return [sys.executable, script]
+
+
+def launch(args, names):
+    """Shard the named models round-robin over args.jobs worker processes
+    and wait for all of them; returns {name: seconds}, or exits if any failed"""
+    jobs = min(args.jobs, len(names))
+    shards = [names[i::jobs] for i in range(jobs)]
+    with tempfile.TemporaryDirectory(prefix='signal_lost_models_') as tmp:
+        workers = []
+        for i, shard in enumerate(shards):
+            report = os.path.join(tmp, f'worker_{i}.json')
+            command = worker_command(args) + [
+                '--backend', args.backend, '--output', os.path.abspath(args.output),
+                '--models', ','.join(shard), '--report', report,
+                '--lods', ','.join(map(str, args.lods)) or 'none', '--lod-files', args.lod_files,
+                '--lod-pixels', str(args.lod_pixels), '--instancing', args.instancing, '--no-cache',
+                '--stats', 'none']
+            print(f"  Worker {i+1}/{jobs}: {', '.join(shard)}")
+            try:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            except OSError as e:
+                for _, _, _, running in workers:
+                    running.kill()
+                sys.exit(f"Error: could not start worker ({command[0]}): {e}")
+            workers.append((i, shard, report, process))
+
+        timings, failed = {}, []
+        for i, shard, report, process in workers:
+            output, _ = process.communicate()
+            if process.returncode == 0 and os.path.exists(report):
+                with open(report) as f:
+                    timings.update(json.load(f))
+                for line in output.splitlines():
+                    if "Exported:" in line:
+                        print(line)
+            else:
+                failed.append(i)
+                print(f"\n  Worker {i+1} failed (exit code {process.returncode}) building {', '.join(shard)}:")
+                for line in output.strip().splitlines()[-20:]:
+                    print(f"    | {line}")
+
+    missing = [name for name in names
+               if name not in timings or not os.path.exists(f"{args.output}/{name}.glb")]
+    if failed or missing:
+        sys.exit(f"\nError: {len(failed)} of {jobs} workers failed; not built: {', '.join(missing)}")
+    return timings
 
-    # Default output directory
-    output_dir = "assets/models"
-
-    # Check for custom output path
-    for i, arg in enumerate(argv):
-        if arg in ["--output", "-o"] and i + 1 < len(argv):
-            output_dir = argv[i + 1]
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    models = [
-        ("control_panel", create_control_panel),
-        ("computer_terminal", create_computer_terminal),
-        ("anemometer", create_anemometer),
-        ("thermometer_shelter", create_thermometer_shelter),
-        ("door", create_door),
-        ("desk", create_desk),
-        ("chair", create_chair),
-        ("weather_station", create_weather_station_building),
-        ("radio_equipment", create_radio_equipment),
-        ("filing_cabinet", create_filing_cabinet),
-    ]
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output, exist_ok=True)
 
     print("\n" + "=" * 50)
     print("  SIGNAL LOST - 3D Model Generator")
     print("=" * 50 + "\n")
 
-    for i, (name, func) in enumerate(models):
-        print(f"  [{i+1}/{len(models)}] Generating {name}...")
-        clear_scene()
-        obj = func()
-        export_glb(obj, f"{output_dir}/{name}.glb")
+    start = time.perf_counter()
+    functions = dict(MODELS)
+    keys = {name: model_key(functions[name], args) for name in args.models}
+    manifest = {} if args.no_cache else load_manifest(args.output)
+    stale = [name for name in args.models if args.no_cache or name in args.force
+             or not up_to_date(manifest.get(name), keys[name], args.output)]
+    for name in args.models:
+        if name not in stale:
+            print(f"  Up to date: {name} (built in {manifest[name]['seconds']:.2f}s)")
+
+    started = time.time()
+    if not stale:
+        timings = {}
+    # Blender models built from plain Python always go through a Blender worker
+    elif args.jobs > 1 or (args.backend == 'blender' and not args.in_blender):
+        timings = launch(args, stale)
+        print()
+        for name in stale:
+            print(f"    {name:24s} {timings[name]:6.2f}s")
+    else:
+        timings = build(args, stale)
+    if not args.no_cache:
+        for name, seconds in timings.items():
+            manifest[name] = {'key': keys[name], 'files': model_files(args.output, name, started),
+                              'seconds': round(seconds, 3)}
+        save_manifest(args.output, manifest)
+    if args.scene:
+        print(f"\n  Generating scene {args.scene}...")
+        build_scene(args)
+    elapsed = time.perf_counter() - start
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(timings, f, indent=2)
+    if args.lods:
+        print_lod_report(args)
+    if args.stats != 'none':
+        problems = check_stats(args)
+        if problems:
+            print("\n  Geometry checks failed:")
+            for problem in problems:
+                print(f"    {problem}")
+            sys.exit(f"\nError: {len(problems)} geometry check(s) failed; raise the budget in {args.budget} "
+                     f"or rerun with --accept-stats if the growth is intended")
 
     print("\n" + "=" * 50)
-    print("  Model generation complete!")
-    print(f"  Output: {output_dir}/")
+    print(f"  Model generation complete! ({args.backend}, {elapsed:.2f}s, "
+          f"{sum(timings.values()):.2f}s of model builds, "
+          f"{len(args.models) - len(timings)} of {len(args.models)} up to date)")
+    print(f"  Output: {args.output}/")
     print("=" * 50 + "\n")
 
 
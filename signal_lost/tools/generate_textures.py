@@ -8,365 +8,793 @@ Improvements:
 - Better error handling and logging
 - Progress indicators
 - Configurable via command line
+- Tiled, disk-backed mode for 8K/16K output (--max-memory, --tile-rows)
+- Resolution-independent float32 gradient noise (texture_noise.py)
+- Content-addressed output cache (texture_cache.py, --cache-dir, --no-cache)
+- Batched seed variants with Texture2DArray export (--variants, --texture-array)
+- Vectorized anti-aliased scratches, spots and cracks (texture_raster.py)
+- Block-compressed DDS output with mip chains (texture_compress.py, --format dds)
+- Channel-packed occlusion/roughness/metallic maps (--pack orm)
+- Per-stage tracing with Chrome/Perfetto trace export (texture_trace.py, --profile)
+- float32 compositing in reused buffers, quantized once (texture_composite.py)
+- Maps encoded on background threads with dev/release presets (texture_encode.py)
+- Materials as JSON recipes compiled to a lazy layer graph (texture_recipe.py, --recipe, --maps)
+- Batch --from-albedo over directories and globs in a process pool, non-square inputs
+- float32 blurs that cost the same at any radius (texture_blur.py)
+- Seamless tileable maps with a seam check (--tileable)
+- Looping CRT static flipbook atlas with metadata (texture_flipbook.py, --static-frames)
 """
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image
 import argparse
+import contextlib
+import glob
+import io
+import json
 import os
+import struct
 import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from texture_blur import gaussian_blur, reach
+from texture_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, TextureCache, code_version, file_digest
+from texture_composite import Compositor
+from texture_compress import CODECS, DdsWriter
+from texture_encode import DEFAULT_WORKERS, ENCODER
+from texture_flipbook import FPS, LAYOUTS, grid, pack, static_frames
+from texture_noise import REFERENCE_SIZE, NoiseField
+from texture_raster import Discs, Segments, crack_tree, rasterize, wrap_around
+from texture_recipe import SOURCE_OPS, LayerGraph, load_recipe, recipe_path
+import texture_trace
+from texture_trace import span, traced
+
+
+# Working set per pixel, from tracemalloc peaks of the float32 compositing
+# path, used to plan --max-memory. Untiled, layers and one map's buffers
+# are in memory at once; tiled, only the band being written (blur halos
+# included) is.
+UNTILED_BYTES_PER_PIXEL = 64
+BAND_BYTES_PER_PIXEL = 128
+MIN_TILE_ROWS = 16
+MEMORY_POLICIES = ('tile', 'fail')
+# Largest allowed ratio of the change across a tileable map's wrap-around
+# edge to the SEAM_PERCENTILE change between neighbouring rows (or
+# columns) inside it: sparse maps have a few busy lines and many flat ones
+SEAM_TOLERANCE = 2.0
+SEAM_PERCENTILE = 95
+
+# Pixels per write() when encoding a whole map
+ENCODE_BLOCK_PIXELS = 1 << 20
+
+# PNG zlib (level, strategy). On Paeth-filtered maps, dev (run-length
+# only) is 2-5x faster than default at about the same size; release is
+# 8-10% smaller and 10-15x slower.
+COMPRESSION_PRESETS = {
+    'dev': (1, zlib.Z_RLE),
+    'default': (6, zlib.Z_DEFAULT_STRATEGY),
+    'release': (9, zlib.Z_FILTERED),
+}
+
+# Draws per pass when skipping past an unrendered uniform layer
+UNIFORM_SKIP_DRAWS = 1 << 20
+
+# Maps packed into the R, G and B channels of orm.png with --pack orm
+ORM_CHANNELS = ('ao', 'roughness', 'metallic')
+
+
+class PngWriter:
+    """Stream rows into an 8-bit grayscale or RGB PNG"""
+
+    def __init__(self, path, width, height, channels, compression='default'):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.bpp = channels
+        self.prev = np.zeros(width * channels, dtype=np.uint8)
+        level, strategy = COMPRESSION_PRESETS[compression]
+        self.compressor = zlib.compressobj(level, strategy=strategy)
+        color_type = {1: 0, 3: 2, 4: 6}[channels]
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self.file.write(struct.pack('>I', len(data)) + tag + data)
+        self.file.write(struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    def write(self, rows):
+        """Append a band shaped (n, width) or (n, width, channels)"""
+        rows = np.ascontiguousarray(rows, dtype=np.uint8).reshape(len(rows), -1)
+
+        # Paeth filter; it only reads raw bytes, so a whole band vectorizes
+        raw = rows.astype(np.int16)
+        up = np.vstack([self.prev[None], rows[:-1]]).astype(np.int16)
+        left = np.zeros_like(raw)
+        left[:, self.bpp:] = raw[:, :-self.bpp]
+        upleft = np.zeros_like(raw)
+        upleft[:, self.bpp:] = up[:, :-self.bpp]
+        p = left + up - upleft
+        pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - upleft)
+        pred = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 4
+        filtered[:, 1:] = (raw - pred) & 0xFF
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.prev = rows[-1].copy()
+
+    def close(self):
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+        self.file.close()
+
+
+def map_path(path, texture_format='png'):
+    """Output path of a map in the given format"""
+    return os.path.splitext(path)[0] + '.' + texture_format
+
+
+def map_kind(path, channels):
+    """How a map's mips are filtered: as normals, linear data or sRGB color"""
+    name = os.path.basename(path)
+    if name.startswith('normal'):
+        return 'normal'
+    return 'linear' if channels == 1 or name.startswith('orm') else 'srgb'
+
+
+def seam_ratio(image, axis=0):
+    """How much a map changes across its wrap-around edges, relative to the
+    SEAM_PERCENTILE of the changes between neighbouring lines inside it (at
+    most about 1 when it tiles); rows are on axis, columns on axis + 1"""
+    image = np.asarray(image, dtype=np.float32)
+    ratios = []
+    for a in (axis, axis + 1):
+        lines = np.moveaxis(image, a, 0).reshape(image.shape[a], -1)
+        inside = np.abs(np.diff(lines, axis=0)).mean(axis=1)
+        edge = np.abs(lines[0] - lines[-1]).mean()
+        ratios.append(edge / max(float(np.percentile(inside, SEAM_PERCENTILE)), 1e-3))
+    return float(max(ratios))
+
+
+def open_map_writer(path, width, height, channels, texture_format='png', codec='bc7', layers=1,
+                    compression='default'):
+    """Streaming writer for a map; layers stack vertically in PNG, as an array in DDS"""
+    if texture_format == 'dds':
+        return DdsWriter(path, width, height, channels, map_kind(path, channels), codec, layers)
+    return PngWriter(path, width, height * layers, channels, compression)
+
+
+def write_map(path, image, texture_format='png', codec='bc7', layers=1, compression='default'):
+    """Queue a whole uint8 map (layers stacked top to bottom) on the encode
+    pool; ENCODER.wait() returns once it is on disk. image must not change
+    afterwards."""
+    ENCODER.record(path)
+    ENCODER.submit(_write_map, path, image, texture_format, codec, layers, compression)
+
+
+def write_json(path, data):
+    """Write a set's JSON descriptor, recorded with its maps"""
+    ENCODER.record(path)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _write_map(path, image, texture_format, codec, layers, compression):
+    with span('encode', format=texture_format) as trace:
+        channels = image.shape[2] if image.ndim == 3 else 1
+        writer = open_map_writer(path, image.shape[1], len(image) // layers, channels,
+                                 texture_format, codec, layers, compression)
+        # Whole maps go through in blocks to keep the filter temporaries small
+        step = max(1, ENCODE_BLOCK_PIXELS // image.shape[1])
+        for y in range(0, len(image), step):
+            writer.write(image[y:y + step])
+        writer.close()
+        if trace is not None:
+            trace['bytes'] = os.path.getsize(path)
+
+
+class DiskPlane:
+    """2D array in a scratch file, read and written by row slices.
+
+    Unlike np.memmap the rows never stay mapped into the process, so only
+    the band being worked on counts against the memory ceiling.
+    """
+
+    def __init__(self, path, shape, dtype=np.float64):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = shape[1] * self.dtype.itemsize
+        self.file = open(path, 'w+b')
+        self.file.truncate(shape[0] * self.row_bytes)
+
+    def __getitem__(self, rows):
+        start, stop, _ = rows.indices(self.shape[0])
+        self.file.seek(start * self.row_bytes)
+        data = np.fromfile(self.file, self.dtype, count=(stop - start) * self.shape[1])
+        return data.reshape(stop - start, self.shape[1])
 
+    def __setitem__(self, rows, value):
+        start, stop, _ = rows.indices(self.shape[0])
+        value = np.broadcast_to(np.asarray(value, dtype=self.dtype), (stop - start, self.shape[1]))
+        self.file.seek(start * self.row_bytes)
+        np.ascontiguousarray(value).tofile(self.file)
 
-class TextureGenerator:
-    """Generate procedural textures with PBR maps"""
 
-    def __init__(self, size=1024, seed=None):
-        self.size = size
-        if seed is not None:
-            np.random.seed(seed)
-
-    def noise(self, scale=50, octaves=6):
-        """Generate multi-octave Perlin-like noise"""
-        result = np.zeros((self.size, self.size))
-
-        for octave in range(octaves):
-            freq = 2 ** octave
-            amp = 0.5 ** octave
-            # Calculate grid size, avoiding division by zero
-            divisor = max(1, scale // max(1, freq))
-            grid_size = max(4, min(self.size, self.size // divisor))
-
-            # Generate random grid
-            grid = np.random.rand(grid_size + 1, grid_size + 1)
-
-            # Bilinear upscale
-            try:
-                from scipy.ndimage import zoom
-                factor = self.size / grid_size
-                layer = zoom(grid, factor, order=1)[:self.size, :self.size]
-            except ImportError:
-                # Fallback without scipy
-                layer = np.repeat(np.repeat(grid, self.size // grid_size, axis=0),
-                                  self.size // grid_size, axis=1)[:self.size, :self.size]
-            result += layer * amp
-
-        # Normalize to 0-1
-        result = (result - result.min()) / (result.max() - result.min() + 1e-8)
-        return result
-
-    def scratches(self, count=100):
-        """Generate scratch pattern for worn surfaces"""
-        img = Image.new('L', (self.size, self.size), 0)
-        draw = ImageDraw.Draw(img)
-
-        for _ in range(count):
-            x1 = np.random.randint(0, self.size)
-            y1 = np.random.randint(0, self.size)
-            length = np.random.randint(20, 200)
-            angle = np.random.uniform(0, 2 * np.pi)
-            x2 = int(x1 + length * np.cos(angle))
-            y2 = int(y1 + length * np.sin(angle))
-            intensity = np.random.randint(50, 150)
-            draw.line([(x1, y1), (x2, y2)], fill=intensity, width=np.random.randint(1, 3))
-
-        return np.array(img) / 255.0
+class ByteLayer:
+    """uint8 layer that reads back as float32 in [0, 1]"""
 
-    def spots(self, count=30, size_range=(20, 100)):
-        """Generate circular spots (rust, stains, ice patches)"""
-        img = Image.new('L', (self.size, self.size), 0)
-        draw = ImageDraw.Draw(img)
+    def __init__(self, data):
+        self.data = data
 
-        for _ in range(count):
-            x = np.random.randint(0, self.size)
-            y = np.random.randint(0, self.size)
-            r = np.random.randint(*size_range)
-            intensity = np.random.randint(100, 255)
-            draw.ellipse([x-r, y-r, x+r, y+r], fill=intensity)
+    def __getitem__(self, key):
+        return self.data[key] * np.float32(1 / 255)
 
-        img = img.filter(ImageFilter.GaussianBlur(radius=15))
-        return np.array(img) / 255.0
 
-    def cracks(self, count=15, branching=3):
-        """Generate crack patterns for ice and concrete"""
-        img = Image.new('L', (self.size, self.size), 0)
-        draw = ImageDraw.Draw(img)
+class BatchLayer:
+    """Variants of a layer on a leading axis, sliced by rows like a single layer"""
 
-        def draw_crack(x, y, angle, length, depth):
-            if depth <= 0 or length < 5:
-                return
+    def __init__(self, data):
+        self.data = data
 
-            x2 = int(x + length * np.cos(angle))
-            y2 = int(y + length * np.sin(angle))
-            intensity = 150 + depth * 30
-            draw.line([(x, y), (x2, y2)], fill=min(255, intensity), width=max(1, depth))
+    def __getitem__(self, rows):
+        return self.data[:, rows]
 
-            # Branch occasionally
-            if np.random.random() < 0.3:
-                branch_angle = angle + np.random.uniform(-0.8, 0.8)
-                draw_crack(x2, y2, branch_angle, length * 0.6, depth - 1)
 
-            # Continue main crack with slight deviation
-            new_angle = angle + np.random.uniform(-0.3, 0.3)
-            draw_crack(x2, y2, new_angle, length * 0.85, depth - 1)
+class TextureGenerator:
+    """Generate procedural textures with PBR maps
+
+    Layers are size x size planes that maps read through row slices. When
+    tiled, the planes are scratch files on disk and every map is computed
+    and written one band of rows at a time, so peak RAM follows the band
+    height instead of the texture size.
+
+    Maps are size pixels wide and height (default: size) rows tall; the
+    noise and raster layer sources only work on square textures.
+
+    With variants > 1 the generator runs seeds seed..seed+variants-1 in one
+    pass: layers and maps gain a leading variant axis, and each variant
+    matches a single-seed run of its seed.
+
+    texture_format 'dds' writes block-compressed maps with mip chains
+    instead of PNG; codec picks BC1 or BC7 for color maps. pack='orm'
+    holds back the ao, roughness and metallic maps and writes them as the
+    channels of one orm map in finish(). compression picks the PNG zlib
+    preset (dev, default or release). With maps, only the named maps are
+    written (wants() tells generators which to compute).
+
+    Maps are written on the shared encode pool (texture_encode.ENCODER)
+    while the next one is computed; ENCODER.wait() returns once they are
+    all on disk.
+
+    A set that would not fit max_memory bytes in one pass is tiled, or with
+    memory_policy='fail' refused up front.
+
+    tileable makes every map repeat seamlessly: noise is periodic, raster
+    primitives wrap around the edges, and blurs and normals read across
+    them. finish() fails if a map's wrap-around edge still shows a seam.
+    Tileable sets are generated untiled.
+    """
+
+    def __init__(self, size=1024, seed=None, max_memory=None, tile_rows=None,
+                 variants=1, texture_array=False, texture_format='png', codec='bc7',
+                 pack=None, memory_policy='tile', compression='default', maps=None, height=None,
+                 tileable=False):
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec '{codec}', expected one of {CODECS}")
+        if pack not in (None, 'orm'):
+            raise ValueError(f"unknown packing '{pack}', expected 'orm'")
+        if compression not in COMPRESSION_PRESETS:
+            raise ValueError(f"unknown compression preset '{compression}', "
+                             f"expected one of {tuple(COMPRESSION_PRESETS)}")
+        self.size = size
+        self.height = height or size
+        self.maps = set(maps) if maps else None
+        self.pack = pack
+        self.packed = {}
+        self.ranges = {}
+        self.compose = Compositor()
+        self.texture_format = texture_format
+        self.codec = codec
+        self.compression = compression
+        self.variants = variants
+        self.texture_array = texture_array
+        self.seeds = [seed] if variants == 1 else [seed + k for k in range(variants)]
+        self.rngs = [np.random.RandomState(s) for s in self.seeds]
+        self.rng = self.rngs[0]
+        if memory_policy not in MEMORY_POLICIES:
+            raise ValueError(f"unknown memory policy '{memory_policy}', expected one of {MEMORY_POLICIES}")
+        if tile_rows is None and max_memory is not None:
+            tile_rows = self.plan_tile_rows(size, max_memory, variants, memory_policy, self.height)
+        if tile_rows and variants > 1:
+            raise ValueError("variants are generated untiled; raise the memory ceiling "
+                             "or generate fewer variants per run")
+        if tile_rows and tileable:
+            raise ValueError("tileable maps are generated untiled; raise the memory ceiling "
+                             "or drop --tile-rows")
+        self.tile_rows = min(tile_rows, self.height) if tile_rows else None
+        self.tileable = tileable
+        self.edges = 'wrap' if tileable else 'reflect'
+        self.seams = {}
+        self.scratch = tempfile.TemporaryDirectory(prefix='texgen-') if self.tile_rows else None
+        self.array_maps = {}
+
+    @staticmethod
+    def plan_tile_rows(size, max_memory, variants=1, memory_policy='tile', height=None):
+        """Band height that fits max_memory bytes, or None if untiled fits"""
+        height = height or size
+        need = variants * size * height * UNTILED_BYTES_PER_PIXEL
+        if need <= max_memory:
+            return None
+        if memory_policy == 'fail':
+            raise ValueError(f"{size}x{height} needs about {need // 2**20 + 1} MB, over the "
+                             f"{max_memory // 2**20} MB memory ceiling")
+        rows = max_memory // (size * BAND_BYTES_PER_PIXEL)
+        if rows < MIN_TILE_ROWS:
+            need = size * BAND_BYTES_PER_PIXEL * MIN_TILE_ROWS
+            raise ValueError(f"memory ceiling too small for {size}x{height}, "
+                             f"need at least {need // 2**20 + 1} MB")
+        return min(rows, height)
+
+    def bands(self, halo=0):
+        """Yield (rows, crop) per band: rows is padded by halo on both sides,
+        crop selects the band's own rows from a result computed over rows"""
+        step = self.tile_rows or self.height
+        for y0 in range(0, self.height, step):
+            y1 = min(y0 + step, self.height)
+            h0, h1 = max(0, y0 - halo), min(self.height, y1 + halo)
+            yield slice(h0, h1), slice(y0 - h0, y1 - h0)
+
+    def plane(self, shape=None, dtype=np.float32):
+        """Allocate a layer, backed by a scratch file when tiled"""
+        shape = shape or (self.height, self.size)
+        if self.scratch is None:
+            return np.zeros(shape, dtype=dtype)
+        fd, path = tempfile.mkstemp(dir=self.scratch.name, suffix='.raw')
+        os.close(fd)
+        return DiskPlane(path, shape, dtype)
+
+    def save(self, path, band_fn, halo=0):
+        """Write the uint8 map produced by band_fn(rows) to a PNG (or DDS).
+
+        band_fn gets a row slice (padded by halo for neighbourhood ops such
+        as height_to_normal) and returns that many rows of the map.
+        """
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if not self.wants(stem):
+            return
+        if self.pack == 'orm' and stem in ORM_CHANNELS:
+            self.packed[stem] = (band_fn, halo)
+            return
+        if stem != 'orm':
+            band_fn = self._track(stem, band_fn)
+        path = map_path(path, self.texture_format)
+        with span(f"map.{stem}"):
+            self._save(path, band_fn, halo)
+        self.compose.release()
+
+    def wants(self, name):
+        """Whether the map called name is written"""
+        return self.maps is None or name in self.maps or (name == 'orm' and self.pack == 'orm')
+
+    def _save(self, path, band_fn, halo):
+        if self.variants > 1:
+            with span('compute'):
+                maps = band_fn(slice(0, self.height))
+            self._save_variants(path, maps)
+            return
+        if not self.tile_rows:
+            with span('compute'):
+                image = band_fn(slice(0, self.height))
+            self.write_map(path, image)
+            return
+
+        def open_writer(band):
+            channels = band.shape[2] if band.ndim == 3 else 1
+            return open_map_writer(path, self.size, self.height, channels, self.texture_format,
+                                   self.codec, compression=self.compression)
+
+        # Bands are encoded in order in the background while the next is computed
+        ENCODER.record(path)
+        writer = ENCODER.stream(open_writer, format=self.texture_format)
+        try:
+            for rows, crop in self.bands(halo):
+                with span('compute', rows=rows.stop - rows.start):
+                    writer.write(band_fn(rows)[crop])
+        finally:
+            writer.close()
+
+    def _track(self, name, band_fn):
+        """Wrap band_fn to record the value range of the map it produces (and,
+        tileable, how visible its seams are)"""
+        def tracked(rows):
+            band = band_fn(rows)
+            lo, hi = self.ranges.get(name, (255, 0))
+            self.ranges[name] = (min(lo, int(band.min())), max(hi, int(band.max())))
+            if self.tileable:
+                self.seams[name] = seam_ratio(band, 1 if self.variants > 1 else 0)
+            return band
+        return tracked
+
+    def constants(self, names=None):
+        """Maps written so far that hold one value everywhere, as {name: value in [0, 1]}"""
+        return {name: lo / 255.0 for name, (lo, hi) in self.ranges.items()
+                if lo == hi and (names is None or name in names)}
+
+    def _save_orm(self, output_dir):
+        """Write the held-back maps as orm.png (R = ao, G = roughness, B = metallic)"""
+        channels = [self._track(name, self.packed[name][0]) for name in ORM_CHANNELS]
+        halo = max(self.packed[name][1] for name in ORM_CHANNELS)
+        self.save(os.path.join(output_dir, 'orm.png'),
+                  lambda rows: np.stack([fn(rows) for fn in channels], axis=-1), halo)
+
+        name = map_path('orm.png', self.texture_format)
+        descriptor = {
+            'texture': self.array_maps.get('orm', name),
+            'channels': dict(zip('rgb', ORM_CHANNELS)),
+            'constants': self.constants(ORM_CHANNELS),
+            'godot': {'material': 'ORMMaterial3D', 'orm_texture': self.array_maps.get('orm', name)},
+        }
+        write_json(os.path.join(output_dir, 'orm.json'), descriptor)
+
+    def write_map(self, path, image, layers=1):
+        write_map(path, image, self.texture_format, self.codec, layers, self.compression)
+
+    def _save_variants(self, path, maps):
+        """Write a stack of variant maps as one array image or per-variant files"""
+        directory, name = os.path.split(path)
+        stem, ext = os.path.splitext(name)
+        if self.texture_array:
+            # PNG layers are stacked top to bottom, as Godot's Texture2DArray
+            # importer slices them; DDS stores a real array
+            array_name = f"{stem}_array{ext}"
+            self.write_map(os.path.join(directory, array_name), maps.reshape((-1,) + maps.shape[2:]),
+                           layers=self.variants)
+            self.array_maps[stem] = array_name
+            return
+        for k, variant in enumerate(maps):
+            variant_dir = os.path.join(directory, 'variants', f"{k:02d}")
+            os.makedirs(variant_dir, exist_ok=True)
+            self.write_map(os.path.join(variant_dir, name), variant)
+
+    def finish(self, output_dir):
+        """Write the packed ORM map and texture-array manifest, if any, and
+        report maps that could be scalar material parameters"""
+        if self.packed:
+            self._save_orm(output_dir)
+        for name, value in sorted(self.constants().items()):
+            print(f"    Constant {name} = {value:.2f} (could be a scalar material parameter)")
+        if self.seams:
+            self._check_seams()
+        if not self.array_maps:
+            return
+        layout = {
+            'layers': self.variants,
+            'layer_size': [self.size, self.height],
+            'layout': 'dds_array' if self.texture_format == 'dds' else 'vertical',
+            'seeds': self.seeds,
+            'maps': self.array_maps,
+        }
+        if self.texture_format == 'png':
+            layout['godot_import'] = {'importer': '2d_array_texture',
+                                      'slices/horizontal': 1, 'slices/vertical': self.variants}
+        write_json(os.path.join(output_dir, 'texture_array.json'), layout)
+
+    def _check_seams(self):
+        """Report the worst seam; raise if any map does not tile"""
+        worst = max(self.seams, key=self.seams.get)
+        print(f"    Seams: worst {worst} at {self.seams[worst]:.2f}x the interior change "
+              f"({SEAM_PERCENTILE}th percentile)")
+        seams = [f"{name} ({ratio:.2f}x)" for name, ratio in sorted(self.seams.items())
+                 if ratio > SEAM_TOLERANCE]
+        if seams:
+            raise RuntimeError(f"maps do not tile: {', '.join(seams)} over {SEAM_TOLERANCE}x")
+
+    def source(self, op, **params):
+        """Draw the random parameters of a noise, scratches, spots, cracks or
+        uniform layer now; returns a function that renders the layer later.
+
+        Drawing every layer's parameters up front, in order, gives each layer
+        the same values whichever of them end up being rendered.
+        """
+        if op not in SOURCE_OPS:
+            raise ValueError(f"unknown layer source '{op}', expected one of {SOURCE_OPS}")
+        if self.height != self.size:
+            raise ValueError(f"'{op}' layers need a square texture, not {self.size}x{self.height}")
+        render = getattr(self, f"_{op}_source")(**params)
+
+        def traced_render():
+            with span(op):
+                return render()
+        return traced_render
+
+    def noise(self, scale=50, octaves=6, kind='fbm'):
+        """Generate multi-octave gradient noise (fbm, ridged or turbulence) in [0, 1]
+
+        Features are `scale` pixels wide at 1024 px and keep their place in
+        the texture at other sizes, so a seed looks the same at any resolution.
+        """
+        return self.source('noise', scale=scale, octaves=octaves, kind=kind)()
+
+    def _noise_source(self, scale=50, octaves=6, kind='fbm'):
+        seeds = [rng.randint(2**31) for rng in self.rngs]
+        field = NoiseField(seeds if self.variants > 1 else seeds[0], REFERENCE_SIZE / scale, octaves, kind,
+                           tileable=self.tileable)
+
+        def render():
+            if self.variants > 1:
+                return BatchLayer(field.render(self.size))
+            if not self.tile_rows:
+                return field.render(self.size)
+
+            result = self.plane(dtype=np.float32)
+            for rows, _ in self.bands():
+                result[rows] = field.render(self.size, rows)
+            return result
+        return render
+
+    def _uniform_source(self):
+        """White noise in [0, 1), one draw per pixel in row order"""
+        streams = []
+        for rng in self.rngs:
+            stream = np.random.RandomState()
+            stream.set_state(rng.get_state())
+            streams.append(stream)
+            # Move past this layer's draws, as if it had been rendered now
+            step = max(1, UNIFORM_SKIP_DRAWS // self.size) * self.size
+            for start in range(0, self.size * self.size, step):
+                rng.random_sample(min(step, self.size * self.size - start))
+
+        def render():
+            if self.variants > 1:
+                return BatchLayer(np.stack([
+                    stream.random_sample((self.size, self.size)).astype(np.float32) for stream in streams]))
+            if not self.tile_rows:
+                return streams[0].random_sample((self.size, self.size)).astype(np.float32)
+
+            result = self.plane(dtype=np.float32)
+            for rows, _ in self.bands():
+                result[rows] = streams[0].random_sample((rows.stop - rows.start, self.size))
+            return result
+        return render
+
+    def _draw_source(self, record, blur=0):
+        """Record primitives now; render() rasterizes them into a [0, 1] layer.
+
+        record(rng) returns rasterize() keyword arguments (segment and disc
+        arrays) for one variant. Tiled, each band rasterizes only its own
+        rows, padded by the blur's reach so band edges blur like the full
+        image (exactly for small blurs, to the recursive filter's accuracy
+        for large ones).
+        """
+        shapes = [record(rng) for rng in self.rngs]
+        if self.tileable:
+            shapes = [wrap_around(self.size, self.height, **s) for s in shapes]
+
+        def render():
+            if self.variants > 1:
+                return BatchLayer(np.stack([self._raster(s, blur) for s in shapes]))
+            if not self.tile_rows:
+                return self._raster(shapes[0], blur)
+
+            # Blurred masks stay float32; sharp ones only need bytes
+            layer = self.plane(dtype=np.float32 if blur else np.uint8)
+            for rows, crop in self.bands(halo=reach(blur)):
+                with span('rasterize', rows=rows.stop - rows.start):
+                    band = rasterize(self.size, rows.start, rows.stop - rows.start, **shapes[0])
+                if blur:
+                    band = gaussian_blur(band * np.float32(1 / 255), blur)
+                start = rows.start + crop.start
+                layer[start:start + crop.stop - crop.start] = band[crop]
+            return layer if blur else ByteLayer(layer)
+        return render
+
+    def _raster(self, shapes, blur):
+        """Rasterize shapes into one full-size [0, 1] layer"""
+        with span('rasterize', rows=self.size):
+            mask = rasterize(self.size, 0, self.size, **shapes)
+        mask = mask * np.float32(1 / 255)
+        return gaussian_blur(mask, blur, self.edges) if blur else mask
+
+    def scratches(self, count=100, width=(1, 3)):
+        """Generate scratch pattern for worn surfaces
+
+        width is the (low, high) stroke width range in pixels; strokes are
+        anti-aliased, so fractional widths are fine.
+        """
+        return self.source('scratches', count=count, width=width)()
 
-        for _ in range(count):
-            x = np.random.randint(0, self.size)
-            y = np.random.randint(0, self.size)
-            angle = np.random.uniform(0, 2 * np.pi)
-            draw_crack(x, y, angle, np.random.randint(50, 150), branching)
+    def _scratches_source(self, count=100, width=(1, 3)):
+        def record(rng):
+            x1 = rng.uniform(0, self.size, count)
+            y1 = rng.uniform(0, self.size, count)
+            length = rng.uniform(20, 200, count)
+            angle = rng.uniform(0, 2 * np.pi, count)
+            intensity = rng.randint(50, 150, count)
+            return dict(segments=Segments(x1, y1, x1 + length * np.cos(angle), y1 + length * np.sin(angle),
+                                          rng.uniform(*width, count), intensity))
 
-        return np.array(img) / 255.0
+        return self._draw_source(record)
 
-    def height_to_normal(self, height_map, strength=1.0):
-        """Convert height map to normal map using Sobel-like gradients"""
-        h = height_map.astype(np.float32)
+    def spots(self, count=30, size_range=(20, 100)):
+        """Generate circular spots (rust, stains, ice patches)"""
+        return self.source('spots', count=count, size_range=size_range)()
 
-        # Compute gradients
-        dx = np.zeros_like(h)
-        dy = np.zeros_like(h)
-        dx[:, 1:-1] = (h[:, 2:] - h[:, :-2]) / 2.0
-        dy[1:-1, :] = (h[2:, :] - h[:-2, :]) / 2.0
+    def _spots_source(self, count=30, size_range=(20, 100)):
+        def record(rng):
+            return dict(discs=Discs(rng.uniform(0, self.size, count), rng.uniform(0, self.size, count),
+                                    rng.uniform(*size_range, count), rng.randint(100, 255, count)))
 
-        # Scale gradients
-        dx *= strength
-        dy *= strength
+        return self._draw_source(record, blur=15)
 
-        # Build normal vectors
-        normal = np.zeros((self.size, self.size, 3), dtype=np.float32)
-        normal[:, :, 0] = -dx
-        normal[:, :, 1] = -dy
-        normal[:, :, 2] = 1.0
+    def cracks(self, count=15, branching=3):
+        """Generate crack patterns for ice and concrete"""
+        return self.source('cracks', count=count, branching=branching)()
 
-        # Normalize
-        length = np.sqrt(np.sum(normal ** 2, axis=2, keepdims=True))
-        normal = normal / (length + 1e-8)
+    def _cracks_source(self, count=15, branching=3):
+        def record(rng):
+            x = rng.uniform(0, self.size, count)
+            y = rng.uniform(0, self.size, count)
+            angle = rng.uniform(0, 2 * np.pi, count)
+            length = rng.uniform(50, 150, count)
+            return dict(segments=crack_tree(rng, x, y, angle, length, branching))
 
-        # Convert from [-1,1] to [0,255] (128 = neutral)
-        normal = ((normal + 1.0) * 0.5 * 255).astype(np.uint8)
-        return normal
+        return self._draw_source(record)
 
+    @traced('height_to_normal')
+    def height_to_normal(self, height_map, strength=1.0):
+        """Convert height map to normal map using Sobel-like gradients"""
+        h = np.asarray(height_map, dtype=np.float32)
+        normal = self.compose.buffer('normal', h.shape + (3,))
+
+        # Normal = (-dx, -dy, 1) * strength on x/y from central differences;
+        # the border rows and columns are flat, or tileable, wrap around
+        normal[..., :2] = 0
+        normal[..., 2] = 1
+        np.subtract(h[..., :-2], h[..., 2:], out=normal[..., 1:-1, 0])
+        np.subtract(h[..., :-2, :], h[..., 2:, :], out=normal[..., 1:-1, :, 1])
+        if self.tileable:
+            np.subtract(h[..., -1], h[..., 1], out=normal[..., 0, 0])
+            np.subtract(h[..., -2], h[..., 0], out=normal[..., -1, 0])
+            np.subtract(h[..., -1, :], h[..., 1, :], out=normal[..., 0, :, 1])
+            np.subtract(h[..., -2, :], h[..., 0, :], out=normal[..., -1, :, 1])
+        normal[..., :2] *= strength / 2
+
+        # Normalize, then map [-1, 1] to [0, 1] (0.5 = neutral)
+        length = self.compose.buffer('normal.length', h.shape)
+        np.einsum('...i,...i->...', normal, normal, out=length)
+        np.sqrt(length, out=length)
+        length += 1e-8
+        normal /= length[..., None]
+        normal += 1
+        normal *= 0.5
+        return self.compose.quantize(normal)
+
+    @traced('colorize')
     def colorize(self, value_map, color_dark, color_light):
         """Apply color gradient to grayscale map"""
-        c1 = np.array(color_dark, dtype=np.float32)
-        c2 = np.array(color_light, dtype=np.float32)
-
-        result = np.zeros((self.size, self.size, 3), dtype=np.float32)
-        for i in range(3):
-            result[:, :, i] = value_map * c2[i] + (1 - value_map) * c1[i]
-
-        return result.astype(np.uint8)
-
-
-def generate_rusted_metal(output_dir, size=1024, seed=42):
-    """Generate complete rusted metal PBR texture set"""
-    os.makedirs(output_dir, exist_ok=True)
-    gen = TextureGenerator(size, seed)
-
-    print(f"  Generating rusted metal textures ({size}x{size})...")
-
-    # Generate layers
-    base = gen.noise(scale=100, octaves=4)
-    detail = gen.noise(scale=30, octaves=6)
-    scratches = gen.scratches(count=150)
-    rust = gen.spots(count=40, size_range=(20, 100))
-
-    # ALBEDO
-    albedo = gen.colorize(base * 0.3 + detail * 0.2, (100, 105, 115), (140, 145, 155))
-    rust_color = gen.colorize(rust, (60, 40, 25), (180, 100, 50))
-
-    # Blend rust onto metal
-    for i in range(3):
-        albedo[:, :, i] = (albedo[:, :, i] * (1 - rust * 0.7) +
-                          rust_color[:, :, i] * rust * 0.7).astype(np.uint8)
-
-    # Darken scratches
-    for i in range(3):
-        albedo[:, :, i] = (albedo[:, :, i] * (1 - scratches * 0.3)).astype(np.uint8)
-
-    Image.fromarray(albedo).save(f"{output_dir}/albedo.png")
-
-    # NORMAL
-    height = base * 0.3 + detail * 0.5 + scratches * 0.2
-    normal = gen.height_to_normal(height, strength=2.0)
-    Image.fromarray(normal).save(f"{output_dir}/normal.png")
-
-    # ROUGHNESS
-    roughness = np.ones((size, size)) * 0.4
-    roughness += rust * 0.4
-    roughness -= scratches * 0.15
-    roughness += detail * 0.1
-    roughness = np.clip(roughness, 0, 1)
-    Image.fromarray((roughness * 255).astype(np.uint8)).save(f"{output_dir}/roughness.png")
-
-    # METALLIC
-    metallic = np.ones((size, size)) * 0.95
-    metallic -= rust * 0.9
-    metallic = np.clip(metallic, 0, 1)
-    Image.fromarray((metallic * 255).astype(np.uint8)).save(f"{output_dir}/metallic.png")
-
-    # AO
-    ao = 1.0 - height * 0.3
-    ao = np.clip(ao, 0.5, 1.0)
-    Image.fromarray((ao * 255).astype(np.uint8)).save(f"{output_dir}/ao.png")
-
-    print(f"    Saved to {output_dir}/")
+        return self.compose.quantize(self.compose.gradient('colorize', value_map, color_dark, color_light))
 
 
-def generate_concrete(output_dir, size=1024, seed=123):
-    """Generate concrete PBR texture set"""
+def generate_recipe(output_dir, size=1024, seed=42, recipe=None, **options):
+    """Generate the texture set described by a recipe (built-in name or path,
+    see texture_recipe.py), computing only what the requested maps need"""
+    recipe = load_recipe(recipe)
     os.makedirs(output_dir, exist_ok=True)
-    gen = TextureGenerator(size, seed)
-
-    print(f"  Generating concrete textures ({size}x{size})...")
-
-    base = gen.noise(scale=150, octaves=3)
-    detail = gen.noise(scale=30, octaves=6)
-    cracks = gen.scratches(count=30)
-    stains = gen.spots(count=20, size_range=(50, 150))
-
-    # ALBEDO
-    albedo = gen.colorize(base * 0.5 + detail * 0.3, (130, 130, 125), (175, 175, 170))
-    for i in range(3):
-        albedo[:, :, i] = (albedo[:, :, i] * (1 - stains * 0.25)).astype(np.uint8)
-    Image.fromarray(albedo).save(f"{output_dir}/albedo.png")
+    gen = TextureGenerator(size, seed, **options)
 
-    # NORMAL
-    height = base * 0.2 + detail * 0.4 + cracks * 0.4
-    normal = gen.height_to_normal(height, strength=1.5)
-    Image.fromarray(normal).save(f"{output_dir}/normal.png")
+    print(f"  Generating {recipe['title']} ({size}x{size})...")
+    report_mode(gen)
 
-    # ROUGHNESS (concrete is rough)
-    roughness = np.ones((size, size)) * 0.75 + detail * 0.15
-    roughness = np.clip(roughness, 0, 1)
-    Image.fromarray((roughness * 255).astype(np.uint8)).save(f"{output_dir}/roughness.png")
-
-    # METALLIC (zero for concrete)
-    Image.fromarray(np.zeros((size, size), dtype=np.uint8)).save(f"{output_dir}/metallic.png")
-
-    # AO
-    ao = 1.0 - cracks * 0.4 - stains * 0.15
-    ao = np.clip(ao, 0.4, 1.0)
-    Image.fromarray((ao * 255).astype(np.uint8)).save(f"{output_dir}/ao.png")
+    graph = LayerGraph(recipe, gen)
+    graph.render_sources()
+    for name in graph.maps:
+        band_fn, halo = graph.band_fn(name)
+        gen.save(f"{output_dir}/{name}.png", band_fn, halo)
 
+    gen.finish(output_dir)
     print(f"    Saved to {output_dir}/")
 
 
-def generate_snow(output_dir, size=1024, seed=456):
-    """Generate snow PBR texture set"""
-    os.makedirs(output_dir, exist_ok=True)
-    gen = TextureGenerator(size, seed)
-
-    print(f"  Generating snow textures ({size}x{size})...")
-
-    base = gen.noise(scale=80, octaves=4)
-    sparkle = gen.noise(scale=10, octaves=2)
-    drift = gen.noise(scale=200, octaves=2)
-
-    # ALBEDO (white with subtle blue in shadows)
-    albedo = gen.colorize(base * 0.2 + sparkle * 0.1, (225, 230, 245), (250, 252, 255))
-    shadow = drift * 0.15
-    albedo[:, :, 0] = (albedo[:, :, 0] * (1 - shadow * 0.1)).astype(np.uint8)
-    albedo[:, :, 1] = (albedo[:, :, 1] * (1 - shadow * 0.05)).astype(np.uint8)
-    Image.fromarray(albedo).save(f"{output_dir}/albedo.png")
-
-    # NORMAL
-    height = base * 0.3 + drift * 0.5
-    normal = gen.height_to_normal(height, strength=0.8)
-    Image.fromarray(normal).save(f"{output_dir}/normal.png")
-
-    # ROUGHNESS
-    roughness = 0.5 + base * 0.3 - sparkle * 0.2
-    roughness = np.clip(roughness, 0.3, 0.85)
-    Image.fromarray((roughness * 255).astype(np.uint8)).save(f"{output_dir}/roughness.png")
-
-    # METALLIC
-    Image.fromarray(np.zeros((size, size), dtype=np.uint8)).save(f"{output_dir}/metallic.png")
-
-    # AO
-    ao = 1.0 - drift * 0.15
-    ao = np.clip(ao, 0.7, 1.0)
-    Image.fromarray((ao * 255).astype(np.uint8)).save(f"{output_dir}/ao.png")
-
-    print(f"    Saved to {output_dir}/")
+def generate_rusted_metal(output_dir, size=1024, seed=42, **options):
+    """Generate complete rusted metal PBR texture set"""
+    generate_recipe(output_dir, size, seed, 'rusted_metal', **options)
 
 
-def generate_ice(output_dir, size=1024, seed=789):
-    """Generate glacier ice PBR texture set (IMPROVEMENT: Added this texture type)"""
-    os.makedirs(output_dir, exist_ok=True)
-    gen = TextureGenerator(size, seed)
+def generate_concrete(output_dir, size=1024, seed=123, **options):
+    """Generate concrete PBR texture set"""
+    generate_recipe(output_dir, size, seed, 'concrete', **options)
 
-    print(f"  Generating ice textures ({size}x{size})...")
 
-    base = gen.noise(scale=120, octaves=3)
-    detail = gen.noise(scale=40, octaves=5)
-    cracks = gen.cracks(count=20, branching=4)
-    bubbles = gen.spots(count=80, size_range=(3, 15))
+def generate_snow(output_dir, size=1024, seed=456, **options):
+    """Generate snow PBR texture set"""
+    generate_recipe(output_dir, size, seed, 'snow', **options)
 
-    # ALBEDO (blue-tinted translucent ice)
-    # Ice has a characteristic blue-cyan color
-    albedo = gen.colorize(base * 0.4 + detail * 0.3, (160, 200, 220), (200, 235, 250))
 
-    # Add darker cracks
-    for i in range(3):
-        crack_darkness = cracks * 0.4
-        albedo[:, :, i] = (albedo[:, :, i] * (1 - crack_darkness)).astype(np.uint8)
+def generate_ice(output_dir, size=1024, seed=789, **options):
+    """Generate glacier ice PBR texture set"""
+    generate_recipe(output_dir, size, seed, 'ice', **options)
 
-    # Brighten bubble areas slightly
-    for i in range(3):
-        albedo[:, :, i] = np.clip(albedo[:, :, i] + bubbles * 30, 0, 255).astype(np.uint8)
 
-    Image.fromarray(albedo).save(f"{output_dir}/albedo.png")
+def zero_rows(gen, rows):
+    """Rows of an all-zero uint8 map"""
+    shape = (rows.stop - rows.start, gen.size)
+    if gen.variants > 1:
+        shape = (gen.variants,) + shape
+    return np.zeros(shape, dtype=np.uint8)
 
-    # NORMAL (cracks should be visible)
-    height = base * 0.2 + detail * 0.3 + cracks * 0.5
-    normal = gen.height_to_normal(height, strength=1.8)
-    Image.fromarray(normal).save(f"{output_dir}/normal.png")
 
-    # ROUGHNESS (ice is generally smooth but cracks are rough)
-    roughness = np.ones((size, size)) * 0.15
-    roughness += cracks * 0.5
-    roughness += detail * 0.1
-    roughness = np.clip(roughness, 0.05, 0.7)
-    Image.fromarray((roughness * 255).astype(np.uint8)).save(f"{output_dir}/roughness.png")
+def report_mode(gen):
+    """Log how a generator lays out its work when it isn't a plain single pass"""
+    if gen.tile_rows:
+        bands = -(-gen.height // gen.tile_rows)
+        print(f"    Tiled: {bands} bands of {gen.tile_rows} rows, layers in {gen.scratch.name}")
+    if gen.variants > 1:
+        output = 'texture arrays' if gen.texture_array else 'variants/NN/'
+        print(f"    Variants: seeds {gen.seeds[0]}-{gen.seeds[-1]} -> {output}")
+    if gen.tileable:
+        print(f"    Tileable: noise, shapes, blurs and normals wrap around the edges")
 
-    # METALLIC (ice is not metallic but has high specular)
-    Image.fromarray(np.zeros((size, size), dtype=np.uint8)).save(f"{output_dir}/metallic.png")
 
-    # AO (cracks should be darker)
-    ao = 1.0 - cracks * 0.5 - detail * 0.1
-    ao = np.clip(ao, 0.3, 1.0)
-    Image.fromarray((ao * 255).astype(np.uint8)).save(f"{output_dir}/ao.png")
+def generate_screen_static(output_dir, size=512, seed=321, frames=16, layout='atlas', coherence=0.0,
+                           **options):
+    """Generate CRT static texture, and with frames a looping flipbook of it"""
+    generate_recipe(output_dir, size, seed, 'screen_static', **options)
+    if frames:
+        generate_static_flipbook(output_dir, size, seed, frames, layout, coherence, **options)
 
-    print(f"    Saved to {output_dir}/")
 
+def generate_static_flipbook(output_dir, size=512, seed=321, frames=16, layout='atlas', coherence=0.0,
+                             **options):
+    """Generate static_flipbook.png: frames of animated CRT static in one
+    atlas (or Texture2DArray layers), described by static_flipbook.json.
 
-def generate_screen_static(output_dir, size=512, seed=321):
-    """Generate CRT static texture"""
+    coherence is how many frames the grain persists for (Gaussian sigma
+    along time, 0 = new grain every frame); the loop is seamless either way.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    np.random.seed(seed)
-
-    print(f"  Generating screen static ({size}x{size})...")
-
-    # Random noise
-    static = np.random.rand(size, size)
-
-    # Scanlines
-    scanlines = np.zeros((size, size))
-    scanlines[::2, :] = 0.15
-
-    combined = np.clip(static * 0.85 + scanlines, 0, 1)
-
-    # Green CRT tint (classic terminal look)
-    rgb = np.zeros((size, size, 3), dtype=np.uint8)
-    rgb[:, :, 0] = (combined * 40).astype(np.uint8)
-    rgb[:, :, 1] = (combined * 255).astype(np.uint8)
-    rgb[:, :, 2] = (combined * 60).astype(np.uint8)
-
-    Image.fromarray(rgb).save(f"{output_dir}/static.png")
-    print(f"    Saved to {output_dir}/")
-
-
-def generate_from_albedo(albedo_path, output_dir, strength=1.0):
+    gen = TextureGenerator(size, seed, **options)
+    if not gen.wants('static_flipbook'):
+        return
+    print(f"  Generating static flipbook ({frames} frames of {size}x{size}, {layout})...")
+
+    # Colored like the single static map
+    tint = load_recipe('screen_static')['maps']['static']['value']
+    with span('flipbook', frames=frames):
+        signal = static_frames(np.random.RandomState(seed), size, frames, coherence)
+        rgb = gen.compose.gradient('flipbook', signal, tint['dark'], tint['light'])
+        image = pack(gen.compose.quantize(rgb, floor=True), layout)
+    gen.compose.release()
+
+    name = map_path('static_flipbook.png', gen.texture_format)
+    gen.write_map(os.path.join(output_dir, name), image, layers=frames if layout == 'layers' else 1)
+
+    columns, rows = grid(frames) if layout == 'atlas' else (1, frames)
+    metadata = {
+        'texture': name,
+        'frames': frames,
+        'layout': layout,
+        'columns': columns,
+        'rows': rows,
+        'frame_size': [size, size],
+        'fps': FPS,
+        'coherence': coherence,
+        'seed': seed,
+        'loop': True,
+    }
+    if layout == 'layers' and gen.texture_format == 'png':
+        metadata['godot_import'] = {'importer': '2d_array_texture',
+                                    'slices/horizontal': 1, 'slices/vertical': frames}
+    write_json(os.path.join(output_dir, 'static_flipbook.json'), metadata)
+    print(f"    Saved {name} ({columns}x{rows} frames) to {output_dir}/")
+
+
+def generate_from_albedo(albedo_path, output_dir, strength=1.0, **options):
     """Generate PBR maps from existing albedo texture"""
     os.makedirs(output_dir, exist_ok=True)
 
@@ -378,37 +806,337 @@ def generate_from_albedo(albedo_path, output_dir, strength=1.0):
         print(f"    ERROR: Could not load image: {e}")
         return False
 
-    size = img.size[0]
+    width, height = img.size
     arr = np.array(img)
 
     # Convert to grayscale for height estimation
     gray = np.mean(arr, axis=2) / 255.0
 
-    gen = TextureGenerator(size)
+    gen = TextureGenerator(width, height=height, **options)
 
     # NORMAL from luminance
     normal = gen.height_to_normal(gray, strength=strength)
-    Image.fromarray(normal).save(f"{output_dir}/normal.png")
+    gen.save(f"{output_dir}/normal.png", lambda rows: normal[rows])
 
     # ROUGHNESS (darker = rougher assumption)
     roughness = 1.0 - gray * 0.5
     roughness = np.clip(roughness, 0.2, 0.9)
-    Image.fromarray((roughness * 255).astype(np.uint8)).save(f"{output_dir}/roughness.png")
+    roughness = (roughness * 255).astype(np.uint8)
+    gen.save(f"{output_dir}/roughness.png", lambda rows: roughness[rows])
 
     # METALLIC (assume non-metallic by default)
-    Image.fromarray(np.zeros((size, size), dtype=np.uint8)).save(f"{output_dir}/metallic.png")
+    gen.save(f"{output_dir}/metallic.png", lambda rows: zero_rows(gen, rows))
 
     # AO from local contrast
-    blurred = np.array(Image.fromarray((gray * 255).astype(np.uint8)).filter(
-        ImageFilter.GaussianBlur(radius=size//32))) / 255.0
+    blurred = gaussian_blur(gray, min(width, height)//32, gen.edges)
     ao = 0.5 + (gray - blurred) * 2
     ao = np.clip(ao, 0.3, 1.0)
-    Image.fromarray((ao * 255).astype(np.uint8)).save(f"{output_dir}/ao.png")
+    ao = (ao * 255).astype(np.uint8)
+    gen.save(f"{output_dir}/ao.png", lambda rows: ao[rows])
 
+    gen.finish(output_dir)
     print(f"    Saved to {output_dir}/")
     return True
 
 
+# Inputs picked up from a --from-albedo directory or glob
+ALBEDO_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tga', '.bmp', '.tif', '.tiff', '.webp')
+# Written next to each converted set; marks it for up-to-date checks
+ALBEDO_MANIFEST = 'from_albedo.json'
+
+
+def find_albedo_inputs(pattern):
+    """(image path, relative output subdirectory) pairs for --from-albedo.
+
+    pattern is one image (output straight into the output directory), a
+    directory searched recursively or a glob; batch images each get a
+    subdirectory named after their path below the common parent. Sets a
+    previous batch wrote (marked by ALBEDO_MANIFEST) are not inputs.
+    """
+    if os.path.isfile(pattern):
+        return [(pattern, '')]
+    if os.path.isdir(pattern):
+        paths = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    paths = sorted(path for path in paths
+                   if os.path.splitext(path)[1].lower() in ALBEDO_EXTENSIONS
+                   and not os.path.exists(os.path.join(os.path.dirname(path), ALBEDO_MANIFEST)))
+    if not paths:
+        return []
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [(path, os.path.splitext(os.path.relpath(os.path.abspath(path), base))[0]) for path in paths]
+
+
+def albedo_manifest(albedo_path, options):
+    """What an up-to-date set was made from: the input file, options and tool version"""
+    stat = os.stat(albedo_path)
+    return {'source': os.path.abspath(albedo_path), 'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'options': options, 'code': code_version()}
+
+
+def albedo_up_to_date(albedo_path, output_dir, options):
+    """Whether output_dir holds a complete set made from this input as it is now"""
+    try:
+        with open(os.path.join(output_dir, ALBEDO_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    files = manifest.pop('files', [])
+    return (manifest == json.loads(json.dumps(albedo_manifest(albedo_path, options)))
+            and all(os.path.exists(os.path.join(output_dir, name)) for name in files))
+
+
+def convert_albedo(task, profile=False):
+    """Convert one albedo image for a --from-albedo batch, capturing its log.
+
+    Returns (status, megapixels, seconds, log, error, trace events); status
+    is 'converted', 'skipped' (outputs up to date) or 'failed'.
+    """
+    albedo_path, output_dir, options, force = task
+    log = io.StringIO()
+    error = None
+    status = 'failed'
+    start = time.perf_counter()
+    if profile:
+        texture_trace.start()
+    with contextlib.redirect_stdout(log):
+        try:
+            with Image.open(albedo_path) as img:
+                megapixels = img.size[0] * img.size[1] / 1e6
+            if not force and albedo_up_to_date(albedo_path, output_dir, options):
+                print(f"  Up to date: {output_dir}/")
+                status = 'skipped'
+            else:
+                ENCODER.group = output_dir
+                try:
+                    with span('generate_from_albedo', path=albedo_path):
+                        converted = generate_from_albedo(albedo_path, output_dir, **options)
+                        ENCODER.wait(output_dir)
+                finally:
+                    files = ENCODER.files(output_dir)
+                if converted:
+                    manifest = albedo_manifest(albedo_path, options)
+                    manifest['files'] = sorted(os.path.relpath(path, output_dir) for path in files)
+                    with open(os.path.join(output_dir, ALBEDO_MANIFEST), 'w') as f:
+                        json.dump(manifest, f, indent=2)
+                    status = 'converted'
+        except Exception:
+            megapixels = 0.0
+            error = traceback.format_exc()
+    events = texture_trace.stop() if profile else []
+    return status, megapixels, time.perf_counter() - start, log.getvalue(), error, events
+
+
+def convert_albedo_batch(inputs, output, options, jobs=1, force=False, profile=False,
+                         encode_threads=DEFAULT_WORKERS):
+    """Convert (path, subdirectory) inputs serially or in a process pool and
+    print a throughput report; returns (all succeeded, trace events)"""
+    tasks = [(path, os.path.join(output, subdir) if subdir else output, options, force)
+             for path, subdir in inputs]
+    jobs = min(jobs, len(tasks))
+    start = time.perf_counter()
+    if jobs <= 1:
+        configure_encoder(encode_threads)
+        results = map(convert_albedo, tasks, [profile] * len(tasks))
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=configure_encoder,
+                                       initargs=(encode_threads,))
+        results = executor.map(convert_albedo, tasks, [profile] * len(tasks), chunksize=4)
+
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    megapixels = 0.0
+    events = []
+    try:
+        for status, mp, seconds, log, error, task_events in results:
+            sys.stdout.write(log)
+            if error:
+                print(f"    ERROR: {error}", file=sys.stderr)
+            elif status == 'converted':
+                print(f"    {mp:.1f} MP in {seconds:.2f}s")
+            sys.stdout.flush()
+            counts[status] += 1
+            if status == 'converted':
+                megapixels += mp
+            events += task_events
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n  Batch: {len(tasks)} images | {counts['converted']} converted, "
+          f"{counts['skipped']} up to date, {counts['failed']} failed | Jobs: {max(jobs, 1)}")
+    print(f"  Throughput: {megapixels:.1f} MP in {elapsed:.1f}s = {megapixels / max(elapsed, 1e-9):.1f} MP/s, "
+          f"{counts['converted'] / max(elapsed, 1e-9):.2f} images/s")
+    return counts['failed'] == 0, events
+
+
+# Material sets built by --type all, in output order:
+# (type, subdirectory, generator, seed offset, fixed size or None)
+MATERIALS = [
+    ('metal', 'metal_panel', generate_rusted_metal, 0, None),
+    ('concrete', 'concrete', generate_concrete, 1, None),
+    ('snow', 'snow', generate_snow, 2, None),
+    ('ice', 'ice', generate_ice, 3, None),
+    ('static', 'screen_static', generate_screen_static, 4, 512),
+]
+
+
+def run_material(task, profile=False, wait=True):
+    """Run one material generator, capturing its log output.
+
+    Returns (log, error, trace events, files) so the parent can print each
+    material's log as one block and report failures without losing the
+    worker's output. Events are empty unless profile is set; files are the
+    paths the set wrote, relative to its output directory. The log ends
+    with the material's peak traced memory, checked against max_memory.
+
+    With wait=False the set's last maps may still be encoding on return;
+    finish_writes() waits for them and reports their errors.
+    """
+    func, output_dir, size, seed, options = task
+    log = io.StringIO()
+    error = None
+    tracemalloc.start()
+    if profile:
+        texture_trace.start()
+    ENCODER.group = output_dir
+    with contextlib.redirect_stdout(log):
+        try:
+            with span(func.__name__, size=size, seed=seed):
+                func(output_dir, size, seed, **options)
+                if wait:
+                    ENCODER.wait(output_dir)
+        except Exception:
+            error = traceback.format_exc()
+        files = [os.path.relpath(path, output_dir) for path in ENCODER.files(output_dir)]
+        events = texture_trace.stop() if profile else []
+        # Tracing resets the peak per span; its outermost span holds the total
+        peak = events[-1]['args']['alloc_bytes'] if events else tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report_peak(peak, options.get('max_memory'))
+    return log.getvalue(), error, events, files
+
+
+def report_peak(peak, max_memory=None):
+    """Log a material's peak traced memory and whether it broke the ceiling"""
+    line = f"    Peak memory: {peak / 2**20:.0f} MB"
+    if max_memory:
+        line += f" of {max_memory // 2**20} MB"
+        if peak > max_memory:
+            line += " - over the ceiling"
+    print(line)
+
+
+def finish_writes(output_dir, result):
+    """Wait for a set's queued map writes; a failed write becomes its error"""
+    log, error, events, files = result
+    try:
+        ENCODER.wait(output_dir)
+    except Exception:
+        error = error or traceback.format_exc()
+    return log, error, events, files
+
+
+def run_serially(tasks, profile=False):
+    """run_material over tasks, each set's last maps encoding while the
+    next set computes; yields results in task order"""
+    previous = None
+    for task in tasks:
+        # Traced sets wait for their own writes, so spans stay with their set
+        result = run_material(task, profile, wait=profile)
+        if previous is not None:
+            yield finish_writes(*previous)
+        previous = (task[1], result)
+    if previous is not None:
+        yield finish_writes(*previous)
+
+
+def configure_encoder(workers):
+    """Size this process's encode pool (process pool initializer)"""
+    ENCODER.configure(workers)
+
+
+def run_materials(tasks, jobs=1, profile=False, encode_threads=DEFAULT_WORKERS):
+    """Generate material sets serially or in a process pool.
+
+    Every generator seeds its own RNG, so the pool produces the same files as
+    a serial run. Logs are printed in task order once each task finishes.
+    Each process encodes maps on encode_threads background threads.
+    Returns each task's error traceback (None for tasks that succeeded),
+    the trace events of all tasks and each task's written files.
+    """
+    jobs = min(jobs, len(tasks))
+    profiles = [profile] * len(tasks)
+    if jobs <= 1:
+        configure_encoder(encode_threads)
+        results = run_serially(tasks, profile)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=configure_encoder,
+                                       initargs=(encode_threads,))
+        results = executor.map(run_material, tasks, profiles)
+
+    errors = []
+    events = []
+    written = []
+    try:
+        for log, error, task_events, files in results:
+            sys.stdout.write(log)
+            if error:
+                print(f"    ERROR: {error}", file=sys.stderr)
+            sys.stdout.flush()
+            errors.append(error)
+            events += task_events
+            written.append(files)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return errors, events, written
+
+
+def report_profile(events, path):
+    """Print the per-stage summary and write the Chrome trace"""
+    print(f"\n  Profile ({len(events)} spans):")
+    texture_trace.print_summary(events)
+    texture_trace.save_chrome_trace(path, events)
+    print(f"  Trace written to {path} (open in ui.perfetto.dev or chrome://tracing)")
+
+
+def cache_params(func, options):
+    """Options that shape a set's files, with a recipe file's content hash in
+    place of its path. The tiling options are among them: banded sets can
+    differ slightly where the recursive blur runs per band."""
+    params = dict(options)
+    if 'recipe' in params:
+        params['recipe'] = file_digest(recipe_path(params['recipe']))
+    return dict(params, generator=func.__name__)
+
+
+def fetch_cached(cache, keys, tasks):
+    """Copy cached sets into place; returns the tasks that still need generating"""
+    pending = []
+    for key, task in zip(keys, tasks):
+        func, output_dir, size, seed, options = task
+        if cache.fetch(key, output_dir):
+            print(f"  Cached {func.__name__} ({size}x{size}, seed {seed})")
+            print(f"    Restored to {output_dir}/")
+        else:
+            pending.append((key, task))
+    return pending
+
+
+def store_generated(cache, pending, errors, written):
+    """Add the files each successful task wrote to the cache"""
+    for (key, task), error, names in zip(pending, errors, written):
+        if error:
+            continue
+        func, output_dir, size, seed, options = task
+        cache.store(key, output_dir, sorted(names),
+                    info={'generator': func.__name__, 'size': size, 'seed': seed})
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate PBR textures for SIGNAL LOST',
@@ -417,7 +1145,19 @@ def main():
 Examples:
   python3 generate_textures.py --output assets/textures --size 1024
   python3 generate_textures.py --type metal --size 2048
+  python3 generate_textures.py --size 4096 --jobs 0
+  python3 generate_textures.py --type metal --size 16384 --max-memory 2048
+  python3 generate_textures.py --type concrete --size 512 --variants 16 --texture-array
+  python3 generate_textures.py --size 2048 --format dds --codec bc7
+  python3 generate_textures.py --type concrete --size 512 --tileable
+  python3 generate_textures.py --type static --static-frames 32 --static-coherence 1.5
+  python3 generate_textures.py --type snow --pack orm
+  python3 generate_textures.py --type ice --size 2048 --profile ice_trace.json
+  python3 generate_textures.py --size 4096 --compression release --encode-threads 4
+  python3 generate_textures.py --type ice --maps normal roughness
+  python3 generate_textures.py --recipe my_material.json --size 2048
   python3 generate_textures.py --from-albedo input.png --output output_dir
+  python3 generate_textures.py --from-albedo 'scans/**/*_albedo.jpg' --output pbr --jobs 0
         """
     )
     parser.add_argument('--output', '-o', default='assets/textures',
@@ -427,36 +1167,153 @@ Examples:
     parser.add_argument('--type', '-t',
                         choices=['all', 'metal', 'concrete', 'snow', 'ice', 'static'],
                         default='all', help='Texture type to generate (default: all)')
+    parser.add_argument('--recipe', nargs='+', metavar='PATH',
+                        help='Generate material recipes (see texture_recipe.py) instead of --type; '
+                             'each goes to OUTPUT/<recipe name>')
+    parser.add_argument('--maps', nargs='+', metavar='NAME',
+                        help='Only write these maps (e.g. normal roughness); layers other maps '
+                             'need are not computed')
     parser.add_argument('--seed', type=int, default=42,
                         help='Random seed for reproducibility (default: 42)')
     parser.add_argument('--from-albedo', metavar='PATH',
-                        help='Generate PBR maps from existing albedo texture')
+                        help='Generate PBR maps from an existing albedo texture, or from every '
+                             'image in a directory or glob (one subdirectory each, --jobs in '
+                             'parallel, up-to-date sets skipped unless --no-cache)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Material sets to generate in parallel, 0 = one per CPU (default: 1)')
+    parser.add_argument('--max-memory', type=int, metavar='MB',
+                        help='Memory ceiling per material; larger sets are tiled (default: none)')
+    parser.add_argument('--memory-policy', choices=MEMORY_POLICIES, default='tile',
+                        help='When a set would exceed --max-memory: tile it, or fail before '
+                             'generating anything (default: tile)')
+    parser.add_argument('--tile-rows', type=int, metavar='N',
+                        help='Force tiled generation with bands of N rows')
+    parser.add_argument('--variants', type=int, default=1, metavar='N',
+                        help='Generate N variants (seeds seed..seed+N-1) of each material in one pass')
+    parser.add_argument('--texture-array', action='store_true',
+                        help='With --variants, stack each map into one Texture2DArray image')
+    parser.add_argument('--static-frames', type=int, default=16, metavar='N',
+                        help='Frames in the looping screen static flipbook, 0 = none (default: 16)')
+    parser.add_argument('--static-layout', choices=LAYOUTS, default='atlas',
+                        help='Flipbook frames as an atlas grid or Texture2DArray layers '
+                             '(default: atlas)')
+    parser.add_argument('--static-coherence', type=float, default=0.0, metavar='FRAMES',
+                        help='How many frames static grain persists for, 0 = a new pattern '
+                             'every frame (default: 0)')
+    parser.add_argument('--tileable', action='store_true',
+                        help='Make every map tile seamlessly (periodic noise, wrapped shapes, '
+                             'blurs and normals) and check the seams')
+    parser.add_argument('--format', choices=['png', 'dds'], default='png',
+                        help='Map file format; dds is block-compressed with mips (default: png)')
+    parser.add_argument('--codec', choices=CODECS, default='bc7',
+                        help='Block format for color maps with --format dds (default: bc7)')
+    parser.add_argument('--pack', choices=['orm'],
+                        help='Pack ao/roughness/metallic into the R/G/B channels of orm.png')
+    parser.add_argument('--compression', choices=list(COMPRESSION_PRESETS), default='default',
+                        help='PNG compression: dev is fastest, release smallest (default: default)')
+    parser.add_argument('--encode-threads', type=int, default=DEFAULT_WORKERS, metavar='N',
+                        help='Threads encoding maps while the next is computed, 0 = encode '
+                             f'inline (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--profile', nargs='?', const='texture_profile.json', metavar='PATH',
+                        help='Trace every stage; write a Chrome trace to PATH '
+                             '(default: texture_profile.json) and print a summary')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Output cache location (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // 2**20, metavar='MB',
+                        help='Evict least recently used sets beyond this size (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always regenerate and leave the cache untouched (with --from-albedo: '
+                             'convert even up-to-date sets)')
 
     args = parser.parse_args()
+    if args.encode_threads < 0:
+        parser.error("--encode-threads must be 0 or more")
+    if args.static_frames < 0 or args.static_coherence < 0:
+        parser.error("--static-frames and --static-coherence must be 0 or more")
+
+    output_options = {}
+    if args.format == 'dds':
+        output_options = {'texture_format': 'dds', 'codec': args.codec}
+    if args.pack:
+        output_options['pack'] = args.pack
+    if args.compression != 'default' and args.format == 'png':
+        output_options['compression'] = args.compression
+    if args.tileable:
+        output_options['tileable'] = True
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
     if args.from_albedo:
-        success = generate_from_albedo(args.from_albedo, args.output)
+        inputs = find_albedo_inputs(args.from_albedo)
+        if not inputs:
+            parser.error(f"no images found for --from-albedo {args.from_albedo}")
+        success, events = convert_albedo_batch(inputs, args.output, output_options, jobs, args.no_cache,
+                                               bool(args.profile), args.encode_threads)
+        if args.profile:
+            report_profile(events, args.profile)
         sys.exit(0 if success else 1)
+    options = dict(output_options, tile_rows=args.tile_rows)
+    if args.variants > 1:
+        options.update(variants=args.variants, texture_array=args.texture_array)
+    elif args.texture_array:
+        parser.error("--texture-array needs --variants N with N > 1")
+    if args.max_memory:
+        options.update(max_memory=args.max_memory * 2**20, memory_policy=args.memory_policy)
+    if args.maps:
+        if args.pack and not set(ORM_CHANNELS) <= set(args.maps):
+            parser.error(f"--pack orm needs {', '.join(ORM_CHANNELS)} in --maps")
+        options['maps'] = sorted(set(args.maps))
+    try:
+        TextureGenerator(args.size, args.seed, **options)
+    except ValueError as e:
+        parser.error(str(e))
 
     print(f"\n{'='*50}")
     print(f"  SIGNAL LOST - Texture Generator")
-    print(f"  Size: {args.size}x{args.size} | Seed: {args.seed}")
+    print(f"  Size: {args.size}x{args.size} | Seed: {args.seed} | Jobs: {jobs}")
     print(f"{'='*50}\n")
 
-    if args.type in ['all', 'metal']:
-        generate_rusted_metal(f"{args.output}/metal_panel", args.size, args.seed)
-
-    if args.type in ['all', 'concrete']:
-        generate_concrete(f"{args.output}/concrete", args.size, args.seed + 1)
-
-    if args.type in ['all', 'snow']:
-        generate_snow(f"{args.output}/snow", args.size, args.seed + 2)
-
-    if args.type in ['all', 'ice']:
-        generate_ice(f"{args.output}/ice", args.size, args.seed + 3)
-
-    if args.type in ['all', 'static']:
-        generate_screen_static(f"{args.output}/screen_static", 512, args.seed + 4)
+    if args.recipe:
+        try:
+            recipes = [load_recipe(path) for path in args.recipe]
+            for recipe in recipes:
+                LayerGraph(recipe, TextureGenerator(16, args.seed))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        names = [recipe['name'] for recipe in recipes]
+        tasks = [(generate_recipe, f"{args.output}/{recipe['name']}", args.size, args.seed,
+                  dict(options, recipe=path)) for recipe, path in zip(recipes, args.recipe)]
+    else:
+        selected = [m for m in MATERIALS if args.type in ['all', m[0]]]
+        names = [name for name, *_ in selected]
+        static_options = dict(options, frames=args.static_frames, layout=args.static_layout,
+                              coherence=args.static_coherence)
+        tasks = [(func, f"{args.output}/{subdir}", fixed_size or args.size, args.seed + offset,
+                  static_options if func is generate_screen_static else options)
+                 for name, subdir, func, offset, fixed_size in selected]
+
+    profile = bool(args.profile)
+    if args.no_cache:
+        errors, events, _ = run_materials(tasks, jobs, profile, args.encode_threads)
+    else:
+        cache = TextureCache(args.cache_dir, args.cache_size * 2**20)
+        keys = [cache.key(name, size, seed, cache_params(func, task_options))
+                for name, (func, _, size, seed, task_options) in zip(names, tasks)]
+        pending = fetch_cached(cache, keys, tasks)
+        errors, events, written = run_materials([task for _, task in pending], jobs, profile,
+                                                args.encode_threads)
+        store_generated(cache, pending, errors, written)
+        cache.save()
+        entries, held = cache.stats()
+        print(f"\n  Cache: {len(tasks) - len(pending)} of {len(tasks)} set(s) restored, {entries} held, "
+              f"{held / 2**20:.1f} of {cache.max_bytes // 2**20} MB ({args.cache_dir})")
+
+    if profile:
+        report_profile(events, args.profile)
+
+    if any(errors):
+        print(f"\n  Texture generation failed!")
+        sys.exit(1)
 
     print(f"\n{'='*50}")
     print(f"  Texture generation complete!")
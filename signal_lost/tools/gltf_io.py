@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Binary glTF 2.0 (GLB) output for the SIGNAL LOST model tools
+
+Gltf collects meshes and nodes with their vertex data in one binary
+buffer and writes them as a single .glb: a 12-byte header, the JSON
+chunk and the BIN chunk, each padded to 4 bytes. Accessor types follow
+the NumPy arrays handed in (float32 attributes, uint16 or uint32
+indices, ...), and every bufferView starts 4-byte aligned. read_glb()
+and accessor() read a GLB back, from this module or another exporter.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+
+GLB_MAGIC = b'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+TRIANGLES = 4
+
+COMPONENT_TYPES = {
+    np.dtype(np.int8): 5120,
+    np.dtype(np.uint8): 5121,
+    np.dtype(np.int16): 5122,
+    np.dtype(np.uint16): 5123,
+    np.dtype(np.uint32): 5125,
+    np.dtype(np.float32): 5126,
+}
+ACCESSOR_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4'}
+DTYPES = {code: dtype for dtype, code in COMPONENT_TYPES.items()}
+WIDTHS = {name: width for width, name in ACCESSOR_TYPES.items()}
+
+GENERATOR = 'SIGNAL LOST gltf_io'
+
+
+class Gltf:
+    """A glTF document being built: add_mesh() and add_node(), then write()"""
+
+    def __init__(self, generator=GENERATOR):
+        self.json = {
+            'asset': {'version': '2.0', 'generator': generator},
+            'scene': 0,
+            'scenes': [{'nodes': []}],
+            'nodes': [],
+            'meshes': [],
+            'accessors': [],
+            'bufferViews': [],
+        }
+        self.blobs = []
+        self.length = 0
+
+    def use_extension(self, name, required=False):
+        """Declare an extension the document uses (and needs, if required)"""
+        for key in ('extensionsUsed',) + (('extensionsRequired',) if required else ()):
+            names = self.json.setdefault(key, [])
+            if name not in names:
+                names.append(name)
+
+    def add_view(self, data, target=None, stride=None):
+        """bufferView over data (bytes) appended to the binary buffer"""
+        self.length += -self.length % 4
+        view = {'buffer': 0, 'byteOffset': self.length, 'byteLength': len(data)}
+        if target is not None:
+            view['target'] = target
+        if stride is not None:
+            view['byteStride'] = stride
+        self.blobs.append((self.length, data))
+        self.length += len(data)
+        self.json['bufferViews'].append(view)
+        return len(self.json['bufferViews']) - 1
+
+    def add_accessor(self, array, target=None, normalized=False, bounds=False):
+        """Accessor over a (count,) or (count, n) array in a bufferView of its
+        own; vertex attribute rows are padded to 4 bytes as glTF requires"""
+        array = np.ascontiguousarray(array)
+        if array.dtype not in COMPONENT_TYPES:
+            raise ValueError(f"no glTF component type for {array.dtype}")
+        width = 1 if array.ndim == 1 else array.shape[1]
+        row = width * array.dtype.itemsize
+        if target == ARRAY_BUFFER and row % 4:
+            stride = row + -row % 4
+            padded = np.zeros((len(array), stride), dtype=np.uint8)
+            padded[:, :row] = array.view(np.uint8).reshape(len(array), row)
+            view = self.add_view(padded.tobytes(), target, stride)
+        else:
+            view = self.add_view(array.tobytes(), target)
+        accessor = {
+            'bufferView': view,
+            'componentType': COMPONENT_TYPES[array.dtype],
+            'count': len(array),
+            'type': ACCESSOR_TYPES[width],
+        }
+        if normalized:
+            accessor['normalized'] = True
+        if bounds and len(array):
+            values = array.reshape(len(array), width)
+            accessor['min'] = values.min(axis=0).tolist()
+            accessor['max'] = values.max(axis=0).tolist()
+        self.json['accessors'].append(accessor)
+        return len(self.json['accessors']) - 1
+
+    def add_mesh(self, name, attributes, indices=None):
+        """Mesh of one triangle primitive. attributes maps glTF attribute
+        names (POSITION, NORMAL, TEXCOORD_0, ...) to arrays; indices is
+        narrowed to uint16 when the vertex count allows."""
+        primitive = {'attributes': {}, 'mode': TRIANGLES}
+        for key, array in attributes.items():
+            if array is not None:
+                primitive['attributes'][key] = self.add_accessor(
+                    array, ARRAY_BUFFER, bounds=key == 'POSITION')
+        if indices is not None:
+            count = len(attributes['POSITION'])
+            indices = np.asarray(indices).reshape(-1)
+            indices = indices.astype(np.uint16 if count <= 0xFFFF else np.uint32)
+            primitive['indices'] = self.add_accessor(indices, ELEMENT_ARRAY_BUFFER, bounds=True)
+        self.json['meshes'].append({'name': name, 'primitives': [primitive]})
+        return len(self.json['meshes']) - 1
+
+    def add_node(self, name, mesh=None, translation=None, rotation=None, scale=None,
+                 children=None, extensions=None, extras=None, root=True):
+        """Node (in the scene unless root=False); transforms are glTF's
+        translation, rotation quaternion (x, y, z, w) and scale"""
+        node = {'name': name}
+        for key, value in (('mesh', mesh), ('translation', translation), ('rotation', rotation),
+                           ('scale', scale), ('children', children), ('extensions', extensions),
+                           ('extras', extras)):
+            if value is not None:
+                node[key] = [float(v) for v in value] if key in ('translation', 'rotation', 'scale') \
+                    else value
+        self.json['nodes'].append(node)
+        index = len(self.json['nodes']) - 1
+        if root:
+            self.json['scenes'][0]['nodes'].append(index)
+        return index
+
+    def glb(self):
+        """The document as GLB bytes"""
+        binary = bytearray(self.length + -self.length % 4)
+        for offset, data in self.blobs:
+            binary[offset:offset + len(data)] = data
+        document = dict(self.json)
+        if binary:
+            document['buffers'] = [{'byteLength': len(binary)}]
+        for key in ('meshes', 'accessors', 'bufferViews'):
+            if not document[key]:
+                del document[key]
+        text = json.dumps(document, separators=(',', ':')).encode()
+        text += b' ' * (-len(text) % 4)
+
+        chunks = struct.pack('<II', len(text), CHUNK_JSON) + text
+        if binary:
+            chunks += struct.pack('<II', len(binary), CHUNK_BIN) + bytes(binary)
+        return struct.pack('<4sII', GLB_MAGIC, GLB_VERSION, 12 + len(chunks)) + chunks
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.glb())
+
+
+def read_glb(path):
+    """(JSON document, BIN chunk bytes) of a GLB file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from('<4sII', data)
+    if magic != GLB_MAGIC or version != GLB_VERSION:
+        raise ValueError(f"{path} is not a glTF {GLB_VERSION} binary")
+    document, binary = None, b''
+    offset = 12
+    while offset < min(length, len(data)):
+        size, kind = struct.unpack_from('<II', data, offset)
+        chunk = data[offset + 8:offset + 8 + size]
+        if kind == CHUNK_JSON:
+            document = json.loads(chunk)
+        elif kind == CHUNK_BIN:
+            binary = chunk
+        offset += 8 + size
+    if document is None:
+        raise ValueError(f"{path} has no JSON chunk")
+    return document, binary
+
+
+def accessor(document, binary, index):
+    """Values of an accessor of a read_glb() document, as a (count,) or
+    (count, n) array of its component type"""
+    info = document['accessors'][index]
+    dtype = DTYPES[info['componentType']]
+    width = WIDTHS[info['type']]
+    if 'bufferView' not in info:
+        return np.zeros((info['count'], width) if width > 1 else info['count'], dtype)
+    view = document['bufferViews'][info['bufferView']]
+    stride = view.get('byteStride', width * dtype.itemsize)
+    start = view.get('byteOffset', 0) + info.get('byteOffset', 0)
+    rows = np.ndarray((info['count'], width), dtype, binary, start, (stride, dtype.itemsize))
+    return rows.copy() if width > 1 else rows[:, 0].copy()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+NumPy mesh construction for the SIGNAL LOST model tools
+
+A Mesh is a polygon soup with shared vertex positions: faces are stored
+flat, as every face's vertex loop concatenated (corners) plus the offset
+where each face starts, so normals, transforms, UV projection and
+triangulation are whole-array operations whatever the face sizes.
+
+Primitives match Blender's (cube of a given size, 32-vertex cylinder,
+UV sphere), transforms compose as Blender's object transforms do
+(scale, then XYZ Euler rotation, then location), and box() bevels edges
+like Blender's bevel modifier on a cube. solidify() follows Blender's
+solidify modifier (shell grown inward along vertex normals, rims on open
+edges).
+
+Faces are flat shaded on export: to_arrays() gives every triangle its
+own face normal, as Blender's glTF exporter does for flat faces.
+"""
+
+import math
+
+import numpy as np
+
+
+# Blender's primitive defaults
+CYLINDER_VERTICES = 32
+SPHERE_SEGMENTS = 32
+SPHERE_RINGS = 16
+
+# Weld tolerance for vertices built twice (box face grids meet at edges)
+WELD_DECIMALS = 9
+
+
+class Mesh:
+    """Vertex positions and polygon faces, optionally with UVs per corner.
+
+    positions is (n, 3) float64, corners the concatenated face loops
+    (counter-clockwise seen from outside), offsets (faces + 1) where each
+    loop starts, and uvs None or (len(corners), 2) float32. A mesh made
+    by transformed() keeps its placement as source: (original mesh,
+    scale, rotation, location).
+    """
+
+    def __init__(self, positions, faces=None, corners=None, offsets=None, uvs=None):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if faces is not None:
+            sizes = [len(f) for f in faces]
+            corners = np.fromiter((v for f in faces for v in f), dtype=np.intp, count=sum(sizes))
+            offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.corners = np.asarray(corners, dtype=np.intp)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        self.uvs = uvs
+        self.source = None
+
+    @property
+    def face_count(self):
+        return len(self.offsets) - 1
+
+    def face_sizes(self):
+        return np.diff(self.offsets)
+
+    def face_index(self):
+        """Face of every corner"""
+        return np.repeat(np.arange(self.face_count), self.face_sizes())
+
+    def next_corner(self):
+        """Index of the corner after each one in its face loop"""
+        k = np.arange(len(self.corners)) + 1
+        ends = np.repeat(self.offsets[1:], self.face_sizes())
+        k[k == ends] = self.offsets[:-1][self.face_sizes() > 0]
+        return k
+
+    def transformed(self, scale=(1, 1, 1), rotation=(0, 0, 0), location=(0, 0, 0)):
+        """Copy moved by a Blender-style object transform: scale, then XYZ
+        Euler rotation (radians), then location"""
+        scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), (3,))
+        matrix = euler_matrix(rotation) * scale
+        positions = self.positions @ matrix.T + np.asarray(location, dtype=np.float64)
+        corners = self.corners
+        uvs = self.uvs
+        if np.prod(np.sign(scale)) < 0:
+            # A mirroring scale turns faces inside out; reverse the loops back
+            corners, uvs = self._reversed_loops(corners, uvs)
+        placed = Mesh(positions, corners=corners, offsets=self.offsets, uvs=uvs)
+        placed.source = (self, tuple(scale), tuple(rotation), tuple(location))
+        return placed
+
+    def geometry_key(self):
+        """Hashable key equal for meshes with the same faces and positions"""
+        return (np.round(self.positions, WELD_DECIMALS).tobytes(), self.corners.tobytes(),
+                self.offsets.tobytes())
+
+    def _reversed_loops(self, corners, uvs):
+        starts = np.repeat(self.offsets[:-1], self.face_sizes())
+        ends = np.repeat(self.offsets[1:], self.face_sizes())
+        order = starts + ends - 1 - np.arange(len(corners))
+        return corners[order], None if uvs is None else uvs[order]
+
+    def flipped(self):
+        """Copy with every face turned inside out"""
+        corners, uvs = self._reversed_loops(self.corners, self.uvs)
+        return Mesh(self.positions, corners=corners, offsets=self.offsets, uvs=uvs)
+
+    def face_normals(self, unit=True):
+        """Newell normal of every face (length twice its area unless unit)"""
+        p = self.positions[self.corners]
+        q = self.positions[self.corners[self.next_corner()]]
+        cross = np.cross(p, q)
+        normals = np.add.reduceat(cross, self.offsets[:-1], axis=0) if len(cross) else cross
+        if unit:
+            normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        return normals
+
+    def vertex_normals(self):
+        """Unit average of the normals of the faces around each vertex"""
+        normals = np.zeros_like(self.positions)
+        np.add.at(normals, self.corners, self.face_normals()[self.face_index()])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        return normals
+
+    def boundary_edges(self):
+        """(a, b) vertex pairs of edges used by one face only, in that face's direction"""
+        a, b = self.corners, self.corners[self.next_corner()]
+        keys = np.sort(np.stack([a, b], axis=1), axis=1)
+        _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        once = counts[inverse.reshape(-1)] == 1
+        return a[once], b[once]
+
+    def solidify(self, thickness):
+        """Shell of the given thickness grown inward along vertex normals, as
+        Blender's solidify modifier does: the original faces, the offset
+        copy turned inside out, and a rim on every open edge"""
+        n = len(self.positions)
+        inner = self.positions - self.vertex_normals() * thickness
+        shell = Mesh(inner, corners=self.corners, offsets=self.offsets).flipped()
+        a, b = self.boundary_edges()
+        rim = np.stack([b, a, a + n, b + n], axis=1)
+        return Mesh(np.concatenate([self.positions, inner]),
+                    corners=np.concatenate([self.corners, shell.corners + n, rim.reshape(-1)]),
+                    offsets=np.concatenate([self.offsets, self.offsets[1:] + self.offsets[-1],
+                                            2 * self.offsets[-1] + 4 * np.arange(1, len(a) + 1)]))
+
+    def bounds(self):
+        return self.positions.min(axis=0), self.positions.max(axis=0)
+
+    def triangles(self):
+        """Fan triangulation: (t, 3) corner indices"""
+        sizes = self.face_sizes()
+        count = np.maximum(sizes - 2, 0)
+        first = np.repeat(self.offsets[:-1], count)
+        # k-th triangle of a face is (first, first + k + 1, first + k + 2)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        return np.stack([first, first + k + 1, first + k + 2], axis=1)
+
+    def to_arrays(self, y_up=True):
+        """Flat-shaded triangle arrays for export: (positions, normals, uvs or
+        None, indices), one vertex per face corner. y_up converts Blender's
+        Z-up axes to glTF's Y-up."""
+        positions = self.positions[self.corners]
+        normals = self.face_normals()[self.face_index()]
+        if y_up:
+            positions = positions[:, [0, 2, 1]] * (1, 1, -1)
+            normals = normals[:, [0, 2, 1]] * (1, 1, -1)
+        uvs = None if self.uvs is None else np.asarray(self.uvs, dtype=np.float32)
+        return (positions.astype(np.float32), normals.astype(np.float32), uvs,
+                self.triangles().reshape(-1).astype(np.uint32))
+
+
+def triangle_mesh(positions, triangles):
+    """Mesh of (t, 3) vertex index triangles"""
+    triangles = np.asarray(triangles, dtype=np.intp).reshape(-1, 3)
+    return Mesh(positions, corners=triangles.reshape(-1), offsets=np.arange(len(triangles) + 1) * 3)
+
+
+def quaternion(matrix):
+    """(x, y, z, w) unit quaternion of a 3x3 rotation matrix"""
+    m = matrix
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    if trace > 0:
+        s = 2 * math.sqrt(trace + 1)
+        q = ((m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s, s / 4)
+    elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = 2 * math.sqrt(1 + m[0, 0] - m[1, 1] - m[2, 2])
+        q = (s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s, (m[2, 1] - m[1, 2]) / s)
+    elif m[1, 1] > m[2, 2]:
+        s = 2 * math.sqrt(1 + m[1, 1] - m[0, 0] - m[2, 2])
+        q = ((m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s, (m[0, 2] - m[2, 0]) / s)
+    else:
+        s = 2 * math.sqrt(1 + m[2, 2] - m[0, 0] - m[1, 1])
+        q = ((m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4, (m[1, 0] - m[0, 1]) / s)
+    return np.asarray(q) / np.linalg.norm(q)
+
+
+# Blender's Z-up axes to glTF's Y-up: (x, y, z) -> (x, z, -y), as in to_arrays()
+Y_UP = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=np.float64)
+
+
+def gltf_transform(scale=(1, 1, 1), rotation=(0, 0, 0), location=(0, 0, 0)):
+    """A transformed() placement as glTF node (translation, rotation, scale)
+    in Y-up axes, for meshes exported with to_arrays(y_up=True)"""
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), (3,))
+    return (Y_UP @ np.asarray(location, dtype=np.float64),
+            quaternion(Y_UP @ euler_matrix(rotation) @ Y_UP.T),
+            scale[[0, 2, 1]])
+
+
+def join(meshes):
+    """One mesh holding all of meshes; UVs are kept only if every mesh has them"""
+    meshes = list(meshes)
+    base = np.cumsum([0] + [len(m.positions) for m in meshes[:-1]])
+    corner_base = np.cumsum([0] + [len(m.corners) for m in meshes[:-1]])
+    uvs = None
+    if all(m.uvs is not None for m in meshes):
+        uvs = np.concatenate([m.uvs for m in meshes])
+    return Mesh(np.concatenate([m.positions for m in meshes]),
+                corners=np.concatenate([m.corners + b for m, b in zip(meshes, base)]),
+                offsets=np.concatenate([[0]] + [m.offsets[1:] + b for m, b in zip(meshes, corner_base)]),
+                uvs=uvs)
+
+
+def euler_matrix(rotation):
+    """3x3 rotation of XYZ Euler angles (Blender's default mode): X first"""
+    x, y, z = rotation
+    cx, sx, cy, sy, cz, sz = math.cos(x), math.sin(x), math.cos(y), math.sin(y), math.cos(z), math.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def weld(mesh):
+    """Merge vertices at the same position and drop faces collapsed by it"""
+    keys = np.round(mesh.positions, WELD_DECIMALS)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    first = np.full(len(unique), len(mesh.positions))
+    np.minimum.at(first, inverse, np.arange(len(mesh.positions)))
+    return Mesh(mesh.positions[first], corners=inverse[mesh.corners], offsets=mesh.offsets,
+                uvs=mesh.uvs)
+
+
+def _bevel_samples(half, width, segments):
+    """Coordinates along one axis of a beveled box face: the flat span's
+    ends and, towards each edge, the points where the bevel arc's
+    segments would be cut by the face's quarter of it"""
+    flat = half - width
+    # A face sees the half of each edge's arc up to 45 degrees
+    angles = [k * (math.pi / 2) / segments for k in range(1, segments) if k * 2 < segments]
+    ramp = [flat + width * math.tan(a) for a in angles] + [half] if width > 0 else []
+    return [-x for x in reversed(ramp)] + [-flat, flat] + ramp
+
+
+def box(dimensions=(1, 1, 1), bevel=0.0, segments=1):
+    """Axis-aligned box centered on the origin; bevel rounds every edge and
+    corner with a circular profile of that radius in segments steps, like
+    Blender's bevel modifier (offset width) on a cube. The faces meet at
+    each arc's midpoint, so an odd segment count gains a cut there."""
+    half = np.asarray(np.broadcast_to(dimensions, (3,)), dtype=np.float64) / 2
+    width = min(bevel, *half) if bevel > 0 else 0.0
+    flat = half - width
+    samples = [np.asarray(_bevel_samples(h, width, segments)) for h in half]
+
+    positions, faces = [], []
+    for axis in range(3):
+        b, c = (axis + 1) % 3, (axis + 2) % 3
+        for sign in (1, -1):
+            sb, sc = samples[b], samples[c]
+            grid = np.zeros((len(sb), len(sc), 3))
+            grid[..., axis] = sign * half[axis]
+            grid[..., b] = sb[:, None]
+            grid[..., c] = sc[None, :]
+            base = sum(len(p) for p in positions)
+            positions.append(grid.reshape(-1, 3))
+            index = base + np.arange(len(sb) * len(sc)).reshape(len(sb), len(sc))
+            quads = np.stack([index[:-1, :-1], index[1:, :-1], index[1:, 1:], index[:-1, 1:]], axis=-1)
+            quads = quads.reshape(-1, 4)
+            faces.append(quads if sign > 0 else quads[:, ::-1])
+
+    positions = np.concatenate(positions)
+    if width > 0:
+        # Push each point out from the flat inner box onto the rounded surface
+        inner = np.clip(positions, -flat, flat)
+        offset = positions - inner
+        length = np.linalg.norm(offset, axis=1, keepdims=True)
+        positions = inner + offset / np.maximum(length, 1e-12) * width
+    faces = np.concatenate(faces)
+    return weld(Mesh(positions, corners=faces.reshape(-1), offsets=np.arange(len(faces) + 1) * 4))
+
+
+def cube(size=1.0):
+    """Blender's primitive cube: edge length size"""
+    return box((size, size, size))
+
+
+def cylinder(radius=1.0, depth=2.0, vertices=CYLINDER_VERTICES):
+    """Blender's primitive cylinder: along Z, centered, n-gon caps"""
+    angle = np.arange(vertices) * (2 * math.pi / vertices)
+    ring = np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1)
+    positions = np.concatenate([np.column_stack([ring, np.full(vertices, -depth / 2)]),
+                                np.column_stack([ring, np.full(vertices, depth / 2)])])
+    i = np.arange(vertices)
+    j = (i + 1) % vertices
+    sides = np.stack([i, j, j + vertices, i + vertices], axis=1)
+    faces = list(sides) + [i[::-1], i + vertices]
+    return Mesh(positions, faces)
+
+
+def uv_sphere(radius=1.0, segments=SPHERE_SEGMENTS, ring_count=SPHERE_RINGS):
+    """Blender's primitive UV sphere: poles on Z, triangle fans at the poles"""
+    polar = np.arange(1, ring_count) * (math.pi / ring_count)
+    azimuth = np.arange(segments) * (2 * math.pi / segments)
+    rings = np.stack([np.sin(polar)[:, None] * np.cos(azimuth),
+                      np.sin(polar)[:, None] * np.sin(azimuth),
+                      np.cos(polar)[:, None] * np.ones(segments)], axis=-1).reshape(-1, 3)
+    positions = np.concatenate([[[0, 0, 1]], rings, [[0, 0, -1]]]) * radius
+    bottom = len(positions) - 1
+
+    s = np.arange(segments)
+    t = (s + 1) % segments
+    faces = [np.stack([np.zeros(segments, dtype=np.intp), 1 + s, 1 + t], axis=1)]
+    for r in range(ring_count - 2):
+        a, b = 1 + r * segments, 1 + (r + 1) * segments
+        faces.append(np.stack([a + s, b + s, b + t, a + t], axis=1))
+    last = 1 + (ring_count - 2) * segments
+    faces.append(np.stack([last + t, last + s, np.full(segments, bottom)], axis=1))
+    return Mesh(positions, [f for group in faces for f in group])
+
+
+def box_uv(mesh, margin=0.02, bounds=None):
+    """Box projection into [0, 1]: faces go to one of six cells (a 3 x 2
+    grid, one per axis direction) by their dominant normal, projected at
+    one texel density for the whole mesh, margin apart. bounds (lo, hi)
+    defaults to the mesh's own; pass a full mesh's to project its
+    simplified versions the same way."""
+    normals = mesh.face_normals()
+    axis = np.abs(normals).argmax(axis=1)
+    positive = normals[np.arange(len(normals)), axis] > 0
+    cell = axis * 2 + ~positive
+
+    lo, hi = bounds if bounds is not None else mesh.bounds()
+    extent = max((hi - lo).max(), 1e-12)
+    size = 1 / 3 - 2 * margin
+
+    face = mesh.face_index()
+    p = (mesh.positions[mesh.corners] - lo) / extent
+    a = axis[face]
+    # In-plane axes of each projection, right-handed seen from outside
+    u_axis = np.where(a == 0, 1, 0)
+    v_axis = np.where(a == 2, 1, 2)
+    u = p[np.arange(len(p)), u_axis]
+    v = p[np.arange(len(p)), v_axis]
+    flip = ~positive[face] ^ (a == 1)
+    u = np.where(flip, 1 - u, u)
+
+    # Image rows run down, v up
+    column, row = cell[face] % 3, cell[face] // 3
+    uvs = np.stack([column / 3 + margin + u * size, row / 2 + margin + (1 - v) * size], axis=1)
+    mesh.uvs = uvs.astype(np.float32)
+    return mesh
+
+
+def cylinder_uv(mesh, margin=0.02, bounds=None):
+    """Cylindrical projection around the mesh's vertical (Z) axis: u follows
+    the angle, v the height; faces that straddle the seam are moved onto
+    one side of it. bounds as for box_uv()."""
+    lo, hi = bounds if bounds is not None else mesh.bounds()
+    center = (lo + hi) / 2
+    p = mesh.positions[mesh.corners]
+    u = np.arctan2(p[:, 1] - center[1], p[:, 0] - center[0]) / (2 * math.pi) % 1.0
+    v = (p[:, 2] - lo[2]) / max(hi[2] - lo[2], 1e-12)
+
+    # A face spanning more than half a turn wraps the seam: lift its low side
+    face = mesh.face_index()
+    span = np.maximum.reduceat(u, mesh.offsets[:-1]) - np.minimum.reduceat(u, mesh.offsets[:-1])
+    u = np.where((span[face] > 0.5) & (u < 0.5), u + 1, u)
+    scale = 1 - 2 * margin
+    mesh.uvs = np.stack([margin + u / max(u.max(), 1.0) * scale, margin + (1 - v) * scale],
+                        axis=1).astype(np.float32)
+    return mesh
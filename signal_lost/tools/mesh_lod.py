@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Level-of-detail chains for the SIGNAL LOST model tools
+
+decimate() simplifies a triangle mesh by quadric error edge collapse
+(Garland & Heckbert): every vertex carries the summed plane quadrics of
+its original faces, the cheapest edge is collapsed to the point that
+minimizes them, and snapshots are taken as the triangle count passes
+each target. Collapses that would fold a face over, pinch the surface
+(link condition) or leave two faces on the same vertices are skipped,
+and open edges are never moved.
+
+Switch distances are measured, not guessed: a level's error is the
+symmetric distance between its surface and the full mesh, sampled at
+vertices and face centers, and it takes over where that error projects
+to PIXEL_ERROR pixels on a SCREEN_HEIGHT tall view through a FOV degree
+camera (Godot's default).
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+
+# Projected error, in pixels, allowed when a level takes over
+PIXEL_ERROR = 1.0
+SCREEN_HEIGHT = 1080
+FOV = 75.0
+# Closest switch distance (m): a level with no measurable error still
+# waits until here rather than replacing the full mesh outright
+MIN_SWITCH_DISTANCE = 1.0
+# A kept level's band must end at least this many times past where it
+# begins; a level the next one would replace sooner is dropped
+MIN_RANGE_RATIO = 1.25
+# Collapses may turn a face's normal by up to this angle (cosine)
+MIN_NORMAL_COS = 0.2
+# Points measured against the other surface per block
+DISTANCE_BLOCK = 256
+
+
+def _plane_quadrics(positions, triangles):
+    """(t, 4, 4) quadric of each triangle's plane"""
+    p = positions[triangles]
+    normals = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    planes = np.concatenate([normals, -np.einsum('ij,ij->i', normals, p[:, 0])[:, None]], axis=1)
+    return planes[:, :, None] * planes[:, None, :]
+
+
+def _optimal(quadrics, a, b):
+    """Cost and position of collapsing edges from points a to b, all
+    (k, 3), under their (k, 4, 4) summed quadrics: each quadric's minimum
+    if it lies within the edge's reach, else the best of the ends and
+    midpoint"""
+    middle = (a + b) / 2
+    point = middle.copy()
+    system = quadrics[:, :3, :3]
+    solvable = np.abs(np.linalg.det(system)) > 1e-12
+    if solvable.any():
+        point[solvable] = np.linalg.solve(system[solvable], -quadrics[solvable, :3, 3:])[..., 0]
+    # Nearly flat neighbourhoods solve to far-off points
+    usable = solvable & (np.linalg.norm(point - middle, axis=1) <= np.linalg.norm(b - a, axis=1))
+
+    v = np.ones((len(a), 4, 4))
+    v[:, 0, :3], v[:, 1, :3], v[:, 2, :3], v[:, 3, :3] = a, b, middle, point
+    costs = np.einsum('kci,kij,kcj->kc', v, quadrics, v)
+    costs[~usable, 3] = np.inf
+    best = costs.argmin(axis=1)
+    rows = np.arange(len(a))
+    return np.maximum(costs[rows, best], 0.0), v[rows, best, :3]
+
+
+def _cross(u, v):
+    return np.stack([u[:, 1] * v[:, 2] - u[:, 2] * v[:, 1],
+                     u[:, 2] * v[:, 0] - u[:, 0] * v[:, 2],
+                     u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]], axis=1)
+
+
+def decimate(positions, triangles, targets):
+    """Simplify a mesh with shared vertices down to each target triangle
+    count (largest first); returns (positions, triangles) per target,
+    stopping short where no valid collapse is left"""
+    positions = np.array(positions, dtype=np.float64)
+    faces = [list(map(int, t)) for t in triangles]
+    alive = len(faces)
+    vertex_faces = [set() for _ in range(len(positions))]
+    for f, tri in enumerate(faces):
+        for v in tri:
+            vertex_faces[v].add(f)
+
+    quadrics = np.zeros((len(positions), 4, 4))
+    np.add.at(quadrics, np.asarray(triangles).reshape(-1),
+              np.repeat(_plane_quadrics(positions, np.asarray(triangles)), 3, axis=0))
+
+    edges = np.sort(np.asarray(triangles)[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    unique, counts = np.unique(edges, axis=0, return_counts=True)
+    locked = np.zeros(len(positions), dtype=bool)
+    locked[unique[counts == 1].reshape(-1)] = True
+
+    version = [0] * len(positions)
+    heap = []
+
+    def push(a, b):
+        """Queue collapses of the edges between vertex arrays a and b"""
+        keep = ~(locked[a] | locked[b])
+        a, b = a[keep], b[keep]
+        if len(a):
+            costs, points = _optimal(quadrics[a] + quadrics[b], positions[a], positions[b])
+            for cost, u, v, point in zip(costs.tolist(), a.tolist(), b.tolist(), points):
+                heapq.heappush(heap, (cost, u, v, version[u], version[v], point))
+
+    push(unique[:, 0], unique[:, 1])
+
+    def neighbours(v):
+        return {u for f in vertex_faces[v] for u in faces[f]} - {v}
+
+    def valid(a, b, point):
+        shared = vertex_faces[a] & vertex_faces[b]
+        if len(neighbours(a) & neighbours(b)) != len(shared):
+            return False
+        tris = np.array([faces[f] for f in (vertex_faces[a] | vertex_faces[b]) - shared]).reshape(-1, 3)
+        merged = np.where(tris == b, a, tris)
+        if len({frozenset(tri) for tri in merged.tolist()}) < len(tris):
+            return False
+        before = positions[tris]
+        after = before.copy()
+        after[merged == a] = point
+        n0 = _cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+        n1 = _cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+        length = np.linalg.norm(n0, axis=1) * np.linalg.norm(n1, axis=1)
+        return bool(np.all((length > 1e-18) & (_dot(n0, n1) >= MIN_NORMAL_COS * length)))
+
+    levels = []
+    for target in sorted(targets, reverse=True):
+        while alive > target and heap:
+            cost, a, b, va, vb, point = heapq.heappop(heap)
+            if version[a] != va or version[b] != vb or not valid(a, b, point):
+                continue
+            # Collapse b into a
+            for f in vertex_faces[a] & vertex_faces[b]:
+                for v in faces[f]:
+                    if v not in (a, b):
+                        vertex_faces[v].discard(f)
+                faces[f] = None
+                alive -= 1
+            for f in vertex_faces[b]:
+                if faces[f] is not None:
+                    faces[f] = [a if v == b else v for v in faces[f]]
+                    vertex_faces[a].add(f)
+            vertex_faces[a] = {f for f in vertex_faces[a] if faces[f] is not None}
+            vertex_faces[b] = set()
+            positions[a] = point
+            quadrics[a] += quadrics[b]
+            version[a] += 1
+            version[b] = -1
+            others = np.fromiter(neighbours(a), dtype=np.intp)
+            push(np.full(len(others), a), others)
+        levels.append(_compact(positions, [f for f in faces if f is not None]))
+    return levels
+
+
+def _compact(positions, faces):
+    """Positions and triangles of only the vertices faces use"""
+    triangles = np.array(faces, dtype=np.intp).reshape(-1, 3)
+    used, inverse = np.unique(triangles, return_inverse=True)
+    return positions[used].copy(), inverse.reshape(-1, 3)
+
+
+def _dot(x, y):
+    return np.einsum('ij,ij->i', x, y)
+
+
+def _closest_points(p, a, b, c):
+    """Closest point to each p on triangle (a, b, c), all (k, 3): the
+    Voronoi regions of Ericson, Real-Time Collision Detection 5.1.5"""
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    # Inside the face, then overwritten by edge and vertex regions
+    denom = np.maximum(va + vb + vc, 1e-30)
+    closest = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]
+    regions = [
+        ((va <= 0) & (d4 >= d3) & (d5 >= d6),
+         lambda: b + (c - b) * ((d4 - d3) / np.maximum((d4 - d3) + (d5 - d6), 1e-30))[:, None]),
+        ((vb <= 0) & (d2 >= 0) & (d6 <= 0), lambda: a + ac * (d2 / np.maximum(d2 - d6, 1e-30))[:, None]),
+        ((vc <= 0) & (d1 >= 0) & (d3 <= 0), lambda: a + ab * (d1 / np.maximum(d1 - d3, 1e-30))[:, None]),
+        ((d6 >= 0) & (d5 <= d6), lambda: c),
+        ((d3 >= 0) & (d4 <= d3), lambda: b),
+        ((d1 <= 0) & (d2 <= 0), lambda: a),
+    ]
+    for mask, point in regions:
+        if mask.any():
+            closest = np.where(mask[:, None], point(), closest)
+    return closest
+
+
+def surface_distance(points, positions, triangles):
+    """Distance from each point to the nearest triangle. Only triangles
+    whose bounding box is closer than the nearest triangle center are
+    measured exactly."""
+    corners = positions[triangles]
+    lo, hi, centers = corners.min(axis=1), corners.max(axis=1), corners.mean(axis=1)
+    lo32, hi32 = lo.astype(np.float32), hi.astype(np.float32)
+    out = np.empty(len(points))
+    for start in range(0, len(points), DISTANCE_BLOCK):
+        p = points[start:start + DISTANCE_BLOCK]
+        # Squared distance to the nearest center, expanded to use a matrix product
+        upper = (np.sum(p ** 2, axis=1)[:, None] - 2 * p @ centers.T + np.sum(centers ** 2, axis=1)).min(axis=1)
+        p32 = p.astype(np.float32)[:, None]
+        gap = np.maximum(np.maximum(lo32 - p32, p32 - hi32), 0)
+        lower = np.einsum('ijk,ijk->ij', gap, gap)
+        # Slack for the rounding of both bounds
+        i, j = np.nonzero(lower <= upper[:, None] * (1 + 1e-4) + 1e-9)
+        q = p[i] - _closest_points(p[i], corners[j, 0], corners[j, 1], corners[j, 2])
+        best = np.full(len(p), np.inf)
+        np.minimum.at(best, i, _dot(q, q))
+        out[start:start + DISTANCE_BLOCK] = np.sqrt(best)
+    return out
+
+
+def _samples(positions, triangles):
+    return np.concatenate([positions, positions[triangles].mean(axis=1)])
+
+
+def error(full, level):
+    """Symmetric sampled distance between two (positions, triangles) surfaces"""
+    if len(level[1]) == 0:
+        return float(np.ptp(full[0], axis=0).max())
+    return float(max(surface_distance(_samples(*level), *full).max(),
+                     surface_distance(_samples(*full), *level).max()))
+
+
+def switch_distance(error, pixels=PIXEL_ERROR):
+    """Camera distance at which error (m) projects to pixels"""
+    return error * SCREEN_HEIGHT / (2 * math.tan(math.radians(FOV) / 2) * pixels)
+
+
+def screen_coverage(radius, distance):
+    """Fraction of the view height a bounding sphere fills at distance"""
+    if distance <= 0:
+        return 1.0
+    return min(radius / (distance * math.tan(math.radians(FOV) / 2)), 1.0)
+
+
+def plan(chain, pixels=PIXEL_ERROR):
+    """Levels worth keeping from chain, a list of (positions, triangles)
+    with the full mesh first. Returns (index, info) per kept level, info
+    holding triangles, reduction, error and the Godot visibility range
+    (end 0 = unbounded) and minimum screen coverage it is shown at. The
+    ranges are contiguous, each at least MIN_RANGE_RATIO long."""
+    full = chain[0]
+    lo, hi = full[0].min(axis=0), full[0].max(axis=0)
+    radius = float(np.linalg.norm(hi - lo) / 2)
+
+    kept = [(0, 0.0, 0.0)]
+    for i, level in enumerate(chain[1:], 1):
+        if len(level[1]) >= len(chain[kept[-1][0]][1]) or len(level[1]) == 0:
+            continue
+        e = error(full, level)
+        distance = max(switch_distance(e, pixels), MIN_SWITCH_DISTANCE)
+        # A coarser level that is no worse, or takes over almost as soon,
+        # makes the one before it pointless
+        while len(kept) > 1 and distance < kept[-1][2] * MIN_RANGE_RATIO:
+            kept.pop()
+        kept.append((i, e, distance))
+
+    count = len(full[1])
+    levels = []
+    for k, (i, e, begin) in enumerate(kept):
+        end = kept[k + 1][2] if k + 1 < len(kept) else 0.0
+        triangles = len(chain[i][1])
+        levels.append((i, {
+            'lod': k,
+            'triangles': triangles,
+            'reduction': round(1 - triangles / count, 4) if count else 0.0,
+            'error': round(e, 6),
+            'visibility_range_begin': round(begin, 3),
+            'visibility_range_end': round(end, 3),
+            'screen_coverage': round(screen_coverage(radius, end), 4) if end else 0.0,
+        }))
+    return levels
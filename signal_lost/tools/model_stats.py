@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Geometry stats and budgets for the SIGNAL LOST model tools
+
+glb_stats() reads an exported model back from its GLB files, so it
+measures what either backend actually wrote: LOD0's drawn vertices and
+triangles (instanced parts counted per copy), its materials, UV islands
+and Y-up bounding box, every level's triangles and the bytes of all the
+model's files. check() compares a model's stats with its budget and with
+the last recorded run; any problem it returns fails the build. Files
+rewritten by optimize_glb.py are flagged, and a baseline is kept per
+state(): their geometry is always compared, their bytes only with files
+in the same state.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from gltf_io import accessor, read_glb
+
+
+# Stats a budget can cap and a later run must not grow past the threshold
+METRICS = ('vertices', 'triangles', 'materials', 'uv_islands', 'bytes')
+# Largest growth of any metric over the last recorded run (fraction)
+MAX_REGRESSION = 0.10
+# Metrics optimize_glb.py changes, compared only between files in the same state
+STATE_METRICS = ('bytes',)
+# Vertices closer than this (m, and in UV) are the same when finding islands
+ISLAND_DECIMALS = 5
+
+LOD_NODE = re.compile(r'_LOD(\d+)$')
+
+
+def _node_matrix(node):
+    """Local 4x4 transform of a glTF node"""
+    if 'matrix' in node:
+        return np.array(node['matrix'], dtype=np.float64).reshape(4, 4).T
+    return _trs_matrix(node.get('translation', (0, 0, 0)), node.get('rotation', (0, 0, 0, 1)),
+                       node.get('scale', (1, 1, 1)))
+
+
+def _trs_matrix(translation, rotation, scale):
+    x, y, z, w = rotation
+    matrix = np.eye(4)
+    matrix[:3, :3] = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ]) * np.asarray(scale, dtype=np.float64)
+    matrix[:3, 3] = translation
+    return matrix
+
+
+def _draws(document, binary, index, parent=np.eye(4)):
+    """(mesh index, world matrix) of every mesh drawn by a node and its
+    children, one per EXT_mesh_gpu_instancing instance"""
+    node = document['nodes'][index]
+    matrix = parent @ _node_matrix(node)
+    if 'mesh' in node:
+        instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing')
+        if instancing:
+            attributes = instancing['attributes']
+            count = document['accessors'][next(iter(attributes.values()))]['count']
+            columns = [accessor(document, binary, attributes[key]) if key in attributes else [default] * count
+                       for key, default in (('TRANSLATION', (0, 0, 0)), ('ROTATION', (0, 0, 0, 1)),
+                                            ('SCALE', (1, 1, 1)))]
+            for trs in zip(*columns):
+                yield node['mesh'], matrix @ _trs_matrix(*trs)
+        else:
+            yield node['mesh'], matrix
+    for child in node.get('children', []):
+        yield from _draws(document, binary, child, matrix)
+
+
+def uv_islands(positions, uvs, triangles):
+    """Connected pieces of a mesh whose triangles share corners with the
+    same position and UV"""
+    if not len(triangles):
+        return 0
+    rounded = np.round(np.hstack([positions, uvs]), ISLAND_DECIMALS)
+    _, welded = np.unique(rounded, axis=0, return_inverse=True)
+    faces = welded.reshape(-1)[triangles]
+    labels = np.arange(faces.max() + 1)
+    while True:
+        lowest = labels[faces].min(axis=1)
+        merged = labels.copy()
+        np.minimum.at(merged, faces, lowest[:, None])
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+    return len(np.unique(labels[faces[:, 0]]))
+
+
+def glb_stats(paths):
+    """Stats of a model exported as the GLB files in paths (the model file
+    first, then any LOD siblings)"""
+    stats = {'vertices': 0, 'triangles': 0, 'materials': 0, 'uv_islands': 0,
+             'bytes': sum(os.path.getsize(path) for path in paths), 'lod_triangles': {}}
+    low, high = np.full(3, np.inf), np.full(3, -np.inf)
+    for path in paths:
+        document, binary = read_glb(path)
+        if path == paths[0]:
+            stats['materials'] = len(document.get('materials', []))
+            stats['optimized'] = bool(document['asset'].get('extras', {}).get('optimized'))
+        counted = set()
+        for root in document['scenes'][document.get('scene', 0)]['nodes']:
+            match = LOD_NODE.search(document['nodes'][root].get('name', ''))
+            lod = int(match.group(1)) if match else 0
+            for mesh, matrix in _draws(document, binary, root):
+                for number, primitive in enumerate(document['meshes'][mesh]['primitives']):
+                    positions = accessor(document, binary, primitive['attributes']['POSITION'])
+                    triangles = (accessor(document, binary, primitive['indices']) if 'indices' in primitive
+                                 else np.arange(len(positions))).reshape(-1, 3)
+                    stats['lod_triangles'][lod] = stats['lod_triangles'].get(lod, 0) + len(triangles)
+                    if lod:
+                        continue
+                    stats['vertices'] += len(positions)
+                    stats['triangles'] += len(triangles)
+                    world = positions @ matrix[:3, :3].T + matrix[:3, 3]
+                    low, high = np.minimum(low, world.min(axis=0)), np.maximum(high, world.max(axis=0))
+                    # Instances of one mesh share its UV islands
+                    key = (mesh, number)
+                    if key not in counted and 'TEXCOORD_0' in primitive['attributes']:
+                        counted.add(key)
+                        uvs = accessor(document, binary, primitive['attributes']['TEXCOORD_0'])
+                        stats['uv_islands'] += uv_islands(positions, uvs, triangles)
+    stats['lod_triangles'] = [stats['lod_triangles'][lod] for lod in sorted(stats['lod_triangles'])]
+    stats['bounds'] = {'min': (np.round(low, 4) + 0.0).tolist(), 'max': (np.round(high, 4) + 0.0).tolist()}
+    return stats
+
+
+def load_budgets(path):
+    """(default limits, {model: limits}) from a budget file; limits map
+    metrics to their maximum"""
+    with open(path) as f:
+        budgets = json.load(f)
+    default = budgets.get('default', {})
+    models = budgets.get('models', {})
+    unknown = {metric for limits in [default, *models.values()] for metric in limits} - set(METRICS)
+    if unknown:
+        raise ValueError(f"{path}: unknown budget metric(s) {', '.join(sorted(unknown))}")
+    return default, models
+
+
+def state(stats):
+    """'optimized' for stats of files rewritten by optimize_glb.py, else 'plain'"""
+    return 'optimized' if stats.get('optimized') else 'plain'
+
+
+def check(name, stats, budget, baselines=None, max_regression=MAX_REGRESSION):
+    """Problems with a model's stats: metrics over budget, and metrics grown
+    by more than max_regression since the last recorded stats. baselines
+    maps state() to those stats; geometry falls back on the other state's
+    baseline, STATE_METRICS only compare within a state."""
+    baselines = baselines or {}
+    same = baselines.get(state(stats))
+    problems = []
+    for metric in METRICS:
+        value = stats[metric]
+        limit = budget.get(metric)
+        if limit is not None and value > limit:
+            problems.append(f"{name}: {metric} {value:,} over budget {limit:,}")
+        previous = same if same or metric in STATE_METRICS else next(iter(baselines.values()), None)
+        if previous and previous.get(metric) is not None:
+            before = previous[metric]
+            if value > before * (1 + max_regression):
+                growth = f"+{(value - before) / before:.0%}" if before else "from 0"
+                problems.append(f"{name}: {metric} {before:,} -> {value:,} ({growth}, "
+                                f"limit +{max_regression:.0%})")
+    return problems
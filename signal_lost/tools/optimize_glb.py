@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+GLB post-optimizer for SIGNAL LOST models
+Run: python3 tools/optimize_glb.py [assets/models] [--output DIR] [--no-quantize]
+
+Rewrites the triangle meshes of each GLB, from either model backend or
+another exporter, for smaller files and cheaper vertex processing:
+- Vertices equal within --weld-tolerance (positions, meters) and
+  ATTRIBUTE_TOLERANCE (normals, UVs, ...) are welded, and the triangles
+  this collapses are dropped
+- Triangles are reordered for the post-transform vertex cache with
+  Tipsify (Sander, Nehab & Barczak 2007)
+- Vertices are renumbered in first-use order, for fetch locality
+- Positions become 16-bit integers in the mesh's bounding box and
+  normals 8-bit, under KHR_mesh_quantization (the dequantizing offset
+  and scale go on the mesh's nodes); UVs in [0, 1] become normalized
+  16-bit
+- Indices are 16-bit wherever the vertex count allows
+
+ACMR (cache misses per triangle, for a --cache-size FIFO cache) and file
+sizes are reported before and after. Optimized files are marked in
+asset.extras and skipped on later runs. Use --no-quantize for importers
+without KHR_mesh_quantization.
+"""
+
+import argparse
+import collections
+import copy
+import glob
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from gltf_io import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, TRIANGLES, Gltf, accessor, read_glb
+
+
+WELD_TOLERANCE = 1e-5
+# Tolerance for the other attributes, in their own units
+ATTRIBUTE_TOLERANCE = 1e-4
+# Post-transform cache entries Tipsify optimizes for and ACMR is measured with
+CACHE_SIZE = 16
+QUANTIZATION = 'KHR_mesh_quantization'
+# Extensions whose data this tool can carry over unchanged
+KNOWN_REQUIRED = {QUANTIZATION, 'EXT_mesh_gpu_instancing'}
+
+
+def weld(attributes, triangles, tolerance=WELD_TOLERANCE):
+    """Merge vertices whose attributes all agree within the tolerances and
+    drop the triangles left degenerate; returns (attributes, triangles)"""
+    keys = []
+    for name, values in attributes.items():
+        grid = tolerance if name == 'POSITION' else ATTRIBUTE_TOLERANCE
+        # + 0.0 folds -0.0 into 0.0, which unique() would tell apart
+        keys.append(np.round(values.reshape(len(values), -1) / grid) + 0.0)
+    _, first, inverse = np.unique(np.hstack(keys), axis=0, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1)[triangles]
+    keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+            & (triangles[:, 2] != triangles[:, 0]))
+    return {name: values[first] for name, values in attributes.items()}, triangles[keep]
+
+
+def tipsify(triangles, vertex_count, cache_size=CACHE_SIZE):
+    """Triangles reordered for a vertex cache of cache_size: fan around one
+    vertex at a time, next choosing the candidate still in the cache with
+    the most triangles left, falling back to recent then any live vertices"""
+    flat = triangles.reshape(-1)
+    order = np.argsort(flat, kind='stable')
+    starts = np.searchsorted(flat[order], np.arange(vertex_count + 1))
+    faces = (order // 3).tolist()
+    adjacency = [faces[starts[v]:starts[v + 1]] for v in range(vertex_count)]
+    live = np.bincount(flat, minlength=vertex_count).tolist()
+    stamps = [0] * vertex_count
+    emitted = [False] * len(triangles)
+    corners = triangles.tolist()
+
+    output, dead = [], []
+    time = cache_size + 1
+    cursor = 0
+    fan = 0 if len(triangles) else -1
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[fan]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            output.append(t)
+            for v in corners[t]:
+                dead.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamps[v] > cache_size:
+                    stamps[v] = time
+                    time += 1
+
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                # Prefer vertices still cached after their remaining fans
+                priority = time - stamps[v] if time - stamps[v] + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    fan, best = v, priority
+        while fan < 0 and dead:
+            v = dead.pop()
+            if live[v] > 0:
+                fan = v
+        while fan < 0 and cursor < vertex_count:
+            if live[cursor] > 0:
+                fan = cursor
+            cursor += 1
+    return triangles[output]
+
+
+def acmr(triangles, cache_size=CACHE_SIZE):
+    """Average cache misses per triangle with a FIFO cache of cache_size"""
+    cache, cached, misses = collections.deque(), set(), 0
+    for v in triangles.reshape(-1).tolist():
+        if v not in cached:
+            misses += 1
+            cache.append(v)
+            cached.add(v)
+            if len(cache) > cache_size:
+                cached.discard(cache.popleft())
+    return misses / max(len(triangles), 1)
+
+
+def fetch_order(triangles):
+    """(old index of each new vertex, renumbered triangles) with vertices in
+    the order the triangles first use them; unused vertices are dropped"""
+    used, first = np.unique(triangles.reshape(-1), return_index=True)
+    order = used[np.argsort(first)]
+    remap = np.zeros(order.max() + 1 if len(order) else 0, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return order, remap[triangles]
+
+
+def _rotate(quaternions, vectors):
+    """vectors (n, 3) rotated by quaternions (n, 4) as x, y, z, w"""
+    q, w = quaternions[:, :3], quaternions[:, 3:]
+    t = 2 * np.cross(q, vectors)
+    return vectors + w * t + np.cross(q, t)
+
+
+def _float_values(document, binary, index):
+    """An accessor's values as floats, normalized integers mapped to [0, 1] or [-1, 1]"""
+    values = accessor(document, binary, index)
+    if document['accessors'][index].get('normalized'):
+        return np.maximum(values / np.iinfo(values.dtype).max, -1.0)
+    return values.astype(np.float64)
+
+
+def _optimizable(primitive):
+    """Whether a primitive is triangles this tool can rewrite"""
+    return (primitive.get('mode', TRIANGLES) == TRIANGLES and 'POSITION' in primitive['attributes']
+            and 'targets' not in primitive)
+
+
+class Optimizer:
+    """Rewrites one read_glb() document into a new Gltf"""
+
+    def __init__(self, document, binary, quantize=True, tolerance=WELD_TOLERANCE, cache_size=CACHE_SIZE):
+        self.document, self.binary = document, binary
+        self.quantize, self.tolerance, self.cache_size = quantize, tolerance, cache_size
+        self.gltf = Gltf()
+        self.gltf.json = copy.deepcopy(document)
+        self.gltf.json['accessors'], self.gltf.json['bufferViews'] = [], []
+        self.gltf.json.pop('buffers', None)
+        self.copied = {}
+        self.quantized = False
+        self.stats = {'vertices': [0, 0], 'triangles': 0, 'misses': [0.0, 0.0]}
+
+    def copy_accessor(self, index, target=None):
+        """Index of an unchanged copy of an accessor in the new document"""
+        if index not in self.copied:
+            info = self.document['accessors'][index]
+            self.copied[index] = self.gltf.add_accessor(accessor(self.document, self.binary, index), target,
+                                                        info.get('normalized', False), 'min' in info)
+        return self.copied[index]
+
+    def _quantizable(self):
+        """Meshes whose positions can be quantized: drawn only by unskinned
+        nodes and made of optimizable triangle primitives alone"""
+        nodes = self.document.get('nodes', [])
+        used = {node['mesh'] for node in nodes if 'mesh' in node}
+        skinned = {node['mesh'] for node in nodes if 'mesh' in node and 'skin' in node}
+        return {m for m in used - skinned if all(map(_optimizable, self.document['meshes'][m]['primitives']))}
+
+    def optimize_primitive(self, primitive, box):
+        """Weld, reorder and quantize one triangle primitive in place;
+        positions are quantized only given their mesh's box (offset, step)"""
+        document, binary = self.document, self.binary
+        attributes = {name: accessor(document, binary, index) for name, index in primitive['attributes'].items()}
+        count = len(attributes['POSITION'])
+        triangles = (accessor(document, binary, primitive['indices']).astype(np.int64) if 'indices' in primitive
+                     else np.arange(count)).reshape(-1, 3)
+
+        before = acmr(triangles, self.cache_size) * len(triangles)
+        attributes, triangles = weld(attributes, triangles, self.tolerance)
+        # Flat-shaded meshes can come out of the exporter at the bound already
+        reordered = tipsify(triangles, len(attributes['POSITION']), self.cache_size)
+        if acmr(reordered, self.cache_size) < acmr(triangles, self.cache_size):
+            triangles = reordered
+        order, triangles = fetch_order(triangles)
+        self.stats['vertices'][0] += count
+        self.stats['vertices'][1] += len(order)
+        self.stats['triangles'] += len(triangles)
+        self.stats['misses'][0] += before
+        self.stats['misses'][1] += acmr(triangles, self.cache_size) * len(triangles)
+
+        for name, index in primitive['attributes'].items():
+            info = document['accessors'][index]
+            values = attributes[name][order]
+            normalized = info.get('normalized', False)
+            if box is not None and name == 'POSITION':
+                offset, step = box
+                values = np.round((values - offset) / step).astype(np.uint16)
+                self.quantized = True
+            elif self.quantize and name == 'NORMAL' and values.dtype == np.float32:
+                values, normalized = np.clip(np.round(values * 127), -127, 127).astype(np.int8), True
+                self.quantized = True
+            elif (self.quantize and name.startswith('TEXCOORD_') and values.dtype == np.float32
+                  and len(values) and values.min() >= 0 and values.max() <= 1):
+                values, normalized = np.round(values * 65535).astype(np.uint16), True
+            primitive['attributes'][name] = self.gltf.add_accessor(values, ARRAY_BUFFER, normalized,
+                                                                   bounds='min' in info or name == 'POSITION')
+        indices = triangles.reshape(-1).astype(np.uint16 if len(order) <= 0xFFFF else np.uint32)
+        primitive['indices'] = self.gltf.add_accessor(indices, ELEMENT_ARRAY_BUFFER, bounds=True)
+
+    def place(self, node, offset, step):
+        """Put the dequantization (translate by offset, scale by step) of a
+        node's mesh under the node's own transform"""
+        instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing')
+        if instancing:
+            # Instance transforms apply before the node's: fold it into each instance
+            attributes = instancing['attributes']
+            count = self.document['accessors'][next(iter(attributes.values()))]['count']
+            columns = {key: _float_values(self.document, self.binary, attributes[key]) if key in attributes
+                       else np.tile(default, (count, 1))
+                       for key, default in (('TRANSLATION', (0, 0, 0)), ('ROTATION', (0, 0, 0, 1)),
+                                            ('SCALE', (1, 1, 1)))}
+            columns['TRANSLATION'] = columns['TRANSLATION'] + _rotate(columns['ROTATION'], columns['SCALE'] * offset)
+            columns['SCALE'] = columns['SCALE'] * step
+            instancing['attributes'] = {key: self.gltf.add_accessor(values.astype(np.float32))
+                                        for key, values in columns.items()}
+        elif 'children' in node or 'matrix' in node:
+            # Children must not inherit it: the mesh moves to a child of its own
+            self.gltf.json['nodes'].append({'name': f"{node.get('name', 'Mesh')}_Mesh", 'mesh': node.pop('mesh'),
+                                            'translation': offset.tolist(), 'scale': [step] * 3})
+            node.setdefault('children', []).append(len(self.gltf.json['nodes']) - 1)
+        else:
+            rotation = np.array([node.get('rotation', (0, 0, 0, 1))], dtype=np.float64)
+            scale = np.array(node.get('scale', (1, 1, 1)), dtype=np.float64)
+            translation = np.array(node.get('translation', (0, 0, 0)), dtype=np.float64)
+            node['translation'] = (translation + _rotate(rotation, (scale * offset)[None])[0]).tolist()
+            node['scale'] = (scale * step).tolist()
+
+    def run(self):
+        document, out = self.document, self.gltf.json
+        boxes = {}
+        quantizable = self._quantizable() if self.quantize else set()
+        for m, mesh in enumerate(out.get('meshes', [])):
+            primitives = [p for p in mesh['primitives'] if _optimizable(p)]
+            if m in quantizable:
+                # One box per mesh, as its nodes carry the dequantization
+                positions = [accessor(document, self.binary, p['attributes']['POSITION']) for p in primitives]
+                low = np.min([p.min(axis=0) for p in positions if len(p)] or [np.zeros(3)], axis=0)
+                high = np.max([p.max(axis=0) for p in positions if len(p)] or [np.zeros(3)], axis=0)
+                extent = float((high - low).max())
+                boxes[m] = (low.astype(np.float64), extent / 0xFFFF if extent > 0 else 1.0)
+            for primitive in mesh['primitives']:
+                if any(primitive is p for p in primitives):
+                    self.optimize_primitive(primitive, boxes.get(m))
+                else:
+                    primitive['attributes'] = {name: self.copy_accessor(index, ARRAY_BUFFER)
+                                               for name, index in primitive['attributes'].items()}
+                    if 'indices' in primitive:
+                        primitive['indices'] = self.copy_accessor(primitive['indices'], ELEMENT_ARRAY_BUFFER)
+                    if 'targets' in primitive:
+                        primitive['targets'] = [{name: self.copy_accessor(index, ARRAY_BUFFER)
+                                                 for name, index in target.items()}
+                                                for target in primitive['targets']]
+
+        for node in list(out.get('nodes', [])):
+            instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing')
+            if node.get('mesh') in boxes:
+                self.place(node, *boxes[node['mesh']])
+            elif instancing:
+                instancing['attributes'] = {key: self.copy_accessor(index)
+                                            for key, index in instancing['attributes'].items()}
+        for skin in out.get('skins', []):
+            if 'inverseBindMatrices' in skin:
+                skin['inverseBindMatrices'] = self.copy_accessor(skin['inverseBindMatrices'])
+        for animation in out.get('animations', []):
+            for sampler in animation['samplers']:
+                sampler['input'] = self.copy_accessor(sampler['input'])
+                sampler['output'] = self.copy_accessor(sampler['output'])
+        for image in out.get('images', []):
+            if 'bufferView' in image:
+                view = document['bufferViews'][image['bufferView']]
+                start = view.get('byteOffset', 0)
+                image['bufferView'] = self.gltf.add_view(self.binary[start:start + view['byteLength']])
+
+        if self.quantized:
+            self.gltf.use_extension(QUANTIZATION, required=True)
+        out['asset'].setdefault('extras', {})['optimized'] = {
+            'tool': 'optimize_glb', 'quantized': self.quantized, 'cache_size': self.cache_size}
+        return self.gltf
+
+
+def unsupported(document):
+    """Why a document cannot be optimized, or None"""
+    if document.get('asset', {}).get('extras', {}).get('optimized'):
+        return "already optimized"
+    required = set(document.get('extensionsRequired', [])) - KNOWN_REQUIRED
+    if required:
+        return f"requires {', '.join(sorted(required))}"
+    if any('uri' in buffer for buffer in document.get('buffers', [])):
+        return "has external buffers"
+    if any('sparse' in info for info in document.get('accessors', [])):
+        return "has sparse accessors"
+    return None
+
+
+def glb_paths(paths):
+    """GLB files named, or found in the named directories"""
+    found = []
+    for path in paths:
+        found += sorted(glob.glob(os.path.join(path, '*.glb'))) if os.path.isdir(path) else [path]
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Weld, cache-reorder and quantize SIGNAL LOST model GLBs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 tools/optimize_glb.py                       # assets/models, in place
+  python3 tools/optimize_glb.py build/models -o optimized
+  python3 tools/optimize_glb.py assets/models/chair.glb --no-quantize
+        """
+    )
+    parser.add_argument('paths', nargs='*', default=['assets/models'],
+                        help='GLB files or directories of them (default: assets/models)')
+    parser.add_argument('--output', '-o', help='Write optimized files here (default: replace the inputs)')
+    parser.add_argument('--weld-tolerance', type=float, default=WELD_TOLERANCE,
+                        help=f'Largest distance (m) between positions welded together (default: {WELD_TOLERANCE})')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help=f'Vertex cache entries to optimize and measure ACMR for (default: {CACHE_SIZE})')
+    parser.add_argument('--no-quantize', action='store_true',
+                        help='Keep float32 attributes (for importers without KHR_mesh_quantization)')
+    args = parser.parse_args()
+
+    paths = glb_paths(args.paths)
+    if not paths:
+        sys.exit(f"Error: no GLB files in {', '.join(args.paths)}")
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    print("\n" + "=" * 50)
+    print("  SIGNAL LOST - GLB Optimizer")
+    print("=" * 50 + "\n")
+    print(f"  {'file':28s} {'bytes':>19s} {'vertices':>15s} {'ACMR':>11s}")
+    totals = [0, 0]
+    for path in paths:
+        document, binary = read_glb(path)
+        size = os.path.getsize(path)
+        reason = unsupported(document)
+        target = os.path.join(args.output, os.path.basename(path)) if args.output else path
+        if reason:
+            print(f"  {os.path.basename(path):28s} skipped: {reason}")
+            data = None
+        else:
+            optimizer = Optimizer(document, binary, not args.no_quantize, args.weld_tolerance, args.cache_size)
+            data = optimizer.run().glb()
+            stats = optimizer.stats
+            triangles = max(stats['triangles'], 1)
+            print(f"  {os.path.basename(path):28s} {size:8,} -> {len(data):8,} "
+                  f"{stats['vertices'][0]:6,} -> {stats['vertices'][1]:6,} "
+                  f"{stats['misses'][0] / triangles:4.2f} -> {stats['misses'][1] / triangles:4.2f}  "
+                  f"({(len(data) - size) / size:+.0%})")
+        if data is not None:
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+        elif target != path:
+            shutil.copyfile(path, target)
+        totals[0] += size
+        totals[1] += len(data) if data is not None else size
+
+    print("\n" + "=" * 50)
+    print(f"  {len(paths)} files: {totals[0]:,} -> {totals[1]:,} bytes ({(totals[1] - totals[0]) / totals[0]:+.0%})")
+    print(f"  Output: {args.output or 'in place'}")
+    print("=" * 50 + "\n")
+
+
+if __name__ == "__main__":
+    main()
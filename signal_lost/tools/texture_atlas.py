@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Texture atlas packer for the SIGNAL LOST texture tools
+
+Packs material sets (the albedo, normal and ORM maps of directories like
+assets/textures/concrete), optionally at several scales, into one shared
+atlas per map so scenes mixing materials bind one texture set:
+
+    albedo_atlas.png  normal_atlas.png  orm_atlas.png  atlas.json
+
+Entries are mip-safe down to mip_levels: every rectangle starts and ends
+on a multiple of 2^mip_levels pixels, so no mip texel down to that level
+averages two entries, and its content is surrounded by a gutter of
+2^mip_levels pixels (one texel at the last safe level) filled by
+extending the edge texels, or wrapping them for tiling materials, so
+bilinear filtering at the content's edge reads the entry's own texels.
+Block-compressed (DDS) atlases keep 4x4 blocks apart down to
+mip_levels - 2.
+
+Rectangles are placed bottom-left on a skyline, tallest first, trying
+every atlas width between the narrowest that could hold them and twice
+that, and keeping the smallest area (or power-of-two size).
+
+atlas.json maps each entry (set name, with @scale below full size) to its
+pixel rect and UV rect; uv_offset and uv_scale drop straight into a
+Godot material's uv1_offset and uv1_scale.
+
+Run with --self-check to verify packing efficiency and mip bleeding on
+synthetic sets.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+from texture_compress import decode, downsample, encode
+
+
+MAPS = ('albedo', 'normal', 'orm')
+# How each map is filtered when scaled or mipped (texture_compress kinds)
+KINDS = {'albedo': 'srgb', 'normal': 'normal', 'orm': 'linear'}
+# Sets without an orm map have it built from these, with a default for each missing one
+ORM_CHANNELS = ('ao', 'roughness', 'metallic')
+ORM_DEFAULTS = {'ao': 255, 'roughness': 255, 'metallic': 0}
+FLAT_NORMAL = (128, 128, 255)
+
+GUTTER_MODES = ('edge', 'wrap')
+DEFAULT_MIP_LEVELS = 4
+MAX_SIZE = 16384
+
+# An entry's content, gutter width, and the padded rect it was packed as
+Placement = namedtuple('Placement', 'name x y width height gutter')
+
+
+def load_set(directory):
+    """{map: uint8 image} of a material set directory; the normal and ORM
+    maps are made up when missing"""
+    def read(name, mode):
+        path = os.path.join(directory, name + '.png')
+        return np.asarray(Image.open(path).convert(mode)) if os.path.isfile(path) else None
+
+    albedo = read('albedo', 'RGB')
+    if albedo is None:
+        raise ValueError(f"{directory}: no albedo.png")
+    shape = albedo.shape[:2]
+    normal = read('normal', 'RGB')
+    if normal is None:
+        normal = np.empty(shape + (3,), dtype=np.uint8)
+        normal[...] = FLAT_NORMAL
+    orm = read('orm', 'RGB')
+    if orm is None:
+        channels = [read(name, 'L') for name in ORM_CHANNELS]
+        orm = np.stack([np.full(shape, ORM_DEFAULTS[name], dtype=np.uint8) if c is None else c
+                        for name, c in zip(ORM_CHANNELS, channels)], axis=-1)
+    maps = {'albedo': albedo, 'normal': normal, 'orm': orm}
+    for name, image in maps.items():
+        if image.shape[:2] != shape:
+            raise ValueError(f"{directory}: {name} is {image.shape[1]}x{image.shape[0]}, "
+                             f"albedo is {shape[1]}x{shape[0]}")
+    return maps
+
+
+def scaled(maps, scale):
+    """Maps box-filtered down by scale (1, 1/2, 1/4, ...), as their mips would be"""
+    halvings = round(-math.log2(scale)) if scale > 0 else -1
+    if halvings < 0 or 2.0 ** -halvings != scale:
+        raise ValueError(f"atlas scales must be 1, 0.5, 0.25, ...; got {scale}")
+    out = {}
+    for name, image in maps.items():
+        values = decode(image, KINDS[name])
+        for _ in range(halvings):
+            # Odd last rows are dropped, as downsample drops odd last columns
+            values = downsample(values[:len(values) // 2 * 2], values.shape[1], KINDS[name])
+        out[name] = encode(values, KINDS[name])
+    return out
+
+
+def padded_size(width, height, gutter, align):
+    """Rect size of content plus gutters, rounded up to the alignment"""
+    return (-(-(width + 2 * gutter) // align) * align,
+            -(-(height + 2 * gutter) // align) * align)
+
+
+def _skyline(sizes, width):
+    """Bottom-left positions of (w, h) sizes, in order, on a skyline width
+    wide; returns (positions, height used)"""
+    # Skyline segments [x, y, w], left to right, covering the width
+    skyline = [[0, 0, width]]
+    positions = []
+    for w, h in sizes:
+        best = None
+        for i, (x, _, _) in enumerate(skyline):
+            if x + w > width:
+                break
+            # Rest on the highest segment under [x, x + w)
+            top, j, reach = 0, i, x
+            while reach < x + w:
+                top = max(top, skyline[j][1])
+                reach += skyline[j][2]
+                j += 1
+            if best is None or (top + h, x) < (best[0] + h, best[1]):
+                best = (top, x, i, j)
+        if best is None:
+            return None, None
+        top, x, i, j = best
+        positions.append((x, top))
+
+        # The new segment replaces [x, x + w); a partly covered last one is cut
+        last = skyline[j - 1]
+        right = last[0] + last[2]
+        replaced = [[x, top + h, w]]
+        if right > x + w:
+            replaced.append([x + w, last[1], right - x - w])
+        skyline[i:j] = replaced
+        # Merge neighbours at the same height
+        k = 0
+        while k < len(skyline) - 1:
+            if skyline[k][1] == skyline[k + 1][1]:
+                skyline[k][2] += skyline.pop(k + 1)[2]
+            else:
+                k += 1
+    return positions, max(y for _, y, _ in skyline)
+
+
+def pack(sizes, align=1, max_size=MAX_SIZE, power_of_two=False):
+    """Place rects of the given (width, height) sizes (multiples of align)
+    without overlap. Returns ([(x, y), ...] in input order, (atlas width,
+    atlas height)); raises ValueError if they do not fit max_size."""
+    if not sizes:
+        raise ValueError("nothing to pack")
+    units = [(w // align, h // align) for w, h in sizes]
+    order = sorted(range(len(units)), key=lambda k: (-units[k][1], -units[k][0]))
+    ordered = [units[k] for k in order]
+    area = sum(w * h for w, h in units)
+    narrowest = max(max(w for w, _ in units), math.isqrt(area))
+    limit = max_size // align
+
+    if power_of_two:
+        widths = [1 << b for b in range(limit.bit_length()) if narrowest <= 1 << b <= limit]
+    else:
+        widths = range(narrowest, min(2 * narrowest, limit) + 1)
+    best = None
+    for width in widths:
+        positions, height = _skyline(ordered, width)
+        if positions is None:
+            continue
+        if power_of_two:
+            height = 1 << (height - 1).bit_length()
+        if height > limit:
+            continue
+        key = (width * height, max(width, height))
+        if best is None or key < best[0]:
+            best = (key, positions, width, height)
+    if best is None:
+        raise ValueError(f"{len(sizes)} rects do not fit a {max_size}x{max_size} atlas")
+
+    _, positions, width, height = best
+    placed = [None] * len(sizes)
+    for k, (x, y) in zip(order, positions):
+        placed[k] = (x * align, y * align)
+    return placed, (width * align, height * align)
+
+
+def compose(images, placements, size, gutter_mode='edge'):
+    """Paste images (same channel count) at their placements into one
+    atlas of size (width, height), filling each gutter"""
+    channels = images[0].shape[2:]
+    atlas = np.zeros((size[1], size[0]) + channels, dtype=np.uint8)
+    for image, p in zip(images, placements):
+        h, w = image.shape[:2]
+        g = p.gutter
+        pad = ((g, p.height - h - g), (g, p.width - w - g)) + ((0, 0),) * len(channels)
+        atlas[p.y:p.y + p.height, p.x:p.x + p.width] = np.pad(image, pad, mode=gutter_mode)
+    return atlas
+
+
+def build_atlas(sets, scales=(1,), mip_levels=DEFAULT_MIP_LEVELS, gutter_mode='edge',
+                power_of_two=False, max_size=MAX_SIZE):
+    """Pack {set name: maps} at every scale. Returns ({map: uint8 atlas},
+    manifest dict)."""
+    if gutter_mode not in GUTTER_MODES:
+        raise ValueError(f"unknown gutter mode '{gutter_mode}', expected one of {GUTTER_MODES}")
+    align = gutter = 1 << mip_levels
+    names, entries = [], []
+    for name, maps in sets.items():
+        for scale in scales:
+            names.append(name if scale == 1 else f"{name}@{scale:g}")
+            entries.append(maps if scale == 1 else scaled(maps, scale))
+
+    sizes = [padded_size(e['albedo'].shape[1], e['albedo'].shape[0], gutter, align) for e in entries]
+    positions, size = pack(sizes, align, max_size, power_of_two)
+    placements = [Placement(name, x, y, w, h, gutter)
+                  for name, (x, y), (w, h) in zip(names, positions, sizes)]
+    atlases = {m: compose([e[m] for e in entries], placements, size, gutter_mode) for m in MAPS}
+
+    used = sum(e['albedo'].shape[0] * e['albedo'].shape[1] for e in entries)
+    manifest = {
+        'size': list(size),
+        'mip_levels': mip_levels,
+        'gutter': gutter,
+        'gutter_mode': gutter_mode,
+        'efficiency': round(used / (size[0] * size[1]), 4),
+        'entries': {},
+    }
+    for p, e in zip(placements, entries):
+        h, w = e['albedo'].shape[:2]
+        x, y = p.x + p.gutter, p.y + p.gutter
+        u0, v0 = x / size[0], y / size[1]
+        manifest['entries'][p.name] = {
+            'rect': [x, y, w, h],
+            'uv': [u0, v0, (x + w) / size[0], (y + h) / size[1]],
+            'uv_offset': [u0, v0],
+            'uv_scale': [w / size[0], h / size[1]],
+        }
+    return atlases, manifest
+
+
+def mip_chain(image, kind, levels):
+    """image and its first levels mips, box filtered as in DDS output"""
+    chain = [image]
+    values = decode(image, kind)
+    for _ in range(levels):
+        values = downsample(values, values.shape[1], kind)
+        chain.append(encode(values, kind))
+    return chain
+
+
+def self_check():
+    """Pack and mip synthetic sets; print each check, return whether all passed"""
+    rng = np.random.RandomState(7)
+    results = []
+
+    def check(name, ok, detail):
+        results.append(ok)
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}: {detail}")
+
+    # Bin packing: mixed rect sizes must not overlap and should fill the atlas
+    for label, sizes, floor in (
+            ('random rects', [tuple(rng.randint(1, 17, 2) * 16) for _ in range(80)], 0.80),
+            ('material squares', [(512, 512)] * 4 + [(256, 256)] * 4 + [(128, 128)] * 4, 0.90)):
+        positions, size = pack(sizes, 16)
+        cover = np.zeros((size[1] // 16, size[0] // 16), dtype=np.int32)
+        for (x, y), (w, h) in zip(positions, sizes):
+            cover[y // 16:(y + h) // 16, x // 16:(x + w) // 16] += 1
+        efficiency = sum(w * h for w, h in sizes) / (size[0] * size[1])
+        check(f"{label} packing", cover.max() == 1 and efficiency >= floor,
+              f"{len(sizes)} rects in {size[0]}x{size[1]}, {efficiency:.1%} used "
+              f"(need {floor:.0%}), max overlap {cover.max()}")
+
+    positions, size = pack([(512, 512)] * 3, 16, power_of_two=True)
+    check("power-of-two size", all(s & (s - 1) == 0 for s in size), f"{size[0]}x{size[1]}")
+
+    # Mip bleeding: solid-colored entries, each with its own color, must keep
+    # exactly that color over their whole rect (gutter included) at every
+    # safe mip, in both gutter modes
+    mip_levels = 3
+    colors = rng.randint(0, 256, (6, 3)).astype(np.uint8)
+    sets = {}
+    for k, color in enumerate(colors):
+        h, w = rng.randint(2, 9, 2) * 16 + rng.randint(0, 8, 2)
+        image = np.empty((h, w, 3), dtype=np.uint8)
+        image[...] = color
+        sets[f"set{k}"] = {'albedo': image, 'normal': image, 'orm': image}
+    for gutter_mode in GUTTER_MODES:
+        atlases, manifest = build_atlas(sets, (1, 0.5), mip_levels, gutter_mode)
+        worst = 0
+        for level, mip in enumerate(mip_chain(atlases['albedo'], 'srgb', mip_levels)):
+            step = 1 << level
+            for name, entry in manifest['entries'].items():
+                x, y, w, h = entry['rect']
+                g = manifest['gutter']
+                block = mip[(y - g) // step:(y + h + g) // step, (x - g) // step:(x + w + g) // step]
+                color = colors[int(name.split('@')[0][3:])]
+                worst = max(worst, int(np.abs(block.astype(int) - color).max()))
+        check(f"mip bleeding ({gutter_mode} gutters)", worst <= 1,
+              f"{len(manifest['entries'])} entries, mips 0-{mip_levels}, "
+              f"worst channel error {worst} (rounding allows 1)")
+
+    # UVs must land on the entry's content
+    atlases, manifest = build_atlas(sets, (1,), mip_levels)
+    misses = 0
+    for name, entry in manifest['entries'].items():
+        u0, v0, u1, v1 = entry['uv']
+        x, y = int(u0 * manifest['size'][0]), int(v0 * manifest['size'][1])
+        x1, y1 = round(u1 * manifest['size'][0]) - 1, round(v1 * manifest['size'][1]) - 1
+        color = colors[int(name[3:])]
+        misses += sum(np.any(atlases['albedo'][py, px] != color) for px, py in ((x, y), (x1, y1)))
+    check("UV rects", misses == 0, f"{misses} corner texels outside their entry")
+
+    return all(results)
+
+
+def find_sets(input_dir, names):
+    """{name: directory} for set names under input_dir (or paths)"""
+    sets = {}
+    for name in names:
+        directory = name if os.path.isdir(name) else os.path.join(input_dir, name)
+        if not os.path.isdir(directory):
+            raise ValueError(f"no material set '{name}' in {input_dir}")
+        sets[os.path.basename(os.path.normpath(directory))] = directory
+    return sets
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Pack SIGNAL LOST material sets into shared texture atlases',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 texture_atlas.py concrete ice metal_panel
+  python3 texture_atlas.py concrete snow --scales 1 0.5 --mip-levels 5 --gutter-mode wrap
+  python3 texture_atlas.py metal_panel concrete --format dds --power-of-two
+  python3 texture_atlas.py --self-check
+        """
+    )
+    parser.add_argument('sets', nargs='*', metavar='SET',
+                        help='Material set names under --input (or set directories)')
+    parser.add_argument('--input', '-i', default='assets/textures',
+                        help='Directory holding the material sets (default: assets/textures)')
+    parser.add_argument('--output', '-o', default='assets/textures/atlas',
+                        help='Output directory (default: assets/textures/atlas)')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0], metavar='SCALE',
+                        help='Scales to pack each set at: 1, 0.5, 0.25, ... (default: 1)')
+    parser.add_argument('--mip-levels', type=int, default=DEFAULT_MIP_LEVELS, metavar='N',
+                        help=f'Mips that stay free of bleeding; sets alignment and gutters '
+                             f'to 2^N pixels (default: {DEFAULT_MIP_LEVELS})')
+    parser.add_argument('--gutter-mode', choices=GUTTER_MODES, default='edge',
+                        help='Fill gutters by extending edge texels, or wrapping for tiling '
+                             'materials (default: edge)')
+    parser.add_argument('--power-of-two', action='store_true',
+                        help='Round the atlas size up to powers of two')
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE,
+                        help=f'Largest atlas side (default: {MAX_SIZE})')
+    parser.add_argument('--format', choices=['png', 'dds'], default='png',
+                        help='Atlas file format; dds is block-compressed with mips (default: png)')
+    parser.add_argument('--self-check', action='store_true',
+                        help='Verify packing efficiency and mip bleeding on synthetic sets')
+
+    args = parser.parse_args()
+    if args.self_check:
+        print("\n  Texture atlas self-check\n")
+        sys.exit(0 if self_check() else 1)
+    if not args.sets:
+        parser.error("name the material sets to pack (or use --self-check)")
+    if args.mip_levels < 0:
+        parser.error("--mip-levels must be 0 or more")
+
+    # The map writers live with the generator
+    from generate_textures import ENCODER, map_path, write_map
+
+    try:
+        sets = {name: load_set(directory)
+                for name, directory in find_sets(args.input, args.sets).items()}
+        atlases, manifest = build_atlas(sets, args.scales, args.mip_levels, args.gutter_mode,
+                                        args.power_of_two, args.max_size)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest['maps'] = {}
+    for name, atlas in atlases.items():
+        path = map_path(os.path.join(args.output, f"{name}_atlas.png"), args.format)
+        write_map(path, atlas, args.format)
+        manifest['maps'][name] = os.path.basename(path)
+    ENCODER.wait()
+    with open(os.path.join(args.output, 'atlas.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    width, height = manifest['size']
+    print(f"  Packed {len(manifest['entries'])} entries into {width}x{height} "
+          f"({manifest['efficiency']:.1%} used, mip-safe to level {args.mip_levels})")
+    print(f"  Saved to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Content-addressed output cache for generated texture sets
+
+A material set is keyed by its type, size, seed, output-affecting options
+and the source of the texture tools. Hits copy the stored files into place
+without generating or encoding anything. Files are stored once per content
+hash (the all-zero metallic planes are shared, for example), and the store
+is trimmed least-recently-used first when it outgrows its size limit.
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'signal_lost', 'textures')
+DEFAULT_MAX_BYTES = 1024 * 2**20
+MANIFEST_VERSION = 1
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Hash of generate_textures.py, every texture_*.py module and the
+    built-in recipes"""
+    digest = hashlib.sha256()
+    paths = [os.path.join(TOOLS_DIR, 'generate_textures.py')]
+    paths += sorted(glob.glob(os.path.join(TOOLS_DIR, 'texture_*.py')))
+    paths += sorted(glob.glob(os.path.join(TOOLS_DIR, 'recipes', '*.*')))
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TextureCache:
+    """On-disk store of material sets with a JSON manifest and LRU eviction"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('entries', {})
+
+    def save(self):
+        """Write the manifest atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def key(self, material, size, seed, params):
+        """Cache key for one material set"""
+        payload = json.dumps({
+            'material': material,
+            'size': size,
+            'seed': seed,
+            'params': params,
+            'code': code_version(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _blob(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def fetch(self, key, output_dir):
+        """Copy a cached set into output_dir; False on a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        if not all(os.path.exists(self._blob(d)) for d in entry['files'].values()):
+            del self.entries[key]
+            return False
+
+        for name, digest in entry['files'].items():
+            path = os.path.join(output_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(self._blob(digest), path)
+        entry['last_used'] = time.time()
+        return True
+
+    def store(self, key, output_dir, names, info=None):
+        """Add the named files of output_dir under key, then trim the store"""
+        files = {}
+        for name in names:
+            path = os.path.join(output_dir, name)
+            digest = file_digest(path)
+            blob = self._blob(digest)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp = f"{blob}.{os.getpid()}.tmp"
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+            files[name] = digest
+
+        self.entries[key] = dict(info or {}, files=files, last_used=time.time())
+        self.evict()
+
+    def _blob_sizes(self):
+        sizes = {}
+        for entry in self.entries.values():
+            for digest in entry['files'].values():
+                if digest not in sizes:
+                    try:
+                        sizes[digest] = os.path.getsize(self._blob(digest))
+                    except OSError:
+                        sizes[digest] = 0
+        return sizes
+
+    def evict(self):
+        """Drop least recently used entries until the store fits max_bytes"""
+        sizes = self._blob_sizes()
+        total = sum(sizes.values())
+        by_age = sorted(self.entries, key=lambda k: self.entries[k]['last_used'])
+        while total > self.max_bytes and len(by_age) > 1:
+            del self.entries[by_age.pop(0)]
+            live = self._blob_sizes()
+            for digest in set(sizes) - set(live):
+                try:
+                    os.remove(self._blob(digest))
+                except OSError:
+                    pass
+            sizes = live
+            total = sum(sizes.values())
+
+    def stats(self):
+        """(entries, bytes) currently held"""
+        return len(self.entries), sum(self._blob_sizes().values())
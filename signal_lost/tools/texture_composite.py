@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+float32 compositing for the SIGNAL LOST texture tools
+
+Maps are built in named float32 scratch buffers that are reused from one
+band (or one map) to the next, with every blend done for all channels at
+once through broadcasting and in-place ufuncs. Values stay in [0, 1] and
+are quantized to uint8 once, when a map is handed to the writer.
+"""
+
+import numpy as np
+
+
+def _rgb(color):
+    """0-255 color triple as a float32 [0, 1] vector"""
+    return np.asarray(color, dtype=np.float32) / 255
+
+
+class Compositor:
+    """Blend operations on reusable float32 buffers.
+
+    buffer(name, shape) returns the same array for as long as the shape
+    stays the same, so a band function allocates nothing after its first
+    band except the uint8 it returns. A buffer is only valid until the next
+    request for the same name.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def release(self):
+        """Drop every buffer (e.g. once a map is written)"""
+        self.buffers.clear()
+
+    def buffer(self, name, shape):
+        array = self.buffers.get(name)
+        if array is None or array.shape != shape:
+            array = self.buffers[name] = np.empty(shape, dtype=np.float32)
+        return array
+
+    def mix(self, name, terms, bias=0.0):
+        """bias + sum of layer * weight over (layer, weight) terms"""
+        first, weight = terms[0]
+        out = self.buffer(name, np.shape(first))
+        np.multiply(first, weight, out=out, casting='same_kind')
+        if bias:
+            out += bias
+        scratch = self.buffer('mix.term', out.shape)
+        for layer, weight in terms[1:]:
+            np.multiply(layer, weight, out=scratch, casting='same_kind')
+            out += scratch
+        return out
+
+    def gradient(self, name, values, dark, light):
+        """RGB lerp from dark to light (0-255 colors) by values in [0, 1]"""
+        dark = _rgb(dark)
+        out = self.buffer(name, np.shape(values) + (3,))
+        np.multiply(values[..., None], _rgb(light) - dark, out=out, casting='same_kind')
+        out += dark
+        return out
+
+    def darken(self, rgb, mask, amount):
+        """rgb *= 1 - mask * amount, amount a scalar or a per-channel triple"""
+        if np.ndim(amount):
+            factor = self.buffer('factor.rgb', rgb.shape)
+            np.multiply(mask[..., None], -np.asarray(amount, dtype=np.float32), out=factor,
+                        casting='same_kind')
+        else:
+            factor = self.buffer('factor', np.shape(mask))
+            np.multiply(mask, -amount, out=factor, casting='same_kind')
+        factor += 1
+        rgb *= factor if np.ndim(amount) else factor[..., None]
+        return rgb
+
+    def blend(self, rgb, color, mask, amount):
+        """Blend color over rgb with opacity mask * amount (color is overwritten)"""
+        factor = self.buffer('factor', np.shape(mask))
+        np.multiply(mask, amount, out=factor, casting='same_kind')
+        color -= rgb
+        color *= factor[..., None]
+        rgb += color
+        return rgb
+
+    def add(self, rgb, mask, amount):
+        """rgb += mask * amount (0-255 units) on every channel"""
+        factor = self.buffer('factor', np.shape(mask))
+        np.multiply(mask, amount / 255, out=factor, casting='same_kind')
+        rgb += factor[..., None]
+        return rgb
+
+    @staticmethod
+    def quantize(values, lo=0.0, hi=1.0, floor=False):
+        """Clip [0, 1] values (in place) to [lo, hi] and round them (down
+        with floor) to uint8"""
+        np.clip(values, lo, hi, out=values)
+        values *= 255
+        (np.floor if floor else np.rint)(values, out=values)
+        return values.astype(np.uint8)
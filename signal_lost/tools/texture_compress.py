@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+GPU block compression and DDS output for the SIGNAL LOST texture tools
+
+Maps are written as DDS files (DX10 header) with a full mip chain, so
+Godot can upload them as they are instead of recompressing on import:
+
+- BC4 for single-channel maps (roughness, metallic, AO)
+- BC5 for normal maps (X and Y; the shader rebuilds Z)
+- BC1 or BC7 (mode 6) for color maps, flagged sRGB unless the channels
+  hold data (packed ORM)
+
+Mips are 2x2 box filtered in the space the map lives in: color in linear
+light, normals as vectors renormalized at every level. Every level
+encodes whole bands of 4x4 blocks at once in NumPy, and rows stream
+through the chain, so a tiled generator never holds a full map.
+"""
+
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from texture_trace import span
+
+
+# Pixels per encoding pass; bounds the per-block temporaries
+CHUNK_PIXELS = 1 << 18
+
+CODECS = ('bc1', 'bc7')
+KINDS = ('srgb', 'linear', 'normal')
+
+DXGI_FORMAT = {'bc1': 71, 'bc4': 80, 'bc5': 83, 'bc7': 98}
+DXGI_FORMAT_SRGB = {'bc1': 72, 'bc7': 99}
+BLOCK_BYTES = {'bc1': 8, 'bc4': 8, 'bc5': 16, 'bc7': 16}
+
+# Palette position (0 = low endpoint ... 7 = high) -> BC4 index with e0 > e1
+BC4_INDEX = np.array([1, 7, 6, 5, 4, 3, 2, 0], dtype=np.uint64)
+# Palette position (0 = color0 ... 3 = color1) -> BC1 index
+BC1_INDEX = np.array([0, 2, 3, 1], dtype=np.uint64)
+# BC7 4-bit index interpolation weights (out of 64)
+BC7_WEIGHTS = np.array([0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64])
+
+SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255.0 <= 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+
+def mip_count(width, height):
+    """Levels in a full chain down to 1x1"""
+    return max(width, height).bit_length()
+
+
+# Working space conversions: uint8 pixels <-> float32 values that average
+# correctly when box filtered
+
+def decode(pixels, kind):
+    if kind == 'srgb':
+        return SRGB_TO_LINEAR[pixels]
+    if kind == 'normal':
+        return pixels.astype(np.float32) * (2 / 255.0) - 1
+    return pixels.astype(np.float32)
+
+
+def encode(values, kind):
+    if kind == 'srgb':
+        values = np.where(values <= 0.0031308, values * 12.92,
+                          1.055 * np.power(np.maximum(values, 0.0031308), 1 / 2.4) - 0.055) * 255
+    elif kind == 'normal':
+        values = (values + 1) * 127.5
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+def downsample(values, width, kind):
+    """Halve a band of rows (an even count, or the single row of a 1-high
+    level) and its width, dropping the odd last column as D3D sizes do"""
+    if len(values) > 1:
+        values = (values[0::2] + values[1::2]) * 0.5
+    if width > 1:
+        w = width // 2 * 2
+        values = (values[:, 0:w:2] + values[:, 1:w:2]) * 0.5
+    if kind == 'normal':
+        length = np.sqrt(np.sum(values ** 2, axis=-1, keepdims=True))
+        values = values / np.maximum(length, 1e-8)
+    return values
+
+
+def blocks(pixels):
+    """(rows, cols, C) uint8, rows a multiple of 4 -> (n, 16, C) 4x4 blocks,
+    edge-padding the columns to a multiple of 4"""
+    h, w, c = pixels.shape
+    pad = -w % 4
+    if pad:
+        pixels = np.concatenate([pixels, np.repeat(pixels[:, -1:], pad, axis=1)], axis=1)
+    return pixels.reshape(h // 4, 4, -1, 4, c).transpose(0, 2, 1, 3, 4).reshape(-1, 16, c)
+
+
+def _index_bits(index, bits):
+    """Pack per-pixel indices (n, k) into one uint64 per block, pixel 0 lowest"""
+    shifts = np.arange(index.shape[1], dtype=np.uint64) * np.uint64(bits)
+    return np.bitwise_or.reduce(index.astype(np.uint64) << shifts, axis=1)
+
+
+def encode_bc4(values):
+    """(n, 16) uint8 -> (n, 8) BC4 blocks, 8-value mode with exact nearest indices"""
+    v = values.astype(np.int32)
+    hi, lo = v.max(axis=1), v.min(axis=1)
+    span = np.maximum(hi - lo, 1)[:, None]
+    position = ((v - lo[:, None]) * 14 + span) // (2 * span)
+    index = BC4_INDEX[position]
+    index[hi == lo] = 0
+    word = hi.astype(np.uint64) | lo.astype(np.uint64) << np.uint64(8)
+    word |= _index_bits(index, 3) << np.uint64(16)
+    return word.astype('<u8').view(np.uint8).reshape(-1, 8)
+
+
+def encode_bc5(values):
+    """(n, 16, 2+) uint8 -> (n, 16) BC5 blocks from the first two channels"""
+    return np.concatenate([encode_bc4(values[..., 0]), encode_bc4(values[..., 1])], axis=1)
+
+
+def principal_endpoints(pixels):
+    """Per block, the extremes of the pixels along their principal axis"""
+    px = pixels.astype(np.float32)
+    mean = px.mean(axis=1)
+    d = px - mean[:, None]
+    cov = np.einsum('nki,nkj->nij', d, d)
+    axis = np.ones_like(mean)
+    for _ in range(8):
+        axis = np.einsum('nij,nj->ni', cov, axis)
+        axis /= np.maximum(np.abs(axis).max(axis=1, keepdims=True), 1e-12)
+    axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-12)
+    proj = np.einsum('nkc,nc->nk', d, axis)
+    low = mean + proj.min(axis=1)[:, None] * axis
+    high = mean + proj.max(axis=1)[:, None] * axis
+    return np.clip(low, 0, 255), np.clip(high, 0, 255)
+
+
+def _line_position(pixels, e0, e1, steps):
+    """Nearest of steps+1 evenly spaced points from e0 to e1, per pixel"""
+    line = (e1 - e0)[:, None]
+    t = np.einsum('nkc,nkc->nk', pixels - e0[:, None], line)
+    t /= np.maximum(np.einsum('nkc,nkc->nk', line, line), 1e-12)
+    return np.rint(np.clip(t, 0, 1) * steps).astype(np.intp)
+
+
+def encode_bc1(pixels):
+    """(n, 16, 3) uint8 -> (n, 8) BC1 blocks in 4-color mode"""
+    low, high = principal_endpoints(pixels)
+    scale = np.array([31, 63, 31], dtype=np.float32)
+    q0, q1 = (np.rint(e * scale / 255).astype(np.uint16) for e in (high, low))
+    c0, c1 = ((q[:, 0] << 11) | (q[:, 1] << 5) | q[:, 2] for q in (q0, q1))
+
+    # color0 must be the larger value for 4-color mode
+    swap = c0 < c1
+    c0[swap], c1[swap] = c1[swap], c0[swap].copy()
+    q0[swap], q1[swap] = q1[swap], q0[swap].copy()
+
+    def expand(q):
+        return np.stack([(q[:, 0] << 3) | (q[:, 0] >> 2), (q[:, 1] << 2) | (q[:, 1] >> 4),
+                         (q[:, 2] << 3) | (q[:, 2] >> 2)], axis=1).astype(np.float32)
+
+    index = BC1_INDEX[_line_position(pixels.astype(np.float32), expand(q0), expand(q1), 3)]
+    index[c0 == c1] = 0
+    word = c0.astype(np.uint64) | c1.astype(np.uint64) << np.uint64(16)
+    word |= _index_bits(index, 2) << np.uint64(32)
+    return word.astype('<u8').view(np.uint8).reshape(-1, 8)
+
+
+def _quantize_7p(endpoint):
+    """8-bit RGBA endpoint -> (7-bit values, shared p-bit), whichever p-bit is closer"""
+    best = None
+    for p in (0, 1):
+        q = np.clip(np.rint((endpoint - p) / 2), 0, 127).astype(np.uint64)
+        err = np.sum(((q * 2 + p) - endpoint) ** 2, axis=1)
+        if best is None:
+            best = q, np.full(len(q), p, dtype=np.uint64), err
+        else:
+            better = err < best[2]
+            best = (np.where(better[:, None], q, best[0]), np.where(better, np.uint64(p), best[1]),
+                    np.minimum(err, best[2]))
+    return best[0], best[1]
+
+
+def encode_bc7(pixels):
+    """(n, 16, 3 or 4) uint8 -> (n, 16) BC7 mode 6 blocks (RGBA, 4-bit indices)"""
+    if pixels.shape[2] == 3:
+        pixels = np.concatenate([pixels, np.full(pixels.shape[:2] + (1,), 255, np.uint8)], axis=2)
+    low, high = principal_endpoints(pixels)
+    (q0, p0), (q1, p1) = _quantize_7p(low), _quantize_7p(high)
+    e0 = (q0 * 2 + p0[:, None]).astype(np.float32)
+    e1 = (q1 * 2 + p1[:, None]).astype(np.float32)
+
+    position = _line_position(pixels.astype(np.float32), e0, e1, 64)
+    midpoints = (BC7_WEIGHTS[1:] + BC7_WEIGHTS[:-1]) / 2
+    index = np.searchsorted(midpoints, position).astype(np.uint64)
+
+    # The anchor (pixel 0) index is stored without its top bit
+    flip = index[:, 0] >= 8
+    index[flip] = 15 - index[flip]
+    q0[flip], q1[flip] = q1[flip], q0[flip].copy()
+    p0[flip], p1[flip] = p1[flip], p0[flip].copy()
+
+    lo = np.full(len(pixels), 1 << 6, dtype=np.uint64)
+    shift = 7
+    for c in range(4):
+        for q in (q0, q1):
+            lo |= q[:, c] << np.uint64(shift)
+            shift += 7
+    lo |= p0 << np.uint64(63)
+    hi = p1 | index[:, 0] << np.uint64(1)
+    hi |= _index_bits(index[:, 1:], 4) << np.uint64(4)
+    return np.stack([lo, hi], axis=1).astype('<u8').view(np.uint8).reshape(-1, 16)
+
+
+ENCODERS = {'bc1': encode_bc1, 'bc4': lambda b: encode_bc4(b[..., 0]), 'bc5': encode_bc5,
+            'bc7': encode_bc7}
+
+
+def block_format(kind, channels, codec='bc7'):
+    """BC format for a map of the given kind and channel count"""
+    if kind == 'normal':
+        return 'bc5'
+    if channels == 1:
+        return 'bc4'
+    return codec
+
+
+class MipLevel:
+    """One level of a streamed mip chain.
+
+    Rows arrive in working space; every 4 rows become a row of blocks in a
+    scratch file, and row pairs are averaged down into the next level.
+    """
+
+    def __init__(self, width, height, kind, fmt):
+        self.width, self.height = width, height
+        self.kind, self.fmt = kind, fmt
+        self.pending = []
+        self.received = 0
+        self.file = tempfile.TemporaryFile()
+        self.next = None
+        if width > 1 or height > 1:
+            self.next = MipLevel(max(1, width // 2), max(1, height // 2), kind, fmt)
+
+    def push(self, values):
+        self.pending.append(values)
+        self.received += len(values)
+        buffered = sum(len(v) for v in self.pending)
+        done = self.received >= self.height
+        step = max(4, CHUNK_PIXELS // self.width // 4 * 4)
+        if buffered < 4 and not done:
+            return
+
+        values = np.concatenate(self.pending) if len(self.pending) > 1 else self.pending[0]
+        usable = len(values) if done else len(values) // 4 * 4
+        self.pending = [values[usable:]] if usable < len(values) else []
+        for r0 in range(0, usable, step):
+            self._emit(values[r0:min(r0 + step, usable)])
+
+    def _emit(self, values):
+        pixels = encode(values, self.kind)
+        if pixels.ndim == 2:
+            pixels = pixels[..., None]
+        pad = -len(pixels) % 4
+        if pad:
+            pixels = np.concatenate([pixels, np.repeat(pixels[-1:], pad, axis=0)])
+        with span(f"dds.{self.fmt}", level_width=self.width):
+            self.file.write(ENCODERS[self.fmt](blocks(pixels)).tobytes())
+
+        if self.next is not None:
+            # An odd last row has no partner; the next level is height // 2
+            if self.height > 1:
+                values = values[:len(values) // 2 * 2]
+            if len(values):
+                with span('dds.mip', level_width=self.width):
+                    values = downsample(values, self.width, self.kind)
+                self.next.push(values)
+
+    def levels(self):
+        level = self
+        while level is not None:
+            yield level
+            level = level.next
+
+
+class DdsWriter:
+    """Stream rows of a uint8 map into a block-compressed DDS with mips.
+
+    Same interface as PngWriter. With layers > 1 the file is a texture
+    array and rows are written layer after layer.
+    """
+
+    def __init__(self, path, width, height, channels, kind='linear', codec='bc7', layers=1):
+        if kind not in KINDS:
+            raise ValueError(f"unknown map kind '{kind}', expected one of {KINDS}")
+        self.path = path
+        self.width, self.height = width, height
+        self.kind = kind
+        self.fmt = block_format(kind, channels, codec)
+        self.layers = layers
+        self.body = tempfile.TemporaryFile()
+        self.chain = None
+        self.rows = 0
+
+    def header(self):
+        mips = mip_count(self.width, self.height)
+        top = -(-self.width // 4) * -(-self.height // 4) * BLOCK_BYTES[self.fmt]
+        flags = 0x1 | 0x2 | 0x4 | 0x1000 | 0x20000 | 0x80000
+        pixel_format = struct.pack('<II4s5I', 32, 0x4, b'DX10', 0, 0, 0, 0, 0)
+        caps = 0x1000 | 0x400000 | 0x8
+        header = struct.pack('<7I44x', 124, flags, self.height, self.width, top, 0, mips)
+        header += pixel_format + struct.pack('<4I4x', caps, 0, 0, 0)
+        formats = DXGI_FORMAT_SRGB if self.kind == 'srgb' else DXGI_FORMAT
+        dx10 = struct.pack('<5I', formats[self.fmt], 3, 0, self.layers, 0)
+        return b'DDS ' + header + dx10
+
+    def write(self, rows):
+        """Append a band shaped (n, width) or (n, width, channels)"""
+        rows = np.asarray(rows, dtype=np.uint8)
+        while len(rows):
+            if self.chain is None:
+                self.chain = MipLevel(self.width, self.height, self.kind, self.fmt)
+            take = min(len(rows), self.height - self.chain.received)
+            self.chain.push(decode(rows[:take], self.kind))
+            rows = rows[take:]
+            if self.chain.received == self.height:
+                self._end_layer()
+
+    def _end_layer(self):
+        for level in self.chain.levels():
+            level.file.seek(0)
+            shutil.copyfileobj(level.file, self.body)
+            level.file.close()
+        self.chain = None
+        self.rows += self.height
+
+    def close(self):
+        if self.rows != self.height * self.layers:
+            raise ValueError(f"{self.path}: got {self.rows} of {self.height * self.layers} rows")
+        with open(self.path, 'wb') as f:
+            f.write(self.header())
+            self.body.seek(0)
+            shutil.copyfileobj(self.body, f)
+        self.body.close()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Background map encoding for the SIGNAL LOST texture tools
+
+Finished maps are handed to a small thread pool and encoded while the
+generator computes the next map (or the next material set). zlib and the
+numpy filtering / block compression release the GIL, so threads overlap
+with the compute instead of queueing behind it. At most max_pending
+writes are queued or running at once; submit() blocks beyond that, which
+bounds the memory held by maps waiting to be written.
+
+Writes are grouped (one group per material set) so a set's files can be
+waited for, and its errors reported, on their own. The paths each group
+writes are recorded as they are queued, so callers know exactly which
+files a set produced.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from texture_trace import span
+
+
+# Threads only help with a core to spare for them
+DEFAULT_WORKERS = min(2, (os.cpu_count() or 1) - 1)
+
+
+class EncodePool:
+    """Thread pool for map writes with a bounded in-flight queue.
+
+    workers=0 writes inline, on the calling thread.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=None):
+        self.executor = None
+        self.pending = {}
+        self.written = {}
+        self.group = None
+        self.configure(workers, max_pending)
+
+    def configure(self, workers, max_pending=None):
+        """Resize the pool; waits for outstanding writes first"""
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.workers = workers
+        self.max_pending = max_pending or 2 * max(workers, 1)
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+
+    def submit(self, func, *args):
+        """Run func(*args) in the background as part of the current group"""
+        if not self.workers:
+            future = Future()
+            future.set_result(func(*args))
+            return future
+        if self.executor is None:
+            # Started on first use, so forked worker processes get their own
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='encode')
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._run, func, args)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.pending.setdefault(self.group, []).append(future)
+        return future
+
+    def record(self, path):
+        """Note that the current group writes path"""
+        self.written.setdefault(self.group, []).append(path)
+
+    def files(self, group):
+        """Paths a group wrote, in order, forgetting them"""
+        return list(dict.fromkeys(self.written.pop(group, [])))
+
+    def _run(self, func, args):
+        try:
+            return func(*args)
+        finally:
+            self.slots.release()
+
+    def stream(self, open_writer, **trace_args):
+        """Writer that encodes bands in order in the background;
+        open_writer(first_band) creates the underlying writer"""
+        return StreamWriter(self, open_writer, trace_args)
+
+    def wait(self, *groups):
+        """Block until the writes of the given groups (all by default) are
+        done; re-raises the first write that failed"""
+        groups = groups or list(self.pending)
+        error = None
+        for name in groups:
+            for future in self.pending.pop(name, []):
+                exception = future.exception()
+                if exception is not None and error is None:
+                    error = exception
+        if error is not None:
+            raise error
+
+
+class StreamWriter:
+    """write()/close() proxy that runs a streaming writer's calls in order on the pool"""
+
+    def __init__(self, pool, open_writer, trace_args):
+        self.pool = pool
+        self.open_writer = open_writer
+        self.trace_args = trace_args
+        self.writer = None
+        self.last = None
+
+    def write(self, band):
+        self.last = self.pool.submit(self._call, self.last, 'write', band)
+
+    def close(self):
+        self.last = self.pool.submit(self._call, self.last, 'close', None)
+
+    def _call(self, previous, method, band):
+        if previous is not None:
+            previous.result()
+        if self.writer is None and band is None:
+            return
+        with span('encode', **self.trace_args) as trace:
+            if self.writer is None:
+                self.writer = self.open_writer(band)
+            if method == 'write':
+                self.writer.write(band)
+                return
+            self.writer.close()
+            if trace is not None:
+                trace['bytes'] = os.path.getsize(self.writer.path)
+
+
+# Shared by everything that writes maps in this process
+ENCODER = EncodePool()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Animated CRT static flipbooks for the SIGNAL LOST texture tools
+
+Every frame of the loop is built in one float32 (frames, rows, cols)
+volume: white noise, scanlines on every other row, a bright bar rolling
+down the screen once per loop and a per-frame flicker. Nothing loops over
+frames in Python.
+
+Temporal coherence blurs the noise along the frame axis with a periodic
+Gaussian (sigma in frames), then restores its contrast, so neighbouring
+frames share some of their grain and the last frame still runs into the
+first.
+
+Frames are laid out as an atlas grid (left to right, top to bottom) or
+stacked top to bottom as the layers of a Texture2DArray.
+"""
+
+import math
+
+import numpy as np
+
+
+LAYOUTS = ('atlas', 'layers')
+
+# Suggested playback rate, recorded in the metadata
+FPS = 24
+# Signal levels, as in the screen_static recipe
+NOISE_WEIGHT = 0.85
+SCANLINE_VALUE = 0.15
+# Rolling bar: added brightness and width (standard deviation) as a
+# fraction of the frame height
+BAR_VALUE = 0.12
+BAR_WIDTH = 0.06
+# Largest brightness drop of a flickering frame
+FLICKER = 0.05
+
+
+def static_frames(rng, size, frames, coherence=0.0):
+    """(frames, size, size) float32 CRT static signal in [0, 1]"""
+    noise = rng.random_sample((frames, size, size)).astype(np.float32)
+    if coherence > 0 and frames > 1:
+        noise = temporal_blur(noise, coherence)
+    signal = noise
+    signal *= NOISE_WEIGHT
+    signal[:, ::2] += SCANLINE_VALUE
+
+    # Distance (in frame heights, wrapping) from each row to the bar's center
+    rows = (np.arange(size, dtype=np.float32) + 0.5) / size
+    phase = rows[None, :] - np.arange(frames, dtype=np.float32)[:, None] / frames
+    phase -= np.round(phase)
+    bar = np.exp(-0.5 * (phase / BAR_WIDTH) ** 2) * BAR_VALUE
+    signal += bar[:, :, None]
+
+    flicker = 1 - FLICKER * rng.random_sample(frames).astype(np.float32)
+    signal *= flicker[:, None, None]
+    np.clip(signal, 0, 1, out=signal)
+    return signal
+
+
+def temporal_blur(volume, sigma):
+    """Periodic Gaussian blur of [0, 1] noise along axis 0 (frames), rescaled
+    around 0.5 to the contrast it had before"""
+    frames = len(volume)
+    transfer = np.exp(-2 * (np.pi * sigma * np.fft.rfftfreq(frames)) ** 2)
+    spectrum = np.fft.rfft(volume - np.float32(0.5), axis=0)
+    spectrum *= transfer[:, None, None]
+    out = np.fft.irfft(spectrum, n=frames, axis=0).astype(np.float32)
+
+    # Independent samples lose variance by the kernel's summed squares
+    kernel = np.fft.irfft(transfer, n=frames)
+    out /= np.float32(math.sqrt(np.sum(kernel ** 2)))
+    out += 0.5
+    return out
+
+
+def grid(frames, columns=None):
+    """(columns, rows) of an atlas holding frames, square-ish by default"""
+    columns = columns or math.ceil(math.sqrt(frames))
+    return columns, math.ceil(frames / columns)
+
+
+def pack(frames, layout='atlas', columns=None):
+    """Lay (frames, h, w, ...) images out as one image: an atlas grid, or
+    stacked top to bottom as layers"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown flipbook layout '{layout}', expected one of {LAYOUTS}")
+    count, height, width = frames.shape[:3]
+    if layout == 'layers':
+        return frames.reshape((count * height,) + frames.shape[2:])
+    columns, rows = grid(count, columns)
+    cells = np.zeros((rows * columns,) + frames.shape[1:], dtype=frames.dtype)
+    cells[:count] = frames
+    cells = cells.reshape((rows, columns) + frames.shape[1:]).swapaxes(1, 2)
+    return cells.reshape((rows * height, columns * width) + frames.shape[3:])
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Vectorized gradient noise for the SIGNAL LOST texture tools
+
+Noise is evaluated from continuous texture coordinates in [0, 1), so a
+seed gives the same pattern at every resolution and any band of rows can
+be evaluated on its own. Everything is float32.
+
+Pixel grids are separable: for each lattice row the x-blend of the two
+corner gradients is computed once per column, and each pixel row is then
+a weighted sum of two gathered lattice rows. That keeps the per-octave
+cost to a handful of contiguous float32 passes.
+
+Tileable fields round every octave to a whole number of lattice cells
+across the texture and hash cell indices modulo that count, so the
+pattern repeats exactly at u, v = 1.
+"""
+
+import numpy as np
+
+from texture_trace import span
+
+
+# Cells across the texture at noise(scale=...) are REFERENCE_SIZE / scale,
+# so at 1024 px a feature is still `scale` pixels wide.
+REFERENCE_SIZE = 1024
+
+# 16 evenly spaced unit gradients, scaled so single-octave noise spans [-1, 1]
+_ANGLES = np.arange(16) * (2 * np.pi / 16)
+GRAD_X = (np.cos(_ANGLES) * np.sqrt(2)).astype(np.float32)
+GRAD_Y = (np.sin(_ANGLES) * np.sqrt(2)).astype(np.float32)
+
+# Pixels per evaluation chunk; keeps the temporaries cache-sized
+CHUNK_PIXELS = 1 << 18
+
+# fbm output is 0.5 + FBM_CONTRAST * sum, clipped; this spreads it over
+# [0, 1] (std ~0.15) while clipping well under 0.1% of pixels
+FBM_CONTRAST = 0.8
+
+KINDS = ('fbm', 'ridged', 'turbulence')
+
+
+def fade(t):
+    """Perlin's quintic smoothstep"""
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+class Octave:
+    """Permutation tables and coordinate offsets for one noise octave.
+
+    Holds one table per seed of a batch; evaluate() returns a leading batch
+    axis, so a set of variants shares every vectorized pass. With an
+    integer period the lattice wraps every period cells.
+    """
+
+    def __init__(self, rngs, frequency, period=None):
+        self.frequency = frequency
+        self.period = period
+        self.perm = np.stack([rng.permutation(256) for rng in rngs]).astype(np.intp)
+        self.offset = np.stack([rng.uniform(0, 256, size=2) for rng in rngs])
+        self.batch = np.arange(len(rngs))[:, None, None]
+
+    def lattice(self, coords, offset):
+        """Split texture coordinates into lattice cell index and fraction, per seed"""
+        pos = coords[None, :] * self.frequency + offset[:, None]
+        cell = np.floor(pos)
+        return cell.astype(np.intp), (pos - cell).astype(np.float32)
+
+    def hash(self, cx, cy):
+        """Gradient index for every (seed, cy, cx) lattice point"""
+        if self.period:
+            cx, cy = cx % self.period, cy % self.period
+        row = np.take_along_axis(self.perm, cx & 255, axis=1)
+        return self.perm[self.batch, (row[:, None, :] + cy[:, :, None]) & 255] & 15
+
+    def evaluate(self, u, v):
+        """Gradient noise in [-1, 1] shaped (seeds, len(v), len(u))"""
+        ix, fx = self.lattice(u, self.offset[:, 0])
+        iy, fy = self.lattice(v, self.offset[:, 1])
+        ux, uy = fade(fx), fade(fy)
+
+        # Lattice points touched by the grid; every seed spans the same count
+        # give or take one, so pad to the widest
+        cx = ix[:, :1] + np.arange((ix[:, -1] - ix[:, 0]).max() + 2)
+        cy = iy[:, :1] + np.arange((iy[:, -1] - iy[:, 0]).max() + 2)
+        h = self.hash(cx, cy)
+        gx, gy = GRAD_X[h], GRAD_Y[h]
+
+        # Blend the left/right corner gradients along x for each lattice row:
+        # a corner's contribution is p + q * fy, with fy relative to that row.
+        # Column gathers are per seed (fast 1-D fancy indexing); the row
+        # blend below covers the whole batch at once.
+        jx = ix - cx[:, :1]
+        wl, wr = 1 - ux, ux
+        p = np.empty((len(ix), cy.shape[1], len(u)), dtype=np.float32)
+        q = np.empty_like(p)
+        for b in range(len(ix)):
+            j = jx[b]
+            p[b] = gx[b][:, j] * (wl[b] * fx[b]) + gx[b][:, j + 1] * (wr[b] * (fx[b] - 1))
+            q[b] = gy[b][:, j] * wl[b] + gy[b][:, j + 1] * wr[b]
+
+        batch = self.batch[:, :, 0]
+        jy = iy - cy[:, :1]
+        wb, wt = (1 - uy)[:, :, None], uy[:, :, None]
+        fy = fy[:, :, None]
+        out = p[batch, jy] * wb
+        out += q[batch, jy] * (wb * fy)
+        out += p[batch, jy + 1] * wt
+        out += q[batch, jy + 1] * (wt * (fy - 1))
+        return out
+
+
+class NoiseField:
+    """Fractal gradient noise: fbm, ridged or turbulence, mapped to [0, 1]
+
+    seed may be a list, in which case every result gets a leading axis with
+    one entry per seed, each identical to a NoiseField of that seed alone.
+    tileable fields repeat seamlessly across the texture's edges.
+    """
+
+    def __init__(self, seed, frequency, octaves=6, kind='fbm', lacunarity=2.0, gain=0.5,
+                 tileable=False):
+        if kind not in KINDS:
+            raise ValueError(f"unknown noise kind '{kind}', expected one of {KINDS}")
+        self.batched = isinstance(seed, (list, tuple, np.ndarray))
+        rngs = [np.random.RandomState(s) for s in (seed if self.batched else [seed])]
+        self.kind = kind
+        frequencies = [frequency * lacunarity ** k for k in range(octaves)]
+        if tileable:
+            frequencies = [max(1, round(f)) for f in frequencies]
+        self.octaves = [Octave(rngs, f, f if tileable else None) for f in frequencies]
+        self.amps = [gain ** k for k in range(octaves)]
+
+    def evaluate(self, u, v):
+        """Noise in [0, 1] on the grid of texture coordinates u (cols) and v (rows)"""
+        total = sum(self.amps)
+        out = np.zeros((len(self.octaves[0].perm), len(v), len(u)), dtype=np.float32)
+        step = max(1, CHUNK_PIXELS // (len(u) * len(out)))
+        for r0 in range(0, len(v), step):
+            acc = out[:, r0:r0 + step]
+            for octave, amp in zip(self.octaves, self.amps):
+                with span('noise.octave', frequency=octave.frequency):
+                    n = octave.evaluate(u, v[r0:r0 + step])
+                if self.kind == 'turbulence':
+                    np.abs(n, out=n)
+                elif self.kind == 'ridged':
+                    np.abs(n, out=n)
+                    np.subtract(1, n, out=n)
+                    n *= n
+                n *= amp / total
+                acc += n
+
+        if self.kind == 'fbm':
+            out *= FBM_CONTRAST
+            out += 0.5
+        np.clip(out, 0, 1, out=out)
+        return out if self.batched else out[0]
+
+    def render(self, size, rows=None):
+        """Rows (a slice, default all) of a size x size raster of the field"""
+        rows = rows or slice(0, size)
+        u = pixel_centers(size)
+        return self.evaluate(u, u[rows])
+
+
+def pixel_centers(size):
+    """Texture coordinates of pixel centers along one axis"""
+    return (np.arange(size) + 0.5) / size
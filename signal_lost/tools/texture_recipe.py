@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Declarative material recipes for the SIGNAL LOST texture generator
+
+A recipe (JSON, or TOML on Python 3.11+) names its layers and maps:
+
+    {
+      "name": "rusted_metal",
+      "title": "rusted metal textures",
+      "layers": {
+        "base": {"op": "noise", "scale": 100, "octaves": 4},
+        "rust": {"op": "spots", "count": 40, "size_range": [20, 100]},
+        "height": {"op": "mix", "terms": [["base", 0.7], ["rust", 0.3]]}
+      },
+      "maps": {
+        "normal": {"value": {"op": "normal", "of": "height", "strength": 2.0}},
+        "roughness": {"value": {"op": "mix", "terms": [["rust", 0.4]], "bias": 0.4},
+                      "clip": [0.2, 0.9]}
+      }
+    }
+
+Node inputs are layer names or inline nodes. Sources draw from the RNG:
+noise, scratches, spots, cracks (TextureGenerator parameters) and uniform
+(white noise); they may only be declared as named layers, and their
+random parameters are drawn in declaration order whatever gets rendered.
+Everything else is evaluated band by band on float32 buffers:
+
+    mix       bias + sum of weight * term, terms [[input, weight], ...]
+    stripes   value on every period-th row, 0 elsewhere
+    gradient  RGB from dark to light (0-255) by input 'of'
+    blend     'color' over 'base' with opacity mask * amount
+    darken    base * (1 - mask * amount), amount scalar or per channel
+    add       base + mask * amount (0-255 units)
+
+and a map's value may also be one of
+
+    normal    normal map of height input 'of' (strength)
+    constant  one value in [0, 1] everywhere
+
+Maps are quantized to uint8 after clipping to 'clip' ([0, 1] by default),
+rounding to nearest unless 'round' is 'floor'.
+
+LayerGraph compiles a recipe into a DAG. Identical expressions become
+one node, only the sources the requested maps depend on are rendered
+(concurrently), and each map's band evaluates every node it needs once.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+
+RECIPE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recipes')
+
+# Layers drawn from the generator's RNG (TextureGenerator.source)
+SOURCE_OPS = ('noise', 'scratches', 'spots', 'cracks', 'uniform')
+# Node inputs and parameters of every other op, by op
+EXPRESSION_OPS = {
+    'mix': ((), ('bias',)),
+    'stripes': ((), ('period', 'value')),
+    'gradient': (('of',), ('dark', 'light')),
+    'blend': (('base', 'color', 'mask'), ('amount',)),
+    'darken': (('base', 'mask'), ('amount',)),
+    'add': (('base', 'mask'), ('amount',)),
+}
+MAP_OPS = {
+    'normal': (('of',), ('strength',)),
+    'constant': ((), ('value',)),
+}
+ROUNDING = ('nearest', 'floor')
+
+# Concurrent source renders; tiled sets render one at a time
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def recipe_path(name):
+    """Path of a built-in recipe, or name itself if it is a file"""
+    if os.path.isfile(name):
+        return name
+    for ext in ('.json', '.toml'):
+        path = os.path.join(RECIPE_DIR, name + ext)
+        if os.path.isfile(path):
+            return path
+    raise ValueError(f"no recipe '{name}' in {RECIPE_DIR}")
+
+
+def load_recipe(name):
+    """Read and check a recipe by built-in name or path"""
+    path = recipe_path(name)
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError(f"{path}: TOML recipes need Python 3.11+")
+        with open(path, 'rb') as f:
+            recipe = tomllib.load(f)
+    else:
+        with open(path) as f:
+            recipe = json.load(f)
+    recipe.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    recipe.setdefault('title', recipe['name'].replace('_', ' ') + ' textures')
+    recipe.setdefault('layers', {})
+    if not recipe.get('maps'):
+        raise ValueError(f"{path}: recipe has no maps")
+    return recipe
+
+
+class LayerGraph:
+    """A recipe compiled against one TextureGenerator.
+
+    Nodes are (op, input ids, parameters); building the same node twice
+    returns the first one's id. Sources hold a render() until render_sources()
+    replaces it with the layer.
+    """
+
+    def __init__(self, recipe, gen):
+        self.recipe = recipe
+        self.gen = gen
+        self.nodes = []
+        self.ids = {}
+        self.named = {}
+        self.layers = {}
+        self.maps = {}
+
+        # Every source draws its parameters now, in declaration order
+        for name, spec in recipe['layers'].items():
+            if isinstance(spec, dict) and spec.get('op') in SOURCE_OPS:
+                params = {k: v for k, v in spec.items() if k != 'op'}
+                node = self._node(spec['op'], (), {'layer': name})
+                try:
+                    self.layers[node] = gen.source(spec['op'], **params)
+                except TypeError as e:
+                    raise self._error(f"layer '{name}': {e}")
+                self.named[name] = node
+        for name, spec in recipe['maps'].items():
+            if gen.wants(name):
+                self.maps[name] = self._map(name, spec)
+
+    def _error(self, message):
+        return ValueError(f"recipe '{self.recipe['name']}': {message}")
+
+    def _node(self, op, inputs, params):
+        key = (op, inputs, json.dumps(params, sort_keys=True))
+        if key not in self.ids:
+            self.ids[key] = len(self.nodes)
+            self.nodes.append((op, inputs, params))
+        return self.ids[key]
+
+    def _ref(self, spec, stack=()):
+        """Node id of a layer name or inline node"""
+        if isinstance(spec, str):
+            if spec in self.named:
+                return self.named[spec]
+            if spec not in self.recipe['layers']:
+                raise self._error(f"unknown layer '{spec}'")
+            if spec in stack:
+                raise self._error(f"layer '{spec}' depends on itself")
+            self.named[spec] = self._ref(self.recipe['layers'][spec], stack + (spec,))
+            return self.named[spec]
+        if not isinstance(spec, dict) or 'op' not in spec:
+            raise self._error(f"expected a layer name or node, got {spec!r}")
+        op = spec['op']
+        if op in SOURCE_OPS:
+            raise self._error(f"'{op}' layers must be declared by name")
+        if op in MAP_OPS:
+            raise self._error(f"'{op}' can only be a map's value")
+        if op not in EXPRESSION_OPS:
+            raise self._error(f"unknown op '{op}'")
+        return self._expression(op, spec, stack)
+
+    def _expression(self, op, spec, stack, ops=EXPRESSION_OPS):
+        input_names, param_names = ops[op]
+        unknown = set(spec) - {'op'} - set(input_names) - set(param_names)
+        if op == 'mix':
+            unknown.discard('terms')
+        if unknown:
+            raise self._error(f"'{op}' has no parameter {sorted(unknown)}")
+        missing = [name for name in input_names if name not in spec]
+        if missing:
+            raise self._error(f"'{op}' needs {missing}")
+        params = {name: spec[name] for name in param_names if name in spec}
+        if op == 'mix':
+            if not spec.get('terms'):
+                raise self._error("'mix' needs terms")
+            inputs = tuple(self._ref(term, stack) for term, _ in spec['terms'])
+            params['weights'] = [weight for _, weight in spec['terms']]
+        else:
+            inputs = tuple(self._ref(spec[name], stack) for name in input_names)
+        return self._node(op, inputs, params)
+
+    def _map(self, name, spec):
+        if not isinstance(spec, dict) or 'value' not in spec:
+            raise self._error(f"map '{name}' needs a value")
+        value = spec['value']
+        if isinstance(value, dict) and value.get('op') in MAP_OPS:
+            node = self._expression(value['op'], value, (), MAP_OPS)
+        else:
+            node = self._ref(value)
+        rounding = spec.get('round', 'nearest')
+        if rounding not in ROUNDING:
+            raise self._error(f"map '{name}': unknown rounding '{rounding}', expected one of {ROUNDING}")
+        lo, hi = spec.get('clip', (0.0, 1.0))
+        return node, lo, hi, rounding == 'floor'
+
+    def _reachable(self, node):
+        """Ids a node depends on, itself included, and each one's consumer count"""
+        consumers = {node: 0}
+        pending = [node]
+        while pending:
+            for child in self.nodes[pending.pop()][1]:
+                if child not in consumers:
+                    consumers[child] = 0
+                    pending.append(child)
+                consumers[child] += 1
+        return consumers
+
+    def render_sources(self):
+        """Render the sources the requested maps use, concurrently when untiled"""
+        needed = set()
+        for node, *_ in self.maps.values():
+            needed.update(n for n in self._reachable(node) if n in self.layers)
+        needed = sorted(n for n in needed if callable(self.layers[n]))
+        workers = 1 if self.gen.tile_rows else RENDER_WORKERS
+        if workers <= 1 or len(needed) <= 1:
+            for node in needed:
+                self.layers[node] = self.layers[node]()
+            return
+        with ThreadPoolExecutor(workers, thread_name_prefix='layer') as pool:
+            for node, layer in zip(needed, pool.map(lambda n: self.layers[n](), needed)):
+                self.layers[node] = layer
+
+    def band_fn(self, name):
+        """(band_fn(rows), halo) writing the named map with TextureGenerator.save"""
+        root, lo, hi, floor = self.maps[name]
+        consumers = self._reachable(root)
+        halo = sum(1 for node in consumers if self.nodes[node][0] == 'normal')
+
+        def band(rows):
+            memo = {}
+            value = self._evaluate(root, rows, memo, consumers)
+            if value.dtype == np.uint8:
+                return value
+            if root in self.layers:
+                value = np.array(value, dtype=np.float32)
+            return self.gen.compose.quantize(value, lo, hi, floor)
+        return band, halo
+
+    def _evaluate(self, node, rows, memo, consumers):
+        if node in memo:
+            return memo[node]
+        if node in self.layers:
+            memo[node] = self.layers[node][rows]
+            return memo[node]
+        op, inputs, params = self.nodes[node]
+        c = self.gen.compose
+        args = [self._evaluate(child, rows, memo, consumers) for child in inputs]
+        buffer = f"node{node}"
+
+        def private(child, value):
+            """value, or a copy of it when others read it too (in-place ops)"""
+            if consumers[child] == 1 and child not in self.layers:
+                return value
+            out = c.buffer(buffer + '.' + str(child), value.shape)
+            np.copyto(out, value)
+            return out
+
+        if op == 'mix':
+            result = c.mix(buffer, list(zip(args, params['weights'])), params.get('bias', 0.0))
+        elif op == 'stripes':
+            result = self._stripes(buffer, rows, params.get('period', 2), params.get('value', 1.0))
+        elif op == 'gradient':
+            result = c.gradient(buffer, args[0], params['dark'], params['light'])
+        elif op == 'blend':
+            result = c.blend(private(inputs[0], args[0]), private(inputs[1], args[1]), args[2],
+                             params['amount'])
+        elif op == 'darken':
+            result = c.darken(private(inputs[0], args[0]), args[1], params['amount'])
+        elif op == 'add':
+            result = c.add(private(inputs[0], args[0]), args[1], params['amount'])
+        elif op == 'normal':
+            result = self.gen.height_to_normal(args[0], strength=params.get('strength', 1.0))
+        else:
+            result = self._constant(rows, params.get('value', 0.0))
+        memo[node] = result
+        return result
+
+    def _stripes(self, buffer, rows, period, value):
+        out = self.gen.compose.buffer(buffer, (rows.stop - rows.start, self.gen.size))
+        out[...] = 0
+        out[-rows.start % period::period] = value
+        return out
+
+    def _constant(self, rows, value):
+        shape = (rows.stop - rows.start, self.gen.size)
+        if self.gen.variants > 1:
+            shape = (self.gen.variants,) + shape
+        return np.full(shape, round(value * 255), dtype=np.uint8)
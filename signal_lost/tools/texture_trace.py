@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Stage tracing for the SIGNAL LOST texture tools
+
+Code marks its stages with `with span('name'):` blocks or the @traced
+decorator. Until start() is called, span() hands back one shared no-op
+context, so the markers can stay in place at the cost of a global
+lookup. While tracing, each span records its wall time, the peak memory
+it allocated (tracemalloc) and any output bytes it reports, and the run
+can be saved as a Chrome / Perfetto trace and summarized per stage.
+Spans nest per thread, so background encode threads trace their own
+stages; tracemalloc peaks are process-wide and include what other
+threads allocate meanwhile.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+_NULL_SPAN = contextlib.nullcontext()
+_active = None
+
+
+def span(name, **args):
+    """Context manager timing one stage; yields a dict for extra args
+    (e.g. args['bytes'] = output size), or None when tracing is off"""
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name, args)
+
+
+def traced(name):
+    """Decorator: run every call of the function inside span(name)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with _active.span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start():
+    """Begin tracing in this process"""
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def stop():
+    """End tracing; returns this process's events"""
+    global _active
+    tracer, _active = _active, None
+    if tracer is None:
+        return []
+    tracer.close()
+    return tracer.events
+
+
+class Tracer:
+    """Collects complete ('X') trace events with allocation and self-time info"""
+
+    def __init__(self):
+        self.events = []
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+
+    def close(self):
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+    @property
+    def stack(self):
+        """Open spans of the calling thread"""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name, args):
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        frame = {'base': current, 'peak': current, 'children': 0.0}
+        self.stack.append(frame)
+        begin = time.perf_counter()
+        try:
+            yield args
+        finally:
+            duration = time.perf_counter() - begin
+            _, peak = tracemalloc.get_traced_memory()
+            self.stack.pop()
+            peak = max(frame['peak'], peak)
+            if self.stack:
+                parent = self.stack[-1]
+                parent['peak'] = max(parent['peak'], peak)
+                parent['children'] += duration
+            args = dict(args, alloc_bytes=peak - frame['base'],
+                        self_us=round((duration - frame['children']) * 1e6, 1))
+            self.events.append({
+                'name': name, 'ph': 'X', 'pid': self.pid, 'tid': threading.get_ident(),
+                'ts': round(begin * 1e6, 1), 'dur': round(duration * 1e6, 1), 'args': args,
+            })
+
+
+def save_chrome_trace(path, events):
+    """Write events as a Chrome / Perfetto trace (open in ui.perfetto.dev)"""
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': sorted(events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}, f)
+
+
+def summarize(events):
+    """Per-stage rows: (name, calls, total ms, self ms, peak alloc MB, output bytes),
+    by self time, largest first"""
+    stages = {}
+    for event in events:
+        row = stages.setdefault(event['name'], [0, 0.0, 0.0, 0, 0])
+        args = event['args']
+        row[0] += 1
+        row[1] += event['dur'] / 1000
+        row[2] += args['self_us'] / 1000
+        row[3] = max(row[3], args['alloc_bytes'])
+        row[4] += args.get('bytes', 0)
+    rows = [(name, calls, total, self_ms, alloc / 2**20, out)
+            for name, (calls, total, self_ms, alloc, out) in stages.items()]
+    return sorted(rows, key=lambda row: -row[3])
+
+
+def print_summary(events):
+    print(f"  {'stage':<28} {'calls':>6} {'total ms':>10} {'self ms':>10} {'alloc MB':>9} {'out KB':>9}")
+    for name, calls, total, self_ms, alloc, out in summarize(events):
+        output = f"{out / 1024:9.0f}" if out else f"{'':9}"
+        print(f"  {name:<28} {calls:6d} {total:10.1f} {self_ms:10.1f} {alloc:9.1f} {output}")